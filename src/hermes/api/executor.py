@@ -0,0 +1,81 @@
+"""Bounded thread executor that keeps blocking search work off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TypeVar
+
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class SearchExecutor:
+    """Runs synchronous pipeline calls on ``workers`` threads.
+
+    Beyond ``workers + max_queue`` calls in flight, :meth:`run` raises :class:`ExecutorSaturated`.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hermes-search")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run ``fn(*args)`` on a worker thread and await its result."""
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(
+                    f"{self._in_flight} searches in flight (limit {self.workers + self.max_queue})"
+                )
+            self._in_flight += 1
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the thread finishes, not when the caller stops waiting
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Admitted calls still waiting for a worker."""
+        return max(0, self._in_flight - self.workers)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        log.info("search_executor_stopped", completed=self.completed, rejected=self.rejected)
+
+    def _release(self, _future: Future | None = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
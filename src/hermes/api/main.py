@@ -7,6 +7,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from hermes.api.executor import SearchExecutor
 from hermes.api.routes import router
 from hermes.config import HermesConfig, load_config
 from hermes.logging import setup_logging
@@ -26,9 +27,14 @@ async def lifespan(app: FastAPI):
     except Exception as exc:
         logger.warning("Could not load search pipeline (no index?): %s", exc)
         app.state.pipeline = None
+    app.state.search_executor = SearchExecutor(
+        workers=config.search.executor_workers,
+        max_queue=config.search.executor_max_queue,
+    )
     yield
+    app.state.search_executor.shutdown()
     if app.state.pipeline is not None:
-        app.state.pipeline.store.close()
+        app.state.pipeline.close()
 
 
 def create_app(config: HermesConfig | None = None) -> FastAPI:
@@ -2,21 +2,42 @@
 
 from __future__ import annotations
 
+import asyncio
 import threading
 from pathlib import Path
 
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
-from hermes.search.schemas import SearchRequest, SearchResponse, StatsResponse
+from hermes.api.executor import ExecutorSaturated
+from hermes.search.schemas import (
+    BatchSearchRequest,
+    BatchSearchResponse,
+    SearchRequest,
+    SearchResponse,
+    StatsResponse,
+)
 
 
 def _require_pipeline(request: Request):
     pipeline = request.app.state.pipeline
     if pipeline is None:
-        raise HTTPException(status_code=400, detail="No index loaded. Please index a repository first.")
+        raise HTTPException(
+            status_code=400, detail="No index loaded. Please index a repository first."
+        )
     return pipeline
 
+
+async def _run_search(request: Request, fn, *args):
+    """Run a blocking pipeline call on the search executor; 503 when it is saturated."""
+    try:
+        return await request.app.state.search_executor.run(fn, *args)
+    except ExecutorSaturated as exc:
+        raise HTTPException(
+            status_code=503, detail=f"Search capacity exceeded: {exc}", headers={"Retry-After": "1"}
+        ) from exc
+
+
 router = APIRouter()
 
 # In-memory indexing state
@@ -26,12 +47,14 @@ _indexing_status: dict = {"state": "idle"}
 
 class IndexRequest(BaseModel):
     repo_path: str
+    incremental: bool = False
 
 
 @router.get("/health")
 async def health():
     return {"status": "ok"}
 
+
 @router.get("/")
 async def root():
     return await health()
@@ -46,7 +69,14 @@ async def index_check(request: Request):
 @router.post("/search", response_model=SearchResponse)
 async def search(req: SearchRequest, request: Request):
     pipeline = _require_pipeline(request)
-    return pipeline.search(req)
+    return await _run_search(request, pipeline.search, req)
+
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(req: BatchSearchRequest, request: Request):
+    pipeline = _require_pipeline(request)
+    results = await _run_search(request, pipeline.search_batch, req.requests)
+    return BatchSearchResponse(results=results)
 
 
 @router.get("/stats", response_model=StatsResponse)
@@ -54,23 +84,33 @@ async def stats(request: Request):
     pipeline = _require_pipeline(request)
     config = request.app.state.config
     cache = pipeline.embedding_cache
+    rerank_cache = pipeline.rerank_cache
     return StatsResponse(
         index_size=pipeline.faiss_index.ntotal,
-        n_chunks=pipeline.store.count(),
+        n_chunks=pipeline.table.n_live,
         biencoder_model=config.embed.biencoder_model,
         crossencoder_model=config.embed.crossencoder_model,
         retrieval_mode=config.search.retrieval_mode,
         cache_hit_rate=round(cache.hit_rate, 4),
         cache_hits=cache.hits,
         cache_misses=cache.misses,
+        search_executor=request.app.state.search_executor.stats(),
+        query_batching=pipeline.query_batcher.stats() if pipeline.query_batcher else None,
+        rerank_batching=pipeline.rerank_scheduler.stats() if pipeline.rerank_scheduler else None,
+        rerank_cache_hit_rate=round(rerank_cache.hit_rate, 4) if rerank_cache else None,
+        rerank_cache_hits=rerank_cache.hits if rerank_cache else None,
+        rerank_cache_misses=rerank_cache.misses if rerank_cache else None,
+        result_cache=pipeline.result_cache.stats() if pipeline.result_cache else None,
     )
 
 
 @router.post("/reload-index")
 async def reload_index(request: Request):
     pipeline = _require_pipeline(request)
-    pipeline.reload()
-    return {"status": "reloaded", "n_chunks": pipeline.store.count()}
+    # Loading artifacts blocks for a while; keep the event loop serving other requests
+    await asyncio.to_thread(pipeline.reload)
+    return {"status": "reloaded", "n_chunks": pipeline.table.n_live}
+
 
 @router.post("/index")
 async def start_indexing(req: IndexRequest, request: Request):
@@ -94,7 +134,7 @@ async def start_indexing(req: IndexRequest, request: Request):
             from hermes.index.build import build_index
             from hermes.search.pipeline import SearchPipeline
 
-            summary = build_index(repo, config)
+            summary = build_index(repo, config, incremental=req.incremental)
             if app.state.pipeline is not None:
                 app.state.pipeline.reload()
             else:
@@ -109,6 +149,7 @@ async def start_indexing(req: IndexRequest, request: Request):
     thread.start()
     return {"status": "indexing", "message": f"Indexing started for {req.repo_path}"}
 
+
 @router.get("/index/status")
 async def index_status():
     return _indexing_status
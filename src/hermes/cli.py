@@ -9,7 +9,7 @@ from pathlib import Path
 
 import click
 
-from hermes.config import load_config
+from hermes.config import ChunkingConfig, EmbedConfig, load_config
 from hermes.logging import setup_logging
 
 
@@ -27,13 +27,39 @@ def cli(ctx, log_level: str, log_json: bool):
 
 @cli.command()
 @click.option("--repo", required=True, type=click.Path(exists=True), help="Path to repository")
-@click.option("--out", default="artifacts", type=click.Path(), help="Output directory for artifacts")
-def index(repo: str, out: str):
+@click.option(
+    "--out", default="artifacts", type=click.Path(), help="Output directory for artifacts"
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only re-index files changed since the last run (falls back to a full build)",
+)
+@click.option(
+    "--chunk-workers",
+    default=None,
+    type=int,
+    help="Processes used for chunking (default from HERMES_CHUNK_WORKERS)",
+)
+@click.option(
+    "--embed-workers",
+    default=None,
+    type=int,
+    help="Processes used for embedding, each loading the model (default: HERMES_EMBED_WORKERS)",
+)
+def index(
+    repo: str, out: str, incremental: bool, chunk_workers: int | None, embed_workers: int | None
+):
     """Index a repository: scan, chunk, embed, and build FAISS index."""
     from hermes.index.build import build_index
 
-    config = load_config(artifacts_dir=Path(out))
-    summary = build_index(Path(repo), config)
+    overrides: dict = {"artifacts_dir": Path(out)}
+    if chunk_workers is not None:
+        overrides["chunking"] = ChunkingConfig(workers=chunk_workers)
+    if embed_workers is not None:
+        overrides["embed"] = EmbedConfig(workers=embed_workers)
+    config = load_config(**overrides)
+    summary = build_index(Path(repo), config, incremental=incremental)
 
     click.echo("\nIndexing complete:")
     for k, v in summary.items():
@@ -102,7 +128,10 @@ def ui(ctx, ui_port: int):
 
     try:
         _start_api(
-            opts["artifacts"], opts["host"], opts["port"], opts["reload"],
+            opts["artifacts"],
+            opts["host"],
+            opts["port"],
+            opts["reload"],
         )
     finally:
         click.echo("\nShutting down Next.js dev server...")
@@ -114,12 +143,33 @@ def ui(ctx, ui_port: int):
 
 
 @cli.command("eval")
-@click.option("--artifacts", default="artifacts", type=click.Path(exists=True), help="Artifacts directory")
-@click.option("--repo", default=None, type=click.Path(exists=True), help="Repository path (for dataset generation)")
+@click.option(
+    "--artifacts", default="artifacts", type=click.Path(exists=True), help="Artifacts directory"
+)
+@click.option(
+    "--repo",
+    default=None,
+    type=click.Path(exists=True),
+    help="Repository path (for dataset generation)",
+)
 @click.option("--out", default="reports", type=click.Path(), help="Output directory for reports")
-@click.option("--dataset", default=None, type=click.Path(), help="Path to pre-built eval dataset JSON")
+@click.option(
+    "--dataset", default=None, type=click.Path(), help="Path to pre-built eval dataset JSON"
+)
 @click.option("--max-queries", default=200, type=int, help="Max queries to generate/evaluate")
-def eval_cmd(artifacts: str, repo: str | None, out: str, dataset: str | None, max_queries: int):
+@click.option(
+    "--compare-quantization",
+    is_flag=True,
+    help="Also evaluate int8 models and report metric deltas, latency and model size",
+)
+def eval_cmd(
+    artifacts: str,
+    repo: str | None,
+    out: str,
+    dataset: str | None,
+    max_queries: int,
+    compare_quantization: bool,
+):
     """Run evaluation and generate a metrics report."""
     from hermes.eval.run_eval import run_evaluation
 
@@ -132,15 +182,26 @@ def eval_cmd(artifacts: str, repo: str | None, out: str, dataset: str | None, ma
         output_dir=Path(out),
         eval_dataset_path=ds_path,
         max_queries=max_queries,
+        compare_quantization=compare_quantization,
     )
     click.echo(f"\nReport written to: {report}")
 
 
 @cli.command()
-@click.option("--artifacts", default="artifacts", type=click.Path(exists=True), help="Artifacts directory")
-@click.option("--queries", required=True, type=click.Path(exists=True), help="JSONL file with queries")
+@click.option(
+    "--artifacts", default="artifacts", type=click.Path(exists=True), help="Artifacts directory"
+)
+@click.option(
+    "--queries", required=True, type=click.Path(exists=True), help="JSONL file with queries"
+)
 @click.option("--top-k", default=10, type=int, help="Top-K results per query")
-def bench(artifacts: str, queries: str, top_k: int):
+@click.option(
+    "--batch-size",
+    default=0,
+    type=int,
+    help="Also measure throughput of search_batch with this many queries per call",
+)
+def bench(artifacts: str, queries: str, top_k: int, batch_size: int):
     """Run latency benchmarks against indexed artifacts."""
     from hermes.search.pipeline import SearchPipeline
     from hermes.search.schemas import SearchRequest
@@ -168,9 +229,12 @@ def bench(artifacts: str, queries: str, top_k: int):
     embed_times: list[float] = []
     faiss_times: list[float] = []
     rerank_times: list[float] = []
+    rerank_pairs: list[int] = []
 
     for q in query_list:
-        req = SearchRequest(query=q, top_k_retrieve=config.search.top_k_retrieve, top_k_rerank=top_k)
+        req = SearchRequest(
+            query=q, top_k_retrieve=config.search.top_k_retrieve, top_k_rerank=top_k
+        )
         t0 = time.perf_counter()
         resp = pipeline.search(req)
         total = (time.perf_counter() - t0) * 1000
@@ -178,11 +242,15 @@ def bench(artifacts: str, queries: str, top_k: int):
         embed_times.append(resp.timings_ms.get("embed_query_ms", 0))
         faiss_times.append(resp.timings_ms.get("retrieval_ms", 0))
         rerank_times.append(resp.timings_ms.get("rerank_ms", 0))
+        rerank_pairs.append(resp.rerank_pairs_scored)
 
     import tracemalloc
+
     tracemalloc.start()
 
-    req = SearchRequest(query=query_list[0], top_k_retrieve=config.search.top_k_retrieve, top_k_rerank=top_k)
+    req = SearchRequest(
+        query=query_list[0], top_k_retrieve=config.search.top_k_retrieve, top_k_rerank=top_k
+    )
     pipeline.search(req)
     current, peak = tracemalloc.get_traced_memory()
     tracemalloc.stop()
@@ -194,8 +262,140 @@ def bench(artifacts: str, queries: str, top_k: int):
 
     click.echo(f"\n{'Metric':<25} {'p50':>10} {'p95':>10}")
     click.echo("-" * 47)
-    click.echo(f"{'Total (ms)':<25} {_percentile(latencies, 50):>10.1f} {_percentile(latencies, 95):>10.1f}")
-    click.echo(f"{'Embed query (ms)':<25} {_percentile(embed_times, 50):>10.1f} {_percentile(embed_times, 95):>10.1f}")
-    click.echo(f"{'FAISS search (ms)':<25} {_percentile(faiss_times, 50):>10.1f} {_percentile(faiss_times, 95):>10.1f}")
-    click.echo(f"{'Rerank (ms)':<25} {_percentile(rerank_times, 50):>10.1f} {_percentile(rerank_times, 95):>10.1f}")
-    click.echo(f"\nMemory (current/peak): {current / 1024 / 1024:.1f} MB / {peak / 1024 / 1024:.1f} MB")
+    click.echo(
+        f"{'Total (ms)':<25} {_percentile(latencies, 50):>10.1f} {_percentile(latencies, 95):>10.1f}"
+    )
+    click.echo(
+        f"{'Embed query (ms)':<25} {_percentile(embed_times, 50):>10.1f} {_percentile(embed_times, 95):>10.1f}"
+    )
+    click.echo(
+        f"{'FAISS search (ms)':<25} {_percentile(faiss_times, 50):>10.1f} {_percentile(faiss_times, 95):>10.1f}"
+    )
+    click.echo(
+        f"{'Rerank (ms)':<25} {_percentile(rerank_times, 50):>10.1f} {_percentile(rerank_times, 95):>10.1f}"
+    )
+    click.echo(
+        f"\nRerank pairs scored per query: {sum(rerank_pairs) / len(rerank_pairs):.1f} "
+        f"(rerank mode: {config.search.rerank_mode})"
+    )
+    click.echo(
+        f"Memory (current/peak): {current / 1024 / 1024:.1f} MB / {peak / 1024 / 1024:.1f} MB"
+    )
+
+    if batch_size > 1:
+        requests = [
+            SearchRequest(query=q, top_k_retrieve=config.search.top_k_retrieve, top_k_rerank=top_k)
+            for q in query_list
+        ]
+        pipeline.embedding_cache.clear()
+        t0 = time.perf_counter()
+        for start in range(0, len(requests), batch_size):
+            pipeline.search_batch(requests[start : start + batch_size])
+        batched_s = time.perf_counter() - t0
+        sequential_qps = len(latencies) / (sum(latencies) / 1000)
+        batched_qps = len(requests) / batched_s
+        click.echo(
+            f"Throughput (q/s): sequential {sequential_qps:.1f}, "
+            f"batched x{batch_size} {batched_qps:.1f} ({batched_qps / sequential_qps:.1f}x)"
+        )
+
+
+@cli.command("bench-quant")
+@click.option(
+    "--artifacts", default="artifacts", type=click.Path(exists=True), help="Artifacts directory"
+)
+@click.option(
+    "--queries",
+    default=None,
+    type=click.Path(exists=True),
+    help="JSONL file with queries (default: sampled chunk embeddings)",
+)
+@click.option("--top-k", default=10, type=int, help="Recall@K cutoff")
+@click.option(
+    "--n-queries", default=200, type=int, help="Sampled queries when --queries is not given"
+)
+@click.option(
+    "--types",
+    "index_types",
+    default="flat,fp16,sq8,binary",
+    help="Comma-separated index types to compare against flat",
+)
+def bench_quant(artifacts: str, queries: str | None, top_k: int, n_queries: int, index_types: str):
+    """Compare recall, memory and search time of quantized dense indexes."""
+    from hermes.eval.quant_bench import run_quantization_benchmark
+
+    config = load_config(artifacts_dir=Path(artifacts))
+    query_vecs = None
+    if queries:
+        from hermes.embed.biencoder import BiEncoder
+
+        with open(queries) as f:
+            texts = [
+                obj.get("query", obj.get("text", ""))
+                for obj in (json.loads(line) for line in f if line.strip())
+            ]
+        query_vecs = BiEncoder(config.embed, config.model_cache_dir).encode_queries(texts)
+
+    rows = run_quantization_benchmark(
+        config,
+        queries=query_vecs,
+        index_types=tuple(t.strip() for t in index_types.split(",") if t.strip()),
+        top_k=top_k,
+        n_queries=n_queries,
+    )
+    click.echo(
+        f"\n{'Index':<12} {f'Recall@{top_k}':>10} {'Memory (MB)':>12} {'Smaller':>8} "
+        f"{'ms/query':>10} {'Faster':>7}"
+    )
+    click.echo("-" * 64)
+    for r in rows:
+        click.echo(
+            f"{r['index_type']:<12} {r['recall_at_k']:>10.4f} {r['memory_bytes'] / 1e6:>12.2f} "
+            f"{r['memory_reduction']:>7.1f}x {r['search_ms_per_query']:>10.3f} "
+            f"{r['speedup']:>6.2f}x"
+        )
+
+
+@cli.command("bench-backend")
+@click.option(
+    "--artifacts", default="artifacts", type=click.Path(exists=True), help="Artifacts directory"
+)
+@click.option(
+    "--queries", required=True, type=click.Path(exists=True), help="JSONL file with queries"
+)
+@click.option("--n-passages", default=50, type=int, help="Chunks reranked per query")
+@click.option("--top-k", default=10, type=int, help="Rerank order compared over this many results")
+def bench_backend(artifacts: str, queries: str, n_passages: int, top_k: int):
+    """Check torch/ONNX parity and compare per-query model latency (non-zero exit on divergence)."""
+    from hermes.eval.backend_bench import run_backend_benchmark
+
+    config = load_config(artifacts_dir=Path(artifacts))
+    with open(queries) as f:
+        query_list = [
+            obj.get("query", obj.get("text", ""))
+            for obj in (json.loads(line) for line in f if line.strip())
+        ]
+    if not query_list:
+        click.echo("No queries found in file")
+        sys.exit(1)
+
+    result = run_backend_benchmark(config, query_list, n_passages=n_passages, top_k=top_k)
+    click.echo(
+        f"\n{'Backend':<10} {'Embed p50 (ms)':>15} {'Rerank p50 (ms)':>16} "
+        f"{'ms/query':>10} {'Faster':>7}"
+    )
+    click.echo("-" * 62)
+    for r in result["latency"]:
+        click.echo(
+            f"{r['backend']:<10} {r['embed_query_ms_p50']:>15.2f} {r['rerank_ms_p50']:>16.2f} "
+            f"{r['total_ms_per_query']:>10.2f} {r['speedup']:>6.2f}x"
+        )
+    parity = result["parity"]
+    click.echo(
+        f"\nParity: min embedding cosine {parity['embedding_min_cosine']:.6f}, "
+        f"max score diff {parity['score_max_abs_diff']:.6f}, "
+        f"top-{top_k} order agreement {parity['top_k_order_agreement']:.2%} "
+        f"-> {'OK' if parity['ok'] else 'FAILED'}"
+    )
+    if not parity["ok"]:
+        sys.exit(1)
@@ -17,6 +17,8 @@ class ChunkingConfig(BaseSettings):
     max_chars: int = Field(1500, description="Maximum characters per chunk")
     overlap_lines: int = Field(3, description="Lines of overlap between consecutive chunks")
     min_chars: int = Field(50, description="Discard chunks shorter than this")
+    workers: int = Field(1, ge=1, description="Worker processes for reading and chunking files")
+    files_per_task: int = Field(16, ge=1, description="Files sent to a chunking worker per task")
 
 
 class EmbedConfig(BaseSettings):
@@ -24,6 +26,41 @@ class EmbedConfig(BaseSettings):
 
     model_config = {"env_prefix": "HERMES_EMBED_", "env_file": ".env", "extra": "ignore"}
 
+    # Both models run on the same backend. "onnx" loads the ONNX graph and
+    # runs it with onnxruntime (pip install 'hermes-code-search[onnx]'),
+    # which avoids most of PyTorch's per-call overhead on CPU.
+    backend: Literal["torch", "onnx"] = Field(
+        "torch", description="Inference backend for the bi-encoder and cross-encoder"
+    )
+    onnx_provider: str = Field("CPUExecutionProvider", description="onnxruntime execution provider")
+    onnx_intra_op_threads: int = Field(
+        0, ge=0, description="onnxruntime threads per operator (0 = one per physical core)"
+    )
+    onnx_inter_op_threads: int = Field(
+        1, ge=0, description="onnxruntime threads across independent operators"
+    )
+    onnx_graph_optimization: Literal["disable", "basic", "extended", "all"] = Field(
+        "all", description="onnxruntime graph optimization level"
+    )
+
+    # int8 dynamic quantization (Linear weights stored as int8, activations
+    # quantized per call). On the onnx backend the quantized graphs are
+    # exported once into model_cache_dir; on torch they are quantized in
+    # memory at load time. A quantized bi-encoder changes the indexed
+    # vectors, so switching it requires a full rebuild.
+    biencoder_quantize: Literal["none", "int8"] = Field(
+        "none", description="Bi-encoder weights: fp32 (none) or int8 dynamic quantization"
+    )
+    crossencoder_quantize: Literal["none", "int8"] = Field(
+        "none", description="Cross-encoder weights: fp32 (none) or int8 dynamic quantization"
+    )
+    quantize_arch: Literal["avx512_vnni", "avx512", "avx2", "arm64"] = Field(
+        "avx512_vnni", description="onnx: CPU instruction set the int8 graphs are tuned for"
+    )
+    model_cache_dir: Path | None = Field(
+        None, description="Quantized model cache location (default: <artifacts>/models)"
+    )
+
     # Bi-encoder: all-MiniLM-L6-v2 is 80 MB, fast on CPU, and decent at
     # code/NL similarity. For better code-specific results swap to
     # "flax-sentence-embeddings/st-codesearch-distilroberta-base" or
@@ -33,6 +70,21 @@ class EmbedConfig(BaseSettings):
         description="Sentence-transformers model id for bi-encoder",
     )
     biencoder_batch_size: int = 64
+    # Chunk encoding sorts texts by token count and fills each model batch
+    # up to this many padded tokens, instead of biencoder_batch_size texts.
+    biencoder_batch_tokens: int = Field(
+        16384, ge=0, description="Padded-token budget per chunk embedding batch (0 = fixed-size)"
+    )
+    # Index builds can embed in several worker processes, each holding its
+    # own bi-encoder; embeddings return through shared memory.
+    workers: int = Field(
+        1,
+        ge=1,
+        description="Embedding processes for index builds, each loading the model (1 = in-process)",
+    )
+    worker_threads: int = Field(
+        0, ge=0, description="Model threads per embedding worker (0 = CPUs / workers)"
+    )
     biencoder_max_length: int = 512
 
     # Cross-encoder: cross-encoder/ms-marco-MiniLM-L-6-v2 is ~80 MB and
@@ -43,21 +95,123 @@ class EmbedConfig(BaseSettings):
     )
     crossencoder_batch_size: int = 16
     crossencoder_max_length: int = 512
+    # Rerank pairs from concurrent requests are merged into shared batches of
+    # crossencoder_batch_size, earliest deadline first.
+    rerank_batching_enabled: bool = Field(
+        True, description="Share cross-encoder batches across requests"
+    )
+    rerank_batch_wait_ms: float = Field(
+        1.0, ge=0, description="Wait this long for more pairs before running a partial batch"
+    )
+    rerank_cache_size: int = Field(
+        50_000, ge=0, description="LRU cache size for (query, chunk) rerank scores (0 = off)"
+    )
 
     query_cache_size: int = Field(1024, description="LRU cache size for query embeddings")
 
+    # Concurrent searches' query embeddings are collected for up to
+    # query_batch_window_ms and encoded in one forward pass.
+    query_batch_enabled: bool = Field(
+        True, description="Micro-batch query embeddings across requests"
+    )
+    query_batch_window_ms: float = Field(
+        2.0, ge=0, description="How long the first query of a batch waits for others to join"
+    )
+    query_batch_max_size: int = Field(
+        32, ge=1, description="Encode as soon as this many queries wait"
+    )
+
+    # Persistent chunk embedding cache used by the indexer. Keyed by
+    # (model, max_length, sha256(code_text)); point several artifact dirs
+    # (e.g. one per branch) at the same directory to share it.
+    chunk_cache_enabled: bool = Field(True, description="Reuse embeddings of unchanged chunk texts")
+    chunk_cache_dir: Path | None = Field(
+        None, description="Chunk embedding cache location (default: <artifacts>/embedding_cache)"
+    )
+    chunk_cache_max_mb: int = Field(
+        4096,
+        ge=0,
+        description="Evict least recently used cached vectors past this size (0 = no cap)",
+    )
+
+    @property
+    def biencoder_id(self) -> str:
+        """Bi-encoder model id including quantization, for keying stored vectors."""
+        if self.biencoder_quantize == "none":
+            return self.biencoder_model
+        return f"{self.biencoder_model}@{self.biencoder_quantize}"
+
+    @property
+    def crossencoder_id(self) -> str:
+        """Cross-encoder model id including quantization, for keying cached scores."""
+        if self.crossencoder_quantize == "none":
+            return self.crossencoder_model
+        return f"{self.crossencoder_model}@{self.crossencoder_quantize}"
+
 
 class IndexConfig(BaseSettings):
     """FAISS index and sparse index settings."""
 
     model_config = {"env_prefix": "HERMES_INDEX_", "env_file": ".env", "extra": "ignore"}
 
+    faiss_index_type: Literal[
+        "auto", "flat", "ivf_flat", "hnsw", "ivf_pq", "opq_ivf_pq", "sq8", "fp16", "binary"
+    ] = Field(
+        "flat",
+        description="Dense index type; auto picks one from corpus size and faiss_memory_budget_mb",
+    )
+    faiss_memory_budget_mb: int = Field(
+        2048, ge=1, description="auto: memory available for dense vectors; PQ is used above it"
+    )
+    faiss_auto_flat_max: int = Field(
+        50_000, ge=0, description="auto: corpora up to this many chunks use exact flat search"
+    )
     faiss_nprobe: int = Field(8, description="Number of probes for IVF index (if used)")
     faiss_use_ivf: bool = Field(
         False,
-        description="Use IVF index for large repos (>100k chunks). Flat is used otherwise.",
+        description="Legacy switch: with faiss_index_type=flat, build an IVF-Flat index instead",
     )
     faiss_ivf_nlist: int = Field(100, description="Number of IVF clusters")
+    serve_read_only: bool = Field(
+        True,
+        description="Search processes memory-map the FAISS index and open SQLite with mode=ro",
+    )
+    faiss_hnsw_m: int = Field(32, ge=2, description="HNSW neighbours per node")
+    faiss_hnsw_ef_construction: int = Field(200, ge=1, description="HNSW build-time search depth")
+    faiss_hnsw_ef_search: int = Field(64, ge=1, description="HNSW query-time search depth")
+    faiss_pq_m: int = Field(
+        0, ge=0, description="PQ sub-quantizers; must divide the embedding dim (0 = auto, ~dim/4)"
+    )
+    faiss_pq_nbits: int = Field(8, ge=1, le=16, description="Bits per PQ sub-quantizer code")
+    faiss_binary_rescore_factor: int = Field(
+        10, ge=1, description="binary: Hamming candidates per result re-scored with float vectors"
+    )
+    faiss_filter_exact_max: int = Field(
+        20_000,
+        ge=0,
+        description="IVF/HNSW: filtered searches matching at most this many chunks are exact",
+    )
+    build_batch_size: int = Field(
+        2048,
+        ge=1,
+        description="Chunks embedded and indexed per streaming batch (bounds peak memory)",
+    )
+    max_tombstone_ratio: float = Field(
+        0.25,
+        ge=0.0,
+        le=1.0,
+        description="Incremental builds do a full rebuild once this share of chunks is tombstoned",
+    )
+    snippet_block_bytes: int = Field(
+        16384, ge=1024, description="Uncompressed bytes of code text per zstd block"
+    )
+    snippet_zstd_level: int = Field(9, ge=1, le=22, description="zstd level for code text blocks")
+    snippet_dict_bytes: int = Field(
+        112_640, ge=0, description="Size of the trained zstd dictionary (0 = no dictionary)"
+    )
+    snippet_cache_blocks: int = Field(
+        256, ge=0, description="Decompressed code text blocks kept in memory by search"
+    )
 
 
 class SearchConfig(BaseSettings):
@@ -71,10 +225,51 @@ class SearchConfig(BaseSettings):
     rerank_timeout_seconds: float = Field(
         10.0, description="If reranking exceeds this, return retrieval-only results"
     )
+    # Cascade reranking scores the candidates in rounds, in retrieval order
+    # (or intermediate-scorer order), and stops once the top_k_rerank is
+    # stable: the last round changed nothing in the top-k and its best score
+    # trails the k-th score by cascade_margin. It also stops at the time budget.
+    rerank_mode: Literal["full", "cascade"] = Field(
+        "full", description="full: score every head candidate; cascade: score in early-exit rounds"
+    )
+    cascade_round_size: int = Field(10, ge=1, description="cascade: candidates scored per round")
+    cascade_margin: float = Field(
+        1.0, ge=0, description="cascade: stop when a round's best score is this far below the k-th"
+    )
+    cascade_time_budget_ms: float = Field(
+        100.0, gt=0, description="cascade: start no new round after this much rerank time"
+    )
+    cascade_intermediate: Literal["none", "dense", "crossencoder"] = Field(
+        "none",
+        description="cascade: cheap scorer that orders candidates before the full cross-encoder",
+    )
+    cascade_intermediate_model: str = Field(
+        "cross-encoder/ms-marco-TinyBERT-L-2-v2",
+        description="cascade: small cross-encoder used when cascade_intermediate=crossencoder",
+    )
     retrieval_mode: Literal["dense", "sparse", "hybrid"] = Field(
         "hybrid", description="Retrieval strategy"
     )
     rrf_k: int = Field(60, description="RRF constant for reciprocal rank fusion")
+    dense_timeout_seconds: float = Field(
+        2.0, gt=0, description="Hybrid: drop dense results (embed + FAISS) slower than this"
+    )
+    sparse_timeout_seconds: float = Field(
+        2.0, gt=0, description="Hybrid: drop BM25 results slower than this"
+    )
+    result_cache_size: int = Field(
+        1024, ge=0, description="Whole-response LRU cache entries for repeated searches (0 = off)"
+    )
+    result_cache_ttl_seconds: float = Field(
+        300.0, gt=0, description="Cached search responses expire after this many seconds"
+    )
+
+    # API server: searches run on a dedicated thread pool so the event loop
+    # stays responsive; requests beyond workers + max_queue get HTTP 503.
+    executor_workers: int = Field(4, ge=1, description="Threads running searches in the API server")
+    executor_max_queue: int = Field(
+        64, ge=0, description="Searches allowed to wait for a worker before new ones are rejected"
+    )
 
 
 class HermesConfig(BaseSettings):
@@ -91,6 +286,10 @@ class HermesConfig(BaseSettings):
     index: IndexConfig = Field(default_factory=IndexConfig)
     search: SearchConfig = Field(default_factory=SearchConfig)
 
+    @property
+    def model_cache_dir(self) -> Path:
+        return self.embed.model_cache_dir or self.artifacts_dir / "models"
+
 
 def load_config(**overrides) -> HermesConfig:
     """Create a config instance, applying any programmatic overrides."""
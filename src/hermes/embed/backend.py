@@ -0,0 +1,144 @@
+"""Inference backend selection and int8 quantization for the sentence-transformers models.
+
+int8 ONNX graphs are exported once into the model cache; torch models are quantized in memory.
+"""
+
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from typing import Any
+
+from hermes.config import EmbedConfig
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+_GRAPH_OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+def model_kwargs(config: EmbedConfig, file_name: str | None = None) -> dict[str, Any]:
+    """Extra ``SentenceTransformer`` / ``CrossEncoder`` constructor arguments for the backend."""
+    if config.backend == "torch":
+        return {}
+    kwargs: dict[str, Any] = {
+        "provider": config.onnx_provider,
+        "session_options": session_options(config),
+    }
+    if file_name:
+        kwargs["file_name"] = file_name
+    return {"backend": "onnx", "model_kwargs": kwargs}
+
+
+def session_options(config: EmbedConfig) -> Any:
+    """onnxruntime session options: thread pools and graph optimization level."""
+    try:
+        import onnxruntime as ort
+    except ImportError as exc:
+        raise ImportError(
+            "backend='onnx' needs onnxruntime: pip install 'hermes-code-search[onnx]'"
+        ) from exc
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = getattr(
+        ort.GraphOptimizationLevel, _GRAPH_OPT_LEVELS[config.onnx_graph_optimization]
+    )
+    # 0 lets onnxruntime size the pool to the physical cores
+    options.intra_op_num_threads = config.onnx_intra_op_threads
+    options.inter_op_num_threads = config.onnx_inter_op_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    return options
+
+
+def load_model(
+    model_cls: type,
+    model_name: str,
+    config: EmbedConfig,
+    quantize: str,
+    cache_dir: Path | None,
+    **kwargs: Any,
+) -> Any:
+    """Instantiate *model_cls* (``SentenceTransformer`` or ``CrossEncoder``) for the backend.
+
+    *cache_dir* holds exported int8 ONNX models; only ``backend="onnx"`` with int8 needs it.
+    """
+    if quantize == "none":
+        return model_cls(model_name, **kwargs, **model_kwargs(config))
+    if config.backend == "torch":
+        model = model_cls(model_name, **kwargs)
+        quantize_torch(model)
+        return model
+    if cache_dir is None:
+        raise ValueError("int8 models on the onnx backend need a model cache directory")
+
+    path = cache_dir / model_name.replace("/", "__")
+    suffix = f"qint8_{config.quantize_arch}"
+    file_name = f"onnx/model_{suffix}.onnx"
+    if not (path / file_name).exists():
+        _export_int8_onnx(model_cls, model_name, config, path, suffix, **kwargs)
+    log.info("loading_quantized_model", model=model_name, path=str(path / file_name))
+    return model_cls(str(path), **kwargs, **model_kwargs(config, file_name=file_name))
+
+
+def quantize_torch(model: Any) -> None:
+    """Replace the Linear layers of a loaded torch model with int8 dynamic-quantized ones."""
+    import torch
+
+    # CrossEncoder keeps the transformer in .model; SentenceTransformer is itself a Module
+    module = model if isinstance(model, torch.nn.Module) else model.model
+    torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _export_int8_onnx(
+    model_cls: type,
+    model_name: str,
+    config: EmbedConfig,
+    path: Path,
+    suffix: str,
+    **kwargs: Any,
+) -> None:
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    log.info("exporting_quantized_model", model=model_name, arch=config.quantize_arch)
+    model = model_cls(model_name, **kwargs, **model_kwargs(config))
+    # Save the full model (tokenizer, config, fp32 graph) so the cached copy loads offline
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    model.save_pretrained(str(tmp))
+    export_dynamic_quantized_onnx_model(model, config.quantize_arch, str(tmp), file_suffix=suffix)
+    shutil.rmtree(path, ignore_errors=True)
+    tmp.rename(path)
+
+
+def weights_nbytes(model: Any) -> int:
+    """Bytes of model weights as loaded: the ONNX graph file, or the torch state dict."""
+    onnx_path = _onnx_model_path(model)
+    if onnx_path is not None:
+        return onnx_path.stat().st_size
+    import torch
+
+    module = model if isinstance(model, torch.nn.Module) else model.model
+    total = 0
+    stack = list(module.state_dict().values())
+    while stack:
+        value = stack.pop()
+        if isinstance(value, torch.Tensor):
+            total += value.numel() * value.element_size()
+        elif isinstance(value, (tuple, list)):
+            # Quantized Linear layers store (int8 weight, bias) packed params
+            stack.extend(value)
+    return total
+
+
+def _onnx_model_path(model: Any) -> Path | None:
+    # The onnxruntime model is CrossEncoder.model or SentenceTransformer[0].auto_model
+    ort_model = getattr(model, "model", None)
+    if ort_model is None and hasattr(model, "__getitem__"):
+        ort_model = getattr(model[0], "auto_model", None)
+    path = getattr(ort_model, "model_path", None)
+    return Path(path) if path is not None else None
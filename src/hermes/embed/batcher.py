@@ -0,0 +1,116 @@
+"""Cross-request micro-batching for query embeddings."""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Future
+
+import numpy as np
+
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+
+class QueryBatcher:
+    """Collects concurrent ``encode`` calls into shared bi-encoder batches.
+
+    Each batch waits up to ``window_ms`` for more queries; calls made after ``close`` raise.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], np.ndarray],
+        window_ms: float,
+        max_batch_size: int,
+    ) -> None:
+        self._encode_fn = encode_fn
+        self.window_s = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: queue.Queue[tuple[str, Future] | None] = queue.Queue()
+        # Guards _closed so no query is queued behind the stop sentinel
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Counter[int] = Counter()
+        self.n_batches = 0
+        self.n_queries = 0
+        self._thread = threading.Thread(target=self._loop, name="hermes-query-batcher", daemon=True)
+        self._thread.start()
+
+    def encode(self, query: str) -> np.ndarray:
+        """Embed *query* as part of the next batch; blocks until its row is ready."""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("query batcher closed")
+            self._queue.put((query, future))
+        return future.result()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            mean = self.n_queries / self.n_batches if self.n_batches else 0.0
+            return {
+                "window_ms": self.window_s * 1000,
+                "max_batch_size": self.max_batch_size,
+                "batches": self.n_batches,
+                "queries": self.n_queries,
+                "mean_batch_size": round(mean, 2),
+                "batch_size_counts": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.window_s
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        nxt = self._queue.get(timeout=remaining)
+                    else:
+                        # Window over: still take whatever is already waiting
+                        nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._run(batch)
+            if stop:
+                return
+
+    def _run(self, batch: list[tuple[str, Future]]) -> None:
+        # Identical concurrent queries are encoded once
+        unique = list(dict.fromkeys(q for q, _ in batch))
+        try:
+            vecs = self._encode_fn(unique)
+        except Exception as exc:  # noqa: BLE001 - handed to every waiting caller
+            log.warning("query_batch_failed", batch_size=len(batch), error=str(exc))
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        rows = {q: vecs[i : i + 1] for i, q in enumerate(unique)}
+        for q, future in batch:
+            future.set_result(rows[q])
+        with self._stats_lock:
+            self.n_batches += 1
+            self.n_queries += len(batch)
+            self._batch_sizes[len(batch)] += 1
@@ -2,24 +2,94 @@
 
 from __future__ import annotations
 
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from hermes.config import EmbedConfig
+from hermes.embed.backend import load_model, weights_nbytes
 from hermes.logging import get_logger
 
 log = get_logger(__name__)
 
 
+@dataclass
+class EncodeStats:
+    """Padding and throughput of chunk encoding (``encode_texts``)."""
+
+    n_texts: int = 0
+    n_batches: int = 0
+    # Tokens the texts actually have vs. tokens the model ran on after padding
+    real_tokens: int = 0
+    padded_tokens: int = 0
+    encode_s: float = 0.0
+
+    def record_batch(self, lengths: np.ndarray) -> None:
+        self.n_texts += len(lengths)
+        self.n_batches += 1
+        self.real_tokens += int(lengths.sum())
+        self.padded_tokens += int(lengths.max()) * len(lengths)
+
+    def merge(self, other: EncodeStats) -> None:
+        self.n_texts += other.n_texts
+        self.n_batches += other.n_batches
+        self.real_tokens += other.real_tokens
+        self.padded_tokens += other.padded_tokens
+        self.encode_s += other.encode_s
+
+    @property
+    def padding_efficiency(self) -> float:
+        return self.real_tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def as_dict(self) -> dict:
+        return {
+            "embed_batches": self.n_batches,
+            "embed_padding_efficiency": round(self.padding_efficiency, 4),
+            "embed_chunks_per_sec": (
+                round(self.n_texts / self.encode_s, 1) if self.encode_s else 0.0
+            ),
+        }
+
+
+def token_budget_batches(sorted_lengths: np.ndarray, token_budget: int) -> list[tuple[int, int]]:
+    """Cut length-sorted texts into [start, end) batches of at most *token_budget* padded tokens.
+
+    A text longer than the budget gets a batch of its own.
+    """
+    batches: list[tuple[int, int]] = []
+    start, n = 0, len(sorted_lengths)
+    while start < n:
+        size = max(1, token_budget // max(1, int(sorted_lengths[start])))
+        end = min(n, start + size)
+        batches.append((start, end))
+        start = end
+    return batches
+
+
 class BiEncoder:
     """Wraps a sentence-transformers model for encoding chunks and queries."""
 
-    def __init__(self, config: EmbedConfig) -> None:
+    def __init__(self, config: EmbedConfig, model_cache_dir: Path | None = None) -> None:
         self.config = config
-        log.info("loading_biencoder", model=config.biencoder_model)
-        self.model = SentenceTransformer(config.biencoder_model)
+        log.info(
+            "loading_biencoder",
+            model=config.biencoder_model,
+            backend=config.backend,
+            quantize=config.biencoder_quantize,
+        )
+        self.model = load_model(
+            SentenceTransformer,
+            config.biencoder_model,
+            config,
+            config.biencoder_quantize,
+            model_cache_dir,
+        )
         self.model.max_seq_length = config.biencoder_max_length
         self._dim: int | None = None
+        self.stats = EncodeStats()
 
     @property
     def dim(self) -> int:
@@ -27,16 +97,53 @@ class BiEncoder:
             self._dim = self.model.get_sentence_embedding_dimension()
         return self._dim
 
+    @property
+    def weights_nbytes(self) -> int:
+        return weights_nbytes(self.model)
+
     def encode_texts(self, texts: list[str], show_progress: bool = True) -> np.ndarray:
-        """Encode a batch of texts, returning a float32 numpy array (N, dim)."""
-        embeddings = self.model.encode(
+        """Encode a batch of texts, returning a float32 numpy array (N, dim) in input order.
+
+        Texts are sorted by length and batched by ``biencoder_batch_tokens`` padded tokens.
+        """
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        t0 = time.perf_counter()
+        lengths = self.token_lengths(texts)
+        order = np.argsort(-lengths, kind="stable")
+        budget = self.config.biencoder_batch_tokens
+        if budget > 0:
+            batches = token_budget_batches(lengths[order], budget)
+        else:
+            size = self.config.biencoder_batch_size
+            batches = [(i, min(i + size, len(texts))) for i in range(0, len(texts), size)]
+
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start, end in batches:
+            idx = order[start:end]
+            out[idx] = self.model.encode(
+                [texts[i] for i in idx],
+                batch_size=len(idx),
+                show_progress_bar=show_progress,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+            self.stats.record_batch(lengths[idx])
+        self.stats.encode_s += time.perf_counter() - t0
+        return out
+
+    def token_lengths(self, texts: list[str]) -> np.ndarray:
+        """Tokenized length of each text (special tokens included, capped at max_seq_length)."""
+        encoded = self.model.tokenizer(
             texts,
-            batch_size=self.config.biencoder_batch_size,
-            show_progress_bar=show_progress,
-            convert_to_numpy=True,
-            normalize_embeddings=True,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False,
         )
-        return embeddings.astype(np.float32)
+        ids = encoded["input_ids"]
+        return np.fromiter((len(row) for row in ids), dtype=np.int64, count=len(texts))
 
     def encode_query(self, query: str) -> np.ndarray:
         """Encode a single query string, returning shape (1, dim)."""
@@ -48,3 +155,14 @@ class BiEncoder:
             normalize_embeddings=True,
         )
         return vec.astype(np.float32)
+
+    def encode_queries(self, queries: list[str]) -> np.ndarray:
+        """Encode many query strings in shared batches, returning shape (N, dim)."""
+        vecs = self.model.encode(
+            queries,
+            batch_size=self.config.biencoder_batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return vecs.astype(np.float32)
@@ -52,3 +52,72 @@ class EmbeddingCache:
             self._cache.clear()
             self.hits = 0
             self.misses = 0
+
+
+class RerankScoreCache:
+    """Thread-safe LRU cache of cross-encoder scores keyed by (model, query, chunk_id).
+
+    Entries keep a digest of the chunk text, so a chunk changed by a reload is a miss.
+    """
+
+    def __init__(self, model_name: str, max_size: int = 50_000) -> None:
+        self.model_name = model_name
+        self._cache: OrderedDict[tuple[str, str, int], tuple[bytes, float]] = OrderedDict()
+        self._max_size = max_size
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, query: str, items: list[tuple[int, str]]) -> list[float | None]:
+        """Return the cached score for each (chunk_id, text), or None on a miss."""
+        q = _normalize_query(query)
+        digests = [_text_digest(text) for _, text in items]
+        out: list[float | None] = []
+        with self._lock:
+            for (chunk_id, _), digest in zip(items, digests):
+                key = (self.model_name, q, chunk_id)
+                entry = self._cache.get(key)
+                if entry is not None and entry[0] == digest:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    out.append(entry[1])
+                else:
+                    self.misses += 1
+                    out.append(None)
+        return out
+
+    def put_many(self, query: str, items: list[tuple[int, str]], scores) -> None:
+        q = _normalize_query(query)
+        entries = [
+            ((self.model_name, q, chunk_id), (_text_digest(text), float(score)))
+            for (chunk_id, text), score in zip(items, scores)
+        ]
+        with self._lock:
+            for key, value in entries:
+                self._cache[key] = value
+                self._cache.move_to_end(key)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _normalize_query(query: str) -> str:
+    # Whitespace only: case can matter to cased cross-encoders
+    return " ".join(query.split())
+
+
+def _text_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=8).digest()
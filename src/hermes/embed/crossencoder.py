@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+from pathlib import Path
+
 import numpy as np
 from sentence_transformers import CrossEncoder as _CrossEncoder
 
 from hermes.config import EmbedConfig
+from hermes.embed.backend import load_model, weights_nbytes
 from hermes.logging import get_logger
 
 log = get_logger(__name__)
@@ -14,23 +17,39 @@ log = get_logger(__name__)
 class CrossEncoder:
     """Wraps a cross-encoder model for scoring (query, passage) pairs."""
 
-    def __init__(self, config: EmbedConfig) -> None:
+    def __init__(self, config: EmbedConfig, model_cache_dir: Path | None = None) -> None:
         self.config = config
-        log.info("loading_crossencoder", model=config.crossencoder_model)
-        self.model = _CrossEncoder(
+        log.info(
+            "loading_crossencoder",
+            model=config.crossencoder_model,
+            backend=config.backend,
+            quantize=config.crossencoder_quantize,
+        )
+        self.model = load_model(
+            _CrossEncoder,
             config.crossencoder_model,
+            config,
+            config.crossencoder_quantize,
+            model_cache_dir,
             max_length=config.crossencoder_max_length,
         )
 
+    @property
+    def weights_nbytes(self) -> int:
+        return weights_nbytes(self.model)
+
     def score_pairs(self, query: str, passages: list[str]) -> np.ndarray:
         """Return relevance scores for each (query, passage) pair.
 
         Returns a 1-D float32 array of length ``len(passages)``.
         """
-        if not passages:
+        return self.score_pair_batch([(query, p) for p in passages])
+
+    def score_pair_batch(self, pairs: list[tuple[str, str]]) -> np.ndarray:
+        """Score (query, passage) pairs from any mix of queries, aligned with *pairs*."""
+        if not pairs:
             return np.array([], dtype=np.float32)
 
-        pairs = [[query, p] for p in passages]
         scores = self.model.predict(
             pairs,
             batch_size=self.config.crossencoder_batch_size,
@@ -0,0 +1,162 @@
+"""Cross-request batching for cross-encoder reranking."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+
+import numpy as np
+
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+
+class _Job:
+    """One request's (query, passage) pairs and the scores filled in so far."""
+
+    __slots__ = ("cursor", "deadline", "future", "n_scored", "pairs", "scores")
+
+    def __init__(self, pairs: list[tuple[str, str]], deadline: float) -> None:
+        self.pairs = pairs
+        self.deadline = deadline
+        self.future: Future = Future()
+        self.scores = np.empty(len(pairs), dtype=np.float32)
+        self.cursor = 0  # next pair to hand to a batch
+        self.n_scored = 0
+
+
+class RerankScheduler:
+    """Merges rerank pairs from concurrent requests into full model batches.
+
+    Jobs are served earliest-deadline-first; expired or cancelled jobs are dropped unscored.
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[list[tuple[str, str]]], np.ndarray],
+        batch_size: int,
+        max_wait_ms: float,
+    ) -> None:
+        self._score_fn = score_fn
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self._heap: list[tuple[float, int, _Job]] = []
+        self._seq = itertools.count()
+        self._n_waiting = 0  # pairs not yet handed to a batch
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.n_batches = 0
+        self.n_pairs = 0
+        self.n_jobs = 0
+        self.n_expired = 0
+
+        self._thread = threading.Thread(target=self._loop, name="hermes-rerank", daemon=True)
+        self._thread.start()
+
+    def submit(self, pairs: list[tuple[str, str]], deadline: float) -> Future:
+        """Queue *pairs* for scoring; *deadline* is a ``time.monotonic()`` timestamp.
+
+        The future resolves to float32 scores aligned with *pairs*; cancel it to give up.
+        """
+        job = _Job(pairs, deadline)
+        if not pairs:
+            job.future.set_result(job.scores)
+            return job.future
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), job))
+            self._n_waiting += len(pairs)
+            self.n_jobs += 1
+            self._cond.notify()
+        return job.future
+
+    def stats(self) -> dict:
+        with self._cond:
+            fill = self.n_pairs / (self.n_batches * self.batch_size) if self.n_batches else 0.0
+            return {
+                "batch_size": self.batch_size,
+                "batches": self.n_batches,
+                "pairs_scored": self.n_pairs,
+                "mean_batch_fill": round(fill, 3),
+                "jobs": self.n_jobs,
+                "jobs_expired": self.n_expired,
+                "pairs_waiting": self._n_waiting,
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    for _, _, job in self._heap:
+                        started = job.cursor > 0 or job.future.set_running_or_notify_cancel()
+                        if started and not job.future.done():
+                            job.future.set_exception(RuntimeError("rerank scheduler closed"))
+                    return
+                if self._n_waiting < self.batch_size and self.max_wait_s > 0:
+                    self._cond.wait(timeout=self.max_wait_s)
+                batch = self._take_batch()
+            if batch:
+                self._run(batch)
+
+    def _take_batch(self) -> list[tuple[_Job, int, int]]:
+        """Pop up to ``batch_size`` pairs, earliest deadline first (lock held)."""
+        now = time.monotonic()
+        batch: list[tuple[_Job, int, int]] = []
+        n = 0
+        while self._heap and n < self.batch_size:
+            deadline, _, job = self._heap[0]
+            remaining = len(job.pairs) - job.cursor
+            # Once running, the caller can no longer cancel; only this thread resolves it
+            started = job.cursor > 0 or job.future.set_running_or_notify_cancel()
+            if not started or deadline < now or job.future.done():
+                heapq.heappop(self._heap)
+                self._n_waiting -= remaining
+                if job.future.done():
+                    continue  # an earlier batch of this job failed
+                self.n_expired += 1
+                if started:
+                    job.future.set_exception(TimeoutError("rerank deadline passed"))
+                continue
+            take = min(self.batch_size - n, remaining)
+            batch.append((job, job.cursor, job.cursor + take))
+            job.cursor += take
+            n += take
+            self._n_waiting -= take
+            if job.cursor == len(job.pairs):
+                heapq.heappop(self._heap)
+        return batch
+
+    def _run(self, batch: list[tuple[_Job, int, int]]) -> None:
+        pairs = [p for job, start, end in batch for p in job.pairs[start:end]]
+        try:
+            scores = self._score_fn(pairs)
+        except Exception as exc:  # noqa: BLE001 - handed to every waiting caller
+            log.warning("rerank_batch_failed", n_pairs=len(pairs), error=str(exc))
+            for job, _, _ in batch:
+                if not job.future.done():
+                    job.future.set_exception(exc)
+            return
+
+        offset = 0
+        for job, start, end in batch:
+            job.scores[start:end] = scores[offset : offset + end - start]
+            offset += end - start
+            job.n_scored += end - start
+            if job.n_scored == len(job.pairs) and not job.future.done():
+                job.future.set_result(job.scores)
+        with self._cond:
+            self.n_batches += 1
+            self.n_pairs += len(pairs)
@@ -0,0 +1,297 @@
+"""Persistent, content-addressed cache of chunk embeddings for the indexer.
+
+Vectors are keyed by ``sha256(code_text)``; concurrent builds share a cache through ``flock``.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import sqlite3
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key  BLOB    PRIMARY KEY,
+    row  INTEGER NOT NULL,
+    used INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS state (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Stay under SQLite's default host-parameter limit
+_LOOKUP_CHUNK = 900
+# Vectors file used until the first compaction
+_DEFAULT_VECTORS = "vectors.f32"
+# Compaction keeps the most recently used entries up to this share of max_bytes
+_COMPACT_TARGET = 0.75
+# Rows copied per slice while compacting
+_COPY_ROWS = 65_536
+
+
+class ChunkEmbeddingCache:
+    """Disk-backed map from chunk text to its (normalized) embedding (``max_bytes=0``: no cap)."""
+
+    def __init__(self, root: Path, model_name: str, max_length: int, max_bytes: int = 0) -> None:
+        namespace = hashlib.sha256(f"{model_name}|{max_length}".encode()).hexdigest()[:16]
+        self.dir = root / namespace
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.max_length = max_length
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        self._meta_path = self.dir / "meta.json"
+        self._vectors_path = self.dir / _DEFAULT_VECTORS
+        self.dim: int | None = None
+        self._n_rows = 0
+        self._mmap: np.memmap | None = None
+        self._mmap_path: Path | None = None
+        # Entries touched by this process are stamped with its start time (LRU order)
+        self._stamp = int(time.time())
+
+        self._lock_fh = open(self.dir / "lock", "a")  # noqa: SIM115 - closed by close()
+        # Autocommit; transactions are explicit (see _transaction)
+        self._conn = sqlite3.connect(str(self.dir / "keys.db"), isolation_level=None, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._locked(exclusive=True):
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+            if "used" not in columns:
+                # Caches written before LRU eviction
+                self._conn.execute("ALTER TABLE entries ADD COLUMN used INTEGER NOT NULL DEFAULT 0")
+            self._refresh()
+            if self.dim is None:
+                # No metadata means nothing written yet is trustworthy
+                self._vectors_path.unlink(missing_ok=True)
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._drop_partial_row()
+
+    def encode(self, texts: list[str], encode_fn: Callable[[list[str]], np.ndarray]) -> np.ndarray:
+        """Return embeddings for *texts*, calling *encode_fn* only for cache misses."""
+        keys = [_key(t) for t in texts]
+        hit_vecs: dict[bytes, np.ndarray] = {}
+        with self._locked(exclusive=False):
+            self._refresh()
+            rows = self._lookup(set(keys))
+            if rows:
+                found = list(rows)
+                # Copy out under the lock: a compaction may replace the file afterwards
+                vectors = np.asarray(self._vectors()[[rows[k] for k in found]], dtype=np.float32)
+                hit_vecs = dict(zip(found, vectors))
+                self._touch(found)
+
+        miss_keys: dict[bytes, int] = {}
+        n_miss = 0
+        for i, k in enumerate(keys):
+            if k not in hit_vecs:
+                n_miss += 1
+                miss_keys.setdefault(k, i)
+        self.hits += len(keys) - n_miss
+        self.misses += n_miss
+
+        if miss_keys:
+            miss_texts = [texts[i] for i in miss_keys.values()]
+            encoded = np.asarray(encode_fn(miss_texts), dtype=np.float32)
+            self._store(list(miss_keys), encoded)
+            hit_vecs.update(zip(miss_keys, encoded))
+
+        if not keys:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.stack([hit_vecs[k] for k in keys])
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    def close(self) -> None:
+        self._mmap = self._mmap_path = None
+        self._conn.close()
+        self._lock_fh.close()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        fcntl.flock(self._lock_fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fh, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _refresh(self) -> None:
+        """Re-read the dim, the current vectors file and its row count (lock held)."""
+        if self.dim is None and self._meta_path.exists():
+            self.dim = json.loads(self._meta_path.read_text())["dim"]
+        row = self._conn.execute("SELECT value FROM state WHERE name = 'vectors'").fetchone()
+        self._vectors_path = self.dir / (row[0] if row else _DEFAULT_VECTORS)
+        if self.dim is None or not self._vectors_path.exists():
+            self._n_rows = 0
+        else:
+            self._n_rows = self._vectors_path.stat().st_size // (self.dim * 4)
+
+    def _drop_partial_row(self) -> None:
+        """Truncate a partial row left by an interrupted write (exclusive lock held)."""
+        if self._vectors_path.exists() and self.dim is not None:
+            row_bytes = self.dim * 4
+            if self._vectors_path.stat().st_size % row_bytes:
+                with open(self._vectors_path, "r+b") as fh:
+                    fh.truncate(self._n_rows * row_bytes)
+
+    def _lookup(self, keys: set[bytes]) -> dict[bytes, int]:
+        if self.dim is None or not keys:
+            return {}
+        found: dict[bytes, int] = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), _LOOKUP_CHUNK):
+            part = key_list[start : start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" for _ in part)
+            cur = self._conn.execute(
+                f"SELECT key, row FROM entries WHERE key IN ({placeholders})", part
+            )
+            for key, row in cur.fetchall():
+                if row < self._n_rows:
+                    found[key] = row
+        return found
+
+    def _touch(self, keys: list[bytes]) -> None:
+        """Mark *keys* as used by this build, so compaction keeps them."""
+        with self._transaction() as conn:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                part = keys[start : start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" for _ in part)
+                conn.execute(
+                    f"UPDATE entries SET used = ? WHERE key IN ({placeholders}) AND used < ?",
+                    [self._stamp, *part, self._stamp],
+                )
+
+    def _store(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        with self._locked(exclusive=True):
+            self._refresh()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._meta_path.write_text(
+                    json.dumps(
+                        {
+                            "model": self.model_name,
+                            "max_length": self.max_length,
+                            "dim": self.dim,
+                        }
+                    )
+                )
+            self._drop_partial_row()
+            first_row = self._n_rows
+            # Vectors are flushed before their keys are committed, so a key
+            # never points past the end of the file.
+            with open(self._vectors_path, "ab") as fh:
+                fh.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            self._n_rows += len(keys)
+            with self._transaction() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, row, used) VALUES (?, ?, ?)",
+                    [(k, first_row + i, self._stamp) for i, k in enumerate(keys)],
+                )
+            if self.max_bytes and self._n_rows * self.dim * 4 > self.max_bytes:
+                self._compact()
+
+    def _compact(self) -> None:
+        """Keep the most recently used entries in a new vectors file (exclusive lock held)."""
+        row_bytes = self.dim * 4
+        n_keep = int(self.max_bytes * _COMPACT_TARGET) // row_bytes
+        old_path = self._vectors_path
+        new_path = self.dir / f"vectors.{uuid.uuid4().hex[:12]}.f32"
+        old = self._vectors()
+        n_before = self._n_rows
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "CREATE TEMP TABLE keep AS SELECT key, row FROM entries WHERE row < ? "
+                    "ORDER BY used DESC, row DESC LIMIT ?",
+                    (self._n_rows, n_keep),
+                )
+                rows = np.fromiter(
+                    (r for (r,) in conn.execute("SELECT row FROM keep ORDER BY row")),
+                    dtype=np.int64,
+                )
+                with open(new_path, "wb") as fh:
+                    fh.writelines(
+                        np.ascontiguousarray(old[rows[start : start + _COPY_ROWS]])
+                        for start in range(0, len(rows), _COPY_ROWS)
+                    )
+                conn.execute("CREATE TEMP TABLE remap (old INTEGER PRIMARY KEY, new INTEGER)")
+                conn.executemany(
+                    "INSERT INTO remap (old, new) VALUES (?, ?)",
+                    ((int(r), i) for i, r in enumerate(rows)),
+                )
+                conn.execute("DELETE FROM entries WHERE key NOT IN (SELECT key FROM keep)")
+                conn.execute(
+                    "UPDATE entries SET row = (SELECT new FROM remap WHERE old = entries.row)"
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO state (name, value) VALUES ('vectors', ?)",
+                    (new_path.name,),
+                )
+                conn.execute("DROP TABLE temp.keep")
+                conn.execute("DROP TABLE temp.remap")
+        except BaseException:
+            new_path.unlink(missing_ok=True)
+            raise
+        finally:
+            del old
+            self._mmap = self._mmap_path = None
+
+        # Other processes' memory maps of the old file stay valid until they refresh
+        old_path.unlink(missing_ok=True)
+        self._vectors_path, self._n_rows = new_path, len(rows)
+        self.evicted += n_before - len(rows)
+        log.info(
+            "chunk_cache_compacted",
+            rows_before=n_before,
+            rows_after=len(rows),
+            bytes_after=len(rows) * row_bytes,
+        )
+
+    def _vectors(self) -> np.memmap:
+        if (
+            self._mmap is None
+            or self._mmap_path != self._vectors_path
+            or self._mmap.shape[0] != self._n_rows
+        ):
+            self._mmap = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(self._n_rows, self.dim)
+            )
+            self._mmap_path = self._vectors_path
+        return self._mmap
+
+
+def _key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
@@ -0,0 +1,195 @@
+"""Multi-process chunk embedding for index builds.
+
+Spawned workers each hold a :class:`BiEncoder` and write into one shared-memory output array.
+"""
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing as mp
+import os
+import queue
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+import numpy as np
+
+from hermes.config import EmbedConfig
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+# Tasks per worker and encode call; more tasks even out uneven chunk lengths
+_TASKS_PER_WORKER = 4
+# How often a blocked parent checks that the workers are still alive
+_POLL_SECONDS = 1.0
+
+
+class EmbeddingWorkerPool:
+    """Drop-in for :meth:`BiEncoder.encode_texts` backed by worker processes."""
+
+    def __init__(
+        self,
+        config: EmbedConfig,
+        model_cache_dir: Path | None,
+        workers: int,
+        threads_per_worker: int = 0,
+    ) -> None:
+        from hermes.embed.biencoder import EncodeStats
+
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+        n_cpus = len(cpus) if cpus else os.cpu_count() or 1
+        self.workers = workers
+        self.threads = threads_per_worker or max(1, n_cpus // workers)
+        self.stats = EncodeStats()
+
+        ctx = mp.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = []
+        for i in range(workers):
+            # Give each worker its own cores when there are enough of them
+            cores = None
+            if cpus and len(cpus) >= workers * self.threads:
+                cores = cpus[i * self.threads : (i + 1) * self.threads]
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(config, model_cache_dir, self.threads, cores, self._tasks, self._results),
+                name=f"hermes-embed-{i}",
+                daemon=True,
+            )
+            proc.start()
+            self._procs.append(proc)
+
+        self._shm: SharedMemory | None = None
+        self._capacity = 0
+        try:
+            dims = {self._get_result()[1] for _ in range(workers)}
+        except BaseException:
+            self.close()
+            raise
+        self._dim = dims.pop()
+        log.info("embedding_workers_started", workers=workers, threads_per_worker=self.threads)
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def encode_texts(self, texts: list[str], show_progress: bool = False) -> np.ndarray:
+        """Encode *texts* across the workers, returning float32 (N, dim) in input order."""
+        n = len(texts)
+        if not n:
+            return np.zeros((0, self._dim), dtype=np.float32)
+        shm = self._output_buffer(n)
+        chars = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+        order = np.argsort(-chars, kind="stable")
+        n_tasks = min(n, self.workers * _TASKS_PER_WORKER)
+        cum = np.cumsum(chars[order] + 1)
+        bounds = np.searchsorted(cum, cum[-1] * np.arange(1, n_tasks) / n_tasks)
+        bounds = np.unique(np.concatenate(([0], bounds, [n])))
+        for start, end in itertools.pairwise(bounds):
+            task_texts = [texts[i] for i in order[start:end]]
+            self._tasks.put((shm.name, int(start), task_texts))
+
+        for _ in range(len(bounds) - 1):
+            _, stats = self._get_result()
+            self.stats.merge(stats)
+
+        sorted_out = np.ndarray((n, self._dim), dtype=np.float32, buffer=shm.buf)
+        out = np.empty((n, self._dim), dtype=np.float32)
+        out[order] = sorted_out
+        del sorted_out
+        return out
+
+    def close(self) -> None:
+        """Stop the workers and release the shared output buffer."""
+        for proc in self._procs:
+            if proc.is_alive():
+                self._tasks.put(None)
+        for proc in self._procs:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+        self._procs = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _output_buffer(self, n: int) -> SharedMemory:
+        """Shared (capacity, dim) float32 output array, grown (by doubling) to hold *n* rows."""
+        if self._shm is None or n > self._capacity:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            self._capacity = max(n, 2 * self._capacity)
+            self._shm = SharedMemory(create=True, size=self._capacity * self._dim * 4)
+        return self._shm
+
+    def _get_result(self) -> tuple:
+        while True:
+            try:
+                kind, *payload = self._results.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                dead = [p.name for p in self._procs if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Embedding worker(s) exited unexpectedly: {dead}")
+                continue
+            if kind == "error":
+                raise RuntimeError(f"Embedding worker failed: {payload[0]}")
+            return kind, *payload
+
+
+def _worker_main(
+    config: EmbedConfig,
+    model_cache_dir: Path | None,
+    threads: int,
+    cores: list[int] | None,
+    tasks: mp.Queue,
+    results: mp.Queue,
+) -> None:
+    # Thread pools read these when torch / onnxruntime is first imported
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if cores:
+        os.sched_setaffinity(0, cores)
+    try:
+        from hermes.embed.biencoder import BiEncoder, EncodeStats
+
+        try:
+            import torch
+
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+        config = config.model_copy(
+            update={"onnx_intra_op_threads": threads, "onnx_inter_op_threads": 1}
+        )
+        encoder = BiEncoder(config, model_cache_dir)
+        results.put(("ready", encoder.dim))
+    except Exception as exc:  # noqa: BLE001 - reported to the parent
+        results.put(("error", repr(exc)))
+        return
+
+    shm: SharedMemory | None = None
+    while (task := tasks.get()) is not None:
+        name, start, texts = task
+        try:
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    shm.close()
+                # Spawned workers share the parent's resource tracker, so
+                # attaching here does not make the segment look leaked
+                shm = SharedMemory(name=name)
+            encoder.stats = EncodeStats()
+            vectors = encoder.encode_texts(texts, show_progress=False)
+            out = np.ndarray(
+                vectors.shape, dtype=np.float32, buffer=shm.buf, offset=start * encoder.dim * 4
+            )
+            out[:] = vectors
+            del out
+            results.put(("done", encoder.stats))
+        except Exception as exc:  # noqa: BLE001 - reported to the parent
+            results.put(("error", repr(exc)))
+    if shm is not None:
+        shm.close()
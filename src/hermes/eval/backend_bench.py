@@ -0,0 +1,94 @@
+"""Parity and latency comparison of the torch and ONNX Runtime inference backends."""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from hermes.config import HermesConfig
+from hermes.embed.biencoder import BiEncoder
+from hermes.embed.crossencoder import CrossEncoder
+from hermes.index.chunk_table import ChunkTable
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+# Parity thresholds between backends on the same weights
+MIN_EMBEDDING_COSINE = 0.999
+MAX_SCORE_ABS_DIFF = 1e-2
+
+
+def run_backend_benchmark(
+    config: HermesConfig,
+    queries: list[str],
+    n_passages: int = 50,
+    top_k: int = 10,
+    seed: int = 0,
+) -> dict:
+    """Compare embedding and score parity and per-query latency of both backends on *queries*."""
+    table = ChunkTable.load(config.artifacts_dir / "chunk_table")
+    rng = np.random.default_rng(seed)
+    live = np.flatnonzero(np.asarray(table.live))
+    rows = np.sort(rng.choice(live, size=min(n_passages, len(live)), replace=False))
+    passages = [table.text(pos) for pos in rows]
+
+    outputs: dict[str, dict] = {}
+    latency: list[dict] = []
+    for backend in ("torch", "onnx"):
+        embed_config = config.embed.model_copy(update={"backend": backend})
+        biencoder = BiEncoder(embed_config, config.model_cache_dir)
+        crossencoder = CrossEncoder(embed_config, config.model_cache_dir)
+        biencoder.encode_query(queries[0])
+        crossencoder.score_pairs(queries[0], passages)
+
+        embed_ms, rerank_ms = [], []
+        query_vecs, scores = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            query_vecs.append(biencoder.encode_query(query)[0])
+            embed_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            scores.append(crossencoder.score_pairs(query, passages))
+            rerank_ms.append((time.perf_counter() - t0) * 1000)
+        outputs[backend] = {
+            "queries": np.stack(query_vecs),
+            "passages": biencoder.encode_texts(passages, show_progress=False),
+            "scores": np.stack(scores),
+        }
+        latency.append(
+            {
+                "backend": backend,
+                "embed_query_ms_p50": round(float(np.percentile(embed_ms, 50)), 2),
+                "rerank_ms_p50": round(float(np.percentile(rerank_ms, 50)), 2),
+                "total_ms_per_query": round(float(np.mean(embed_ms) + np.mean(rerank_ms)), 2),
+            }
+        )
+        log.info("backend_benchmark_row", **latency[-1])
+
+    torch_out, onnx_out = outputs["torch"], outputs["onnx"]
+    cosines = np.concatenate(
+        [np.sum(torch_out[key] * onnx_out[key], axis=1) for key in ("queries", "passages")]
+    )
+    score_diff = np.abs(torch_out["scores"] - onnx_out["scores"])
+    k = min(top_k, len(passages))
+    same_order = [
+        np.array_equal(np.argsort(-a, kind="stable")[:k], np.argsort(-b, kind="stable")[:k])
+        for a, b in zip(torch_out["scores"], onnx_out["scores"])
+    ]
+    parity = {
+        "embedding_min_cosine": round(float(cosines.min()), 6),
+        "score_max_abs_diff": round(float(score_diff.max()), 6),
+        "score_mean_abs_diff": round(float(score_diff.mean()), 6),
+        "top_k_order_agreement": round(float(np.mean(same_order)), 4),
+    }
+    parity["ok"] = (
+        parity["embedding_min_cosine"] >= MIN_EMBEDDING_COSINE
+        and parity["score_max_abs_diff"] <= MAX_SCORE_ABS_DIFF
+    )
+    log.info("backend_parity", **parity)
+
+    base = latency[0]["total_ms_per_query"]
+    for row in latency:
+        row["speedup"] = round(base / max(1e-9, row["total_ms_per_query"]), 2)
+    return {"parity": parity, "latency": latency}
@@ -42,7 +42,7 @@ def generate_eval_dataset(
     rng = random.Random(seed)
     pairs: list[EvalPair] = []
 
-    all_ids = store.all_chunk_ids()
+    all_ids = store.live_chunk_ids()
     rng.shuffle(all_ids)
 
     for cid in all_ids:
@@ -91,6 +91,7 @@ def _extract_query(meta: dict) -> str | None:
 
     return None
 
+
 def _extract_python_docstring(code: str) -> str | None:
     try:
         tree = ast.parse(code)
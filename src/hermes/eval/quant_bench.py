@@ -0,0 +1,78 @@
+"""Recall / memory / latency comparison of dense index quantization options."""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from hermes.config import HermesConfig
+from hermes.index.faiss_index import FaissIndex
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_TYPES = ("flat", "fp16", "sq8", "binary")
+
+
+def run_quantization_benchmark(
+    config: HermesConfig,
+    queries: np.ndarray | None = None,
+    index_types: tuple[str, ...] = DEFAULT_TYPES,
+    top_k: int = 10,
+    n_queries: int = 200,
+    seed: int = 0,
+) -> list[dict]:
+    """Build each index type over ``embeddings.npy`` and compare recall, size and speed to flat.
+
+    Without *queries*, ``n_queries`` random chunk embeddings are used as queries.
+    """
+    vectors = np.load(config.artifacts_dir / "embeddings.npy", mmap_mode="r")
+    if queries is None:
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False))
+        queries = np.asarray(vectors[rows], dtype=np.float32)
+    data = np.asarray(vectors, dtype=np.float32)
+
+    results: list[dict] = []
+    baseline: np.ndarray | None = None
+    for index_type in ("flat", *[t for t in index_types if t != "flat"]):
+        index_config = config.index.model_copy(update={"faiss_index_type": index_type})
+        index = FaissIndex(index_config, dim=data.shape[1])
+        t0 = time.perf_counter()
+        index.build(data)
+        build_s = time.perf_counter() - t0
+        if index.index_type == "binary":
+            index.set_rescore_vectors(vectors)
+
+        t0 = time.perf_counter()
+        _, ids = index.search(queries, top_k)
+        search_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        if baseline is None:
+            baseline = ids
+        recall = float(
+            np.mean(
+                [
+                    len(set(row[row >= 0]) & set(ref[ref >= 0])) / max(1, (ref >= 0).sum())
+                    for row, ref in zip(ids, baseline)
+                ]
+            )
+        )
+        results.append(
+            {
+                "index_type": index.index_type,
+                "recall_at_k": round(recall, 4),
+                "memory_bytes": index.nbytes,
+                "search_ms_per_query": round(search_ms, 4),
+                "build_s": round(build_s, 2),
+            }
+        )
+        log.info("quantization_benchmark_row", **results[-1])
+
+    flat = results[0]
+    for row in results:
+        row["memory_reduction"] = round(flat["memory_bytes"] / max(1, row["memory_bytes"]), 1)
+        row["speedup"] = round(
+            flat["search_ms_per_query"] / max(1e-9, row["search_ms_per_query"]), 2
+        )
+    return results
@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
-import json
 import time
 from pathlib import Path
 
 from hermes.config import HermesConfig
-from hermes.eval.dataset import EvalPair, generate_eval_dataset, load_eval_dataset, save_eval_dataset
+from hermes.eval.dataset import (
+    EvalPair,
+    generate_eval_dataset,
+    load_eval_dataset,
+    save_eval_dataset,
+)
 from hermes.eval.metrics import compute_metrics
 from hermes.index.metadata_store import MetadataStore
 from hermes.logging import get_logger
@@ -23,6 +27,7 @@ def run_evaluation(
     output_dir: Path = Path("reports"),
     eval_dataset_path: Path | None = None,
     max_queries: int = 200,
+    compare_quantization: bool = False,
 ) -> Path:
     """Execute evaluation and write the markdown report.
 
@@ -45,12 +50,31 @@ def run_evaluation(
     if not pairs:
         raise ValueError("No evaluation pairs available")
 
-    # Initialize pipeline
     pipeline = SearchPipeline(config)
+    metrics, latency_stats = _evaluate(pipeline, pairs, config)
+    pipeline.close()
 
-    # Run queries and collect results
+    quantization: list[dict] | None = None
+    if compare_quantization:
+        quantization = _compare_quantization(config, pairs)
+
+    # Generate report
+    report_path = output_dir / "eval_report.md"
+    _write_report(report_path, config, pairs, metrics, latency_stats, quantization)
+
+    store.close()
+    log.info("evaluation_complete", report=str(report_path))
+    return report_path
+
+
+def _evaluate(
+    pipeline: SearchPipeline, pairs: list[EvalPair], config: HermesConfig
+) -> tuple[dict[str, float], dict[str, float]]:
+    """Search every pair and return (metrics, latency stats)."""
     query_results: list[dict] = []
     latencies: list[float] = []
+    rerank_times: list[float] = []
+    rerank_pairs: list[int] = []
 
     for pair in pairs:
         req = SearchRequest(
@@ -63,34 +87,73 @@ def run_evaluation(
         resp = pipeline.search(req)
         elapsed_ms = (time.perf_counter() - t0) * 1000
         latencies.append(elapsed_ms)
+        rerank_times.append(resp.timings_ms.get("rerank_ms", 0.0))
+        rerank_pairs.append(resp.rerank_pairs_scored)
 
         retrieval_ids = [r.chunk_id for r in sorted(resp.results, key=lambda x: x.retrieval_rank)]
         rerank_ids = [r.chunk_id for r in resp.results]  # already sorted by final_rank
 
-        query_results.append({
-            "relevant_chunk_id": pair.relevant_chunk_id,
-            "retrieval_ids": retrieval_ids,
-            "rerank_ids": rerank_ids,
-        })
+        query_results.append(
+            {
+                "relevant_chunk_id": pair.relevant_chunk_id,
+                "retrieval_ids": retrieval_ids,
+                "rerank_ids": rerank_ids,
+            }
+        )
 
     # Compute metrics
     metrics = compute_metrics(query_results)
 
     # Latency stats
     latencies.sort()
+    rerank_times.sort()
     latency_stats = {
         "p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else 0,
-        "p95_ms": round(latencies[int(len(latencies) * 0.95)] , 1) if latencies else 0,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 1) if latencies else 0,
         "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0,
+        "rerank_p50_ms": round(rerank_times[len(rerank_times) // 2], 1) if rerank_times else 0,
+        "rerank_pairs_mean": round(sum(rerank_pairs) / len(rerank_pairs), 1) if rerank_pairs else 0,
     }
+    return metrics, latency_stats
 
-    # Generate report
-    report_path = output_dir / "eval_report.md"
-    _write_report(report_path, config, pairs, metrics, latency_stats)
 
-    store.close()
-    log.info("evaluation_complete", report=str(report_path))
-    return report_path
+# (label, EmbedConfig overrides); the first row is the baseline for deltas
+_QUANTIZATION_VARIANTS = (
+    ("fp32", {"biencoder_quantize": "none", "crossencoder_quantize": "none"}),
+    ("int8 cross-encoder", {"biencoder_quantize": "none", "crossencoder_quantize": "int8"}),
+    ("int8 bi- + cross-encoder", {"biencoder_quantize": "int8", "crossencoder_quantize": "int8"}),
+)
+
+
+def _compare_quantization(config: HermesConfig, pairs: list[EvalPair]) -> list[dict]:
+    """Evaluate each quantization variant with a fresh pipeline (no shared caches)."""
+    rows: list[dict] = []
+    for label, overrides in _QUANTIZATION_VARIANTS:
+        variant = config.model_copy(update={"embed": config.embed.model_copy(update=overrides)})
+        pipeline = SearchPipeline(variant)
+        metrics, latency = _evaluate(pipeline, pairs, variant)
+        row = {
+            "variant": label,
+            "mrr@10": metrics["mrr@10_rerank"],
+            "ndcg@10": metrics["ndcg@10_rerank"],
+            "recall@10": metrics["recall@10"],
+            "p50_ms": latency["p50_ms"],
+            "rerank_p50_ms": latency["rerank_p50_ms"],
+            "model_bytes": (
+                pipeline.biencoder.weights_nbytes + pipeline.crossencoder.weights_nbytes
+            ),
+        }
+        pipeline.close()
+        rows.append(row)
+        log.info("quantization_variant_evaluated", **row)
+
+    base = rows[0]
+    for row in rows:
+        for key in ("mrr@10", "ndcg@10", "recall@10"):
+            row[f"{key}_delta"] = round(row[key] - base[key], 4)
+        row["speedup"] = round(base["p50_ms"] / max(1e-9, row["p50_ms"]), 2)
+        row["model_size_reduction"] = round(base["model_bytes"] / max(1, row["model_bytes"]), 2)
+    return rows
 
 
 def _write_report(
@@ -99,6 +162,7 @@ def _write_report(
     pairs: list[EvalPair],
     metrics: dict[str, float],
     latency: dict[str, float],
+    quantization: list[dict] | None = None,
 ) -> None:
     lines = [
         "# HERMES Evaluation Report",
@@ -111,12 +175,13 @@ def _write_report(
         f"- **Top-K retrieve**: {config.search.top_k_retrieve}",
         f"- **Top-K rerank**: {config.search.top_k_rerank}",
         f"- **Max rerank candidates**: {config.search.max_rerank_candidates}",
+        f"- **Rerank mode**: `{config.search.rerank_mode}`",
         "",
         "## Dataset",
         "",
-        f"- **Method**: Auto-generated from code symbols, docstrings, and comments",
+        "- **Method**: Auto-generated from code symbols, docstrings, and comments",
         f"- **Number of queries**: {len(pairs)}",
-        f"- **Positives per query**: 1",
+        "- **Positives per query**: 1",
         "",
         "## Retrieval Metrics",
         "",
@@ -127,30 +192,67 @@ def _write_report(
     for key, val in sorted(metrics.items()):
         lines.append(f"| {key} | {val:.4f} |")
 
-    lines.extend([
-        "",
-        "## Latency",
-        "",
-        "| Stat | ms |",
-        "|------|-----|",
-        f"| p50 | {latency['p50_ms']} |",
-        f"| p95 | {latency['p95_ms']} |",
-        f"| mean | {latency['mean_ms']} |",
-        "",
-        "## Engineering Tradeoffs",
-        "",
-        "- **Bi-encoder speed vs quality**: Smaller models (MiniLM) are fast on CPU "
-        "but may miss nuanced code semantics. Larger models (CodeBERT, BGE) improve "
-        "recall but increase indexing time and memory.",
-        "- **Cross-encoder precision vs latency**: Reranking with a cross-encoder "
-        "significantly improves precision (MRR, nDCG) but adds latency proportional "
-        "to the number of candidates. The `max_rerank_candidates` setting controls this tradeoff.",
-        "- **Dense vs hybrid retrieval**: Hybrid mode (dense + BM25) can improve recall "
-        "for keyword-heavy queries (e.g., exact function names) at the cost of maintaining "
-        "a second index and slightly higher query latency.",
-        "- **Chunk size**: Larger chunks provide more context but reduce retrieval "
-        "granularity. Smaller chunks are more precise but may split logical units.",
-        "",
-    ])
+    lines.extend(
+        [
+            "",
+            "## Latency",
+            "",
+            "| Stat | ms |",
+            "|------|-----|",
+            f"| p50 | {latency['p50_ms']} |",
+            f"| p95 | {latency['p95_ms']} |",
+            f"| mean | {latency['mean_ms']} |",
+            f"| rerank p50 | {latency['rerank_p50_ms']} |",
+            "",
+            f"Cross-encoder pairs scored per query (mean): {latency['rerank_pairs_mean']}",
+            "",
+        ]
+    )
+
+    if quantization:
+        lines.extend(
+            [
+                "## Model Quantization",
+                "",
+                f"Backend: `{config.embed.backend}`. Deltas and savings are relative to fp32.",
+                "The index vectors are not re-embedded: in the int8 bi-encoder row only",
+                "queries use the int8 model, so its retrieval numbers are a lower bound",
+                "until the index is rebuilt with `HERMES_EMBED_BIENCODER_QUANTIZE=int8`.",
+                "",
+                (
+                    "| Variant | MRR@10 | ΔMRR@10 | nDCG@10 | ΔnDCG@10 | Recall@10 | ΔRecall@10 "
+                    "| p50 ms | Rerank p50 ms | Speedup | Model MB | Smaller |"
+                ),
+                "|---|---|---|---|---|---|---|---|---|---|---|---|",
+            ]
+        )
+        for r in quantization:
+            lines.append(
+                f"| {r['variant']} | {r['mrr@10']:.4f} | {r['mrr@10_delta']:+.4f} "
+                f"| {r['ndcg@10']:.4f} | {r['ndcg@10_delta']:+.4f} "
+                f"| {r['recall@10']:.4f} | {r['recall@10_delta']:+.4f} "
+                f"| {r['p50_ms']} | {r['rerank_p50_ms']} | {r['speedup']:.2f}x "
+                f"| {r['model_bytes'] / 1e6:.1f} | {r['model_size_reduction']:.2f}x |"
+            )
+        lines.append("")
+
+    lines.extend(
+        [
+            "## Engineering Tradeoffs",
+            "",
+            "- **Bi-encoder speed vs quality**: Smaller models (MiniLM) are fast on CPU "
+            "but may miss nuanced code semantics. Larger models (CodeBERT, BGE) improve "
+            "recall but increase indexing time and memory.",
+            "- **Cross-encoder precision vs latency**: Reranking with a cross-encoder "
+            "significantly improves precision (MRR, nDCG) but adds latency proportional "
+            "to the number of candidates. The `max_rerank_candidates` setting controls this tradeoff.",
+            "- **Dense vs hybrid retrieval**: Hybrid mode (dense + BM25) can improve recall "
+            "for keyword-heavy queries (e.g., exact function names) at the cost of maintaining "
+            "a second index and slightly higher query latency.",
+            "- **Chunk size**: Larger chunks provide more context but reduce retrieval "
+            "granularity. Smaller chunks are more precise but may split logical units.",
+            "",
+        ]
+    )
 
     path.write_text("\n".join(lines))
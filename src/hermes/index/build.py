@@ -2,24 +2,51 @@
 
 from __future__ import annotations
 
+import multiprocessing as mp
+import os
 import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
+from typing import TYPE_CHECKING, Self
 
 import numpy as np
 
 from hermes.chunking import get_chunker
 from hermes.chunking.base import Chunk
-from hermes.config import HermesConfig
-from hermes.embed.biencoder import BiEncoder
+from hermes.config import ChunkingConfig, HermesConfig
+from hermes.embed.vector_cache import ChunkEmbeddingCache
+from hermes.embed.worker_pool import EmbeddingWorkerPool
+from hermes.index.chunk_table import ChunkTableWriter, stored_row_count
+from hermes.index.embedding_store import EmbeddingWriter
 from hermes.index.faiss_index import FaissIndex
+from hermes.index.manifest import Manifest, content_hash
 from hermes.index.metadata_store import MetadataStore
 from hermes.index.sparse_index import SparseIndex
 from hermes.ingest.repo_scanner import ScannedFile, scan_repository
 from hermes.logging import get_logger
 
+if TYPE_CHECKING:
+    from hermes.embed.biencoder import BiEncoder
+
 log = get_logger(__name__)
 
-def build_index(repo_path: Path, config: HermesConfig) -> dict:
+MANIFEST_FILE = "manifest.json"
+
+
+@dataclass
+class _ChunkedFile:
+    """Result of reading and chunking one scanned file."""
+
+    file: ScannedFile
+    sha256: str
+    chunks: list[Chunk]
+
+
+def build_index(repo_path: Path, config: HermesConfig, incremental: bool = False) -> dict:
     """Run the full indexing pipeline: scan -> chunk -> embed -> build index.
 
     Returns a summary dict with timing and count information.
@@ -34,64 +61,454 @@ def build_index(repo_path: Path, config: HermesConfig) -> dict:
     if not files:
         raise ValueError(f"No indexable files found in {repo_path}")
 
-    # 2. Chunk files
-    log.info("phase_chunk", n_files=len(files))
-    all_chunks: list[Chunk] = []
-    for sf in files:
-        try:
-            source = sf.path.read_text(encoding="utf-8", errors="replace")
-        except Exception as exc:
-            log.warning("read_failed", file=sf.relative_path, error=str(exc))
-            continue
-        chunker = get_chunker(sf.language, config.chunking)
-        chunks = chunker.chunk_file(source, sf.relative_path, sf.language)
-        all_chunks.extend(chunks)
-
-    if not all_chunks:
-        raise ValueError("Chunking produced zero chunks")
-
-    log.info("chunking_complete", n_chunks=len(all_chunks))
-    t_chunk = time.perf_counter()
-
-    # 3. Store metadata
-    db_path = artifacts / "metadata.db"
-    store = MetadataStore(db_path)
-    chunk_ids = store.insert_chunks(all_chunks)
-    log.info("metadata_stored", n_chunks=len(chunk_ids))
-
-    # 4. Embed chunks
-    log.info("phase_embed")
-    biencoder = BiEncoder(config.embed)
-    texts = [c.code_text for c in all_chunks]
-    embeddings = biencoder.encode_texts(texts)
-    t_embed = time.perf_counter()
-
-    # 5. Build FAISS index
-    log.info("phase_faiss_build")
-    faiss_idx = FaissIndex(config.index, dim=biencoder.dim)
-    faiss_idx.build(embeddings)
-    faiss_idx.save(artifacts / "faiss.index")
-
-    # 6. Save raw embeddings for potential re-use
-    np.save(str(artifacts / "embeddings.npy"), embeddings)
-
-    # 7. Build sparse index (for hybrid mode)
-    sparse = SparseIndex()
-    sparse.build(texts)
-    sparse.save(artifacts / "sparse_index.json")
-
-    t_end = time.perf_counter()
-    store.close()
+    if incremental:
+        previous = Manifest.load(artifacts / MANIFEST_FILE)
+        reason = _incremental_blocker(previous, repo_path, config)
+        if reason is None:
+            return _build_incremental(files, previous, config, t0)
+        log.info("incremental_fallback_full_build", reason=reason)
+
+    return _build_full(repo_path, files, config, t0)
+
+
+def _build_full(repo_path: Path, files: list[ScannedFile], config: HermesConfig, t0: float) -> dict:
+    artifacts = config.artifacts_dir
+    store = MetadataStore(artifacts / "metadata.db")
+    manifest = Manifest(
+        repo_root=str(repo_path.resolve()),
+        fingerprint=Manifest.fingerprint_for(config),
+    )
+
+    # 2-7. Chunk -> store metadata -> embed -> FAISS / embeddings.npy / sparse, per batch
+    log.info("phase_stream", n_files=len(files), batch_size=config.index.build_batch_size)
+    t_stream = time.perf_counter()
+    chunk_stats = _ChunkStats()
+    # Chunks are at most max_chars long, so this under-estimates the chunk count
+    expected_chunks = sum(f.size_bytes for f in files) // config.chunking.max_chars
+    try:
+        # The previous rows are replaced in one transaction that commits
+        # only after every other artifact is written
+        with (
+            _StreamingIndexer(
+                config, store, manifest, append=False, expected_chunks=expected_chunks
+            ) as indexer,
+            store.bulk_load(expected_chunks, replace=True),
+        ):
+            for cf in _iter_chunked_files(files, config, chunk_stats):
+                indexer.add_file(cf)
+            indexer.flush()
+
+            if indexer.n_chunks == 0:
+                raise ValueError("Chunking produced zero chunks")
+
+            indexer.finish()
+
+        # 8. Record the manifest last, so an interrupted build never looks complete
+        manifest.save(artifacts / MANIFEST_FILE)
+        t_end = time.perf_counter()
+    finally:
+        store.close()
+
+    summary = {
+        "n_files": len(files),
+        "n_chunks": indexer.n_chunks,
+        "embedding_dim": indexer.dim,
+        "faiss_index_type": indexer.faiss_index_type,
+        "biencoder_model": config.embed.biencoder_model,
+        "chunk_workers": chunk_stats.workers,
+        "chunk_files_per_sec_per_worker": chunk_stats.files_per_sec_per_worker(),
+        **indexer.cache_stats,
+        **indexer.embed_stats,
+        "time_chunk_s": round(chunk_stats.wait_s, 2),
+        "time_embed_s": round(indexer.embed_s, 2),
+        "time_stream_s": round(t_end - t_stream, 2),
+        "time_total_s": round(t_end - t0, 2),
+        # Scanning is excluded, so the rate compares across worker counts
+        "chunks_per_sec": round(indexer.n_chunks / (t_end - t_stream), 1),
+    }
+    log.info("indexing_complete", **summary)
+    return summary
+
+
+def _build_incremental(
+    files: list[ScannedFile],
+    manifest: Manifest,
+    config: HermesConfig,
+    t0: float,
+) -> dict:
+    artifacts = config.artifacts_dir
+    diff = manifest.diff(files)
+
+    store = MetadataStore(artifacts / "metadata.db")
+    stale_ids: list[int] = []
+    for rel in diff.deleted:
+        stale_ids.extend(manifest.files.pop(rel).chunk_ids)
+
+    # 2-7. Chunk only files whose size/mtime changed, confirm by content hash,
+    # and stream the changed ones through the indexer
+    log.info("phase_stream", n_files=len(diff.candidates), n_unchanged=len(diff.unchanged))
+    chunk_stats = _ChunkStats()
+    n_added = n_modified = 0
+    expected_chunks = sum(f.size_bytes for f in diff.candidates) // config.chunking.max_chars
+    try:
+        positions = {cid: pos for pos, cid in enumerate(store.all_chunk_ids())}
+        with (
+            _StreamingIndexer(config, store, manifest, append=True) as indexer,
+            store.bulk_load(expected_chunks),
+        ):
+            for cf in _iter_chunked_files(diff.candidates, config, chunk_stats):
+                rec = manifest.files.get(cf.file.relative_path)
+                if rec is not None and rec.sha256 == cf.sha256:
+                    # Touched but identical: refresh size/mtime, keep existing chunks
+                    manifest.record(cf.file, cf.sha256, rec.chunk_ids)
+                    continue
+                if rec is None:
+                    n_added += 1
+                else:
+                    n_modified += 1
+                    stale_ids.extend(rec.chunk_ids)
+                indexer.add_file(cf)
+            indexer.flush()
+            store.tombstone(stale_ids)
+
+            indexer.remove_positions([positions[cid] for cid in stale_ids if cid in positions])
+            indexer.finish()
+        manifest.save(artifacts / MANIFEST_FILE)
+
+        t_end = time.perf_counter()
+        n_live = store.count()
+    finally:
+        store.close()
 
     summary = {
+        "mode": "incremental",
         "n_files": len(files),
-        "n_chunks": len(all_chunks),
-        "embedding_dim": biencoder.dim,
+        "n_files_added": n_added,
+        "n_files_modified": n_modified,
+        "n_files_deleted": len(diff.deleted),
+        "n_chunks": n_live,
+        "n_chunks_embedded": indexer.n_chunks,
+        "n_chunks_tombstoned": len(stale_ids),
         "biencoder_model": config.embed.biencoder_model,
-        "time_chunk_s": round(t_chunk - t0, 2),
-        "time_embed_s": round(t_embed - t_chunk, 2),
+        "chunk_workers": chunk_stats.workers,
+        "chunk_files_per_sec_per_worker": chunk_stats.files_per_sec_per_worker(),
+        **indexer.cache_stats,
+        **indexer.embed_stats,
+        "time_chunk_s": round(chunk_stats.wait_s, 2),
+        "time_embed_s": round(indexer.embed_s, 2),
         "time_total_s": round(t_end - t0, 2),
-        "chunks_per_sec": round(len(all_chunks) / (t_end - t0), 1),
     }
     log.info("indexing_complete", **summary)
     return summary
+
+
+class _StreamingIndexer:
+    """Pushes chunked files through metadata insert -> embed -> index writes in batches.
+
+    On exit it releases its workers, and discards the partly written artifacts after an error.
+    """
+
+    def __init__(
+        self,
+        config: HermesConfig,
+        store: MetadataStore,
+        manifest: Manifest,
+        append: bool,
+        expected_chunks: int | None = None,
+    ) -> None:
+        self.config = config
+        self.store = store
+        self.manifest = manifest
+        self.append = append
+        self.expected_chunks = expected_chunks
+        self.n_chunks = 0
+        self.embed_s = 0.0
+
+        self._buffer: list[_ChunkedFile] = []
+        self._n_buffered = 0
+        self._cache: ChunkEmbeddingCache | None = None
+        if config.embed.chunk_cache_enabled:
+            self._cache = ChunkEmbeddingCache(
+                config.embed.chunk_cache_dir or config.artifacts_dir / "embedding_cache",
+                config.embed.biencoder_id,
+                config.embed.biencoder_max_length,
+                max_bytes=config.embed.chunk_cache_max_mb * 1024 * 1024,
+            )
+        self._biencoder: BiEncoder | EmbeddingWorkerPool | None = None
+        self._faiss: FaissIndex | None = None
+        self._writer: EmbeddingWriter | None = None
+        self._sparse: SparseIndex | None = None
+        try:
+            self._table = self._open_table()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+    @property
+    def dim(self) -> int:
+        if self._biencoder is None and self._cache is not None and self._cache.dim is not None:
+            return self._cache.dim
+        return self._get_biencoder().dim
+
+    @property
+    def faiss_index_type(self) -> str | None:
+        return self._faiss.index_type if self._faiss is not None else None
+
+    @property
+    def cache_stats(self) -> dict:
+        if self._cache is None:
+            return {}
+        return {
+            "embed_cache_hits": self._cache.hits,
+            "embed_cache_misses": self._cache.misses,
+            "embed_cache_evicted": self._cache.evicted,
+        }
+
+    @property
+    def embed_stats(self) -> dict:
+        """Padding efficiency and model throughput of the chunks sent to the bi-encoder."""
+        if self._biencoder is None:
+            return {}
+        return self._biencoder.stats.as_dict()
+
+    def add_file(self, cf: _ChunkedFile) -> None:
+        self._buffer.append(cf)
+        self._n_buffered += len(cf.chunks)
+        if self._n_buffered >= self.config.index.build_batch_size:
+            self.flush()
+
+    def remove_positions(self, positions: list[int]) -> None:
+        """Drop stale documents from the sparse index (FAISS relies on tombstones)."""
+        if positions:
+            self._get_sparse().remove(positions)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer, self._n_buffered = self._buffer, [], 0
+
+        chunks = [c for cf in batch for c in cf.chunks]
+        chunk_ids = self.store.insert_chunks(chunks)
+        offset = 0
+        for cf in batch:
+            n = len(cf.chunks)
+            self.manifest.record(cf.file, cf.sha256, chunk_ids[offset : offset + n])
+            offset += n
+        if not chunks:
+            return
+        self._table.add(
+            (cid, c.file_path, c.language, c.start_line, c.end_line, c.code_text, c.symbol_name)
+            for cid, c in zip(chunk_ids, chunks)
+        )
+
+        texts = [c.code_text for c in chunks]
+        t0 = time.perf_counter()
+        embeddings = self._encode(texts)
+        self.embed_s += time.perf_counter() - t0
+
+        self._get_faiss().add(embeddings)
+        self._get_writer().append(embeddings)
+        self._get_sparse().add(texts)
+        self.n_chunks += len(chunks)
+        log.info("batch_indexed", n_chunks=len(chunks), total_chunks=self.n_chunks)
+
+    def finish(self) -> None:
+        """Flush the last batch and persist every artifact that was touched."""
+        self.flush()
+        artifacts = self.config.artifacts_dir
+        self.close()
+        if self._writer is not None:
+            self._writer.close()
+        if self._faiss is not None:
+            self._faiss.finalize()
+            self._faiss.save(artifacts / "faiss.index")
+        if self._sparse is not None:
+            self._sparse.save(artifacts / "sparse_index")
+        # Live flags come from the committed tombstones, including this run's
+        self._table.close(self.store.tombstoned_ids())
+
+    def close(self) -> None:
+        """Stop the embedding workers and close the chunk cache (safe to repeat)."""
+        if isinstance(self._biencoder, EmbeddingWorkerPool):
+            self._biencoder.close()
+        if self._cache is not None:
+            self._cache.close()
+
+    def discard(self) -> None:
+        """Release everything after a failed build, leaving the previous artifacts in place."""
+        self.close()
+        if self._writer is not None:
+            self._writer.discard()
+        self._table.discard()
+
+    def _open_table(self) -> ChunkTableWriter:
+        """Start the chunk table, carrying the previous one's rows over when it is current."""
+        path = self.config.artifacts_dir / "chunk_table"
+        if not self.append:
+            return ChunkTableWriter(path, self.config.index)
+        n_rows = self.store.row_count()
+        if stored_row_count(path) == n_rows:
+            return ChunkTableWriter(path, self.config.index, base=path)
+        log.warning("chunk_table_rebuilt_from_store", n_rows=n_rows)
+        table = ChunkTableWriter(path, self.config.index)
+        table.add(self.store.iter_rows())
+        return table
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        """Embed *texts*, sending only chunk-cache misses to the model."""
+        if self._cache is None:
+            return self._get_biencoder().encode_texts(texts, show_progress=False)
+        return self._cache.encode(
+            texts, lambda misses: self._get_biencoder().encode_texts(misses, show_progress=False)
+        )
+
+    def _get_biencoder(self) -> BiEncoder | EmbeddingWorkerPool:
+        if self._biencoder is None:
+            embed = self.config.embed
+            if embed.workers > 1:
+                self._biencoder = EmbeddingWorkerPool(
+                    embed, self.config.model_cache_dir, embed.workers, embed.worker_threads
+                )
+            else:
+                from hermes.embed.biencoder import BiEncoder
+
+                self._biencoder = BiEncoder(embed, self.config.model_cache_dir)
+        return self._biencoder
+
+    def _get_faiss(self) -> FaissIndex:
+        if self._faiss is None:
+            self._faiss = FaissIndex(
+                self.config.index, dim=self.dim, expected_n=self.expected_chunks
+            )
+            if self.append:
+                self._faiss.load(self.config.artifacts_dir / "faiss.index")
+        return self._faiss
+
+    def _get_writer(self) -> EmbeddingWriter:
+        if self._writer is None:
+            self._writer = EmbeddingWriter(
+                self.config.artifacts_dir / "embeddings.npy", self.dim, append=self.append
+            )
+        return self._writer
+
+    def _get_sparse(self) -> SparseIndex:
+        if self._sparse is None:
+            self._sparse = SparseIndex()
+            if self.append:
+                self._sparse.load(self.config.artifacts_dir / "sparse_index")
+        return self._sparse
+
+
+def _incremental_blocker(
+    manifest: Manifest | None, repo_path: Path, config: HermesConfig
+) -> str | None:
+    """Return why an incremental build is not possible, or None if it is."""
+    artifacts = config.artifacts_dir
+    if manifest is None:
+        return "no_manifest"
+    if not manifest.is_compatible(repo_path, config):
+        return "settings_or_repo_changed"
+    for name in ("metadata.db", "faiss.index", "embeddings.npy", "sparse_index"):
+        if not (artifacts / name).exists():
+            return f"missing_{name}"
+
+    store = MetadataStore(artifacts / "metadata.db")
+    n_rows = store.row_count()
+    n_live = store.count()
+    store.close()
+    n_vectors = np.load(str(artifacts / "embeddings.npy"), mmap_mode="r").shape[0]
+    if n_rows != n_vectors:
+        return "artifacts_out_of_sync"
+    # Tombstoned positions stay in every index until a full rebuild compacts them
+    if n_rows and (n_rows - n_live) / n_rows > config.index.max_tombstone_ratio:
+        return "tombstone_ratio_exceeded"
+    return None
+
+
+def _iter_chunked_files(
+    files: list[ScannedFile], config: HermesConfig, stats: _ChunkStats | None = None
+) -> Iterator[_ChunkedFile]:
+    """Yield chunked files in scan order, fanning work out to a spawned process pool."""
+    stats = stats if stats is not None else _ChunkStats()
+    workers = config.chunking.workers
+    per_task = config.chunking.files_per_task
+    batches = [files[i : i + per_task] for i in range(0, len(files), per_task)]
+    workers = max(1, min(workers, len(batches)))
+    stats.workers = workers
+
+    if workers == 1:
+        for batch in batches:
+            t0 = time.perf_counter()
+            pid, elapsed, results = _chunk_batch(batch, config.chunking)
+            stats.record(pid, len(batch), elapsed)
+            stats.wait_s += time.perf_counter() - t0
+            yield from results
+        return
+
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        pending: deque[tuple[Future, int]] = deque()
+        remaining = iter(batches)
+        for batch in islice(remaining, window):
+            pending.append((pool.submit(_chunk_batch, batch, config.chunking), len(batch)))
+        while pending:
+            future, n_files = pending.popleft()
+            t0 = time.perf_counter()
+            pid, elapsed, results = future.result()
+            stats.wait_s += time.perf_counter() - t0
+            stats.record(pid, n_files, elapsed)
+            for batch in islice(remaining, 1):
+                pending.append((pool.submit(_chunk_batch, batch, config.chunking), len(batch)))
+            yield from results
+
+
+@dataclass
+class _ChunkStats:
+    """Per-worker throughput of the chunking stage."""
+
+    workers: int = 1
+    # Time the indexer spent blocked waiting for chunked files
+    wait_s: float = 0.0
+    files_by_worker: dict[int, int] = field(default_factory=dict)
+    busy_s_by_worker: dict[int, float] = field(default_factory=dict)
+
+    def record(self, pid: int, n_files: int, elapsed: float) -> None:
+        self.files_by_worker[pid] = self.files_by_worker.get(pid, 0) + n_files
+        self.busy_s_by_worker[pid] = self.busy_s_by_worker.get(pid, 0.0) + elapsed
+
+    def files_per_sec_per_worker(self) -> list[float]:
+        rates = (
+            n / self.busy_s_by_worker[pid]
+            for pid, n in self.files_by_worker.items()
+            if self.busy_s_by_worker[pid] > 0
+        )
+        return sorted((round(r, 1) for r in rates), reverse=True)
+
+
+def _chunk_batch(
+    files: list[ScannedFile], chunking: ChunkingConfig
+) -> tuple[int, float, list[_ChunkedFile]]:
+    """Worker entry point: chunk a batch of files. Returns (pid, busy seconds, results)."""
+    t0 = time.perf_counter()
+    results: list[_ChunkedFile] = []
+    for sf in files:
+        try:
+            data = sf.path.read_bytes()
+        except Exception as exc:
+            log.warning("read_failed", file=sf.relative_path, error=str(exc))
+            continue
+        # Decode like Path.read_text(errors="replace"), including newline translation
+        source = data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+        chunker = get_chunker(sf.language, chunking)
+        chunks = chunker.chunk_file(source, sf.relative_path, sf.language)
+        results.append(_ChunkedFile(file=sf, sha256=content_hash(data), chunks=chunks))
+    return os.getpid(), time.perf_counter() - t0, results
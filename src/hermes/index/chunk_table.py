@@ -0,0 +1,285 @@
+"""Columnar chunk metadata for the search hot path.
+
+Builds write it next to the other artifacts; SQLite stays the source of truth.
+"""
+
+from __future__ import annotations
+
+import json
+import shutil
+import tempfile
+from collections.abc import Iterable
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+from hermes.config import IndexConfig
+from hermes.index.embedding_store import NpyWriter
+from hermes.index.metadata_store import MetadataStore
+from hermes.index.snippet_store import SnippetStore, SnippetStoreWriter
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+FORMAT_VERSION = 2
+
+_ARRAYS = (
+    "chunk_ids",
+    "start_lines",
+    "end_lines",
+    "language_ids",
+    "path_ids",
+    "symbol_ids",
+    "live",
+)
+# Columns written as rows arrive (the id and live columns are written on close)
+_COLUMNS = {"chunk_ids": np.int64, "start_lines": np.int32, "end_lines": np.int32}
+# (strings.json key, id column)
+_STRING_COLUMNS = (("paths", "path_ids"), ("languages", "language_ids"), ("symbols", "symbol_ids"))
+# Rows per slice when streaming rows or copying columns
+_SLICE_ROWS = 65_536
+
+
+class ChunkTable:
+    """Read-mostly columnar copy of the ``chunks`` table, in position order.
+
+    Strings are interned in sorted order, so ``path_ids`` also rank paths (``FilterIndex`` uses it).
+    """
+
+    def __init__(
+        self,
+        arrays: dict[str, np.ndarray],
+        strings: dict[str, list[str]],
+        snippets: SnippetStore,
+    ) -> None:
+        self.chunk_ids: np.ndarray = arrays["chunk_ids"]
+        self.start_lines: np.ndarray = arrays["start_lines"]
+        self.end_lines: np.ndarray = arrays["end_lines"]
+        self.language_ids: np.ndarray = arrays["language_ids"]
+        self.path_ids: np.ndarray = arrays["path_ids"]
+        self.symbol_ids: np.ndarray = arrays["symbol_ids"]
+        self.live: np.ndarray = arrays["live"]
+        self.languages: list[str] = strings["languages"]
+        self.paths: list[str] = strings["paths"]
+        self.symbols: list[str] = strings["symbols"]
+        self.snippets = snippets
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @property
+    def n_live(self) -> int:
+        return int(np.count_nonzero(self.live))
+
+    @classmethod
+    def from_store(
+        cls, store: MetadataStore, config: IndexConfig, path: Path | None = None
+    ) -> ChunkTable:
+        """Build the table from *store*: memory-mapped at *path*, or in memory only without one."""
+        if path is None:
+            with tempfile.TemporaryDirectory(prefix="hermes-chunk-table-") as tmp:
+                return cls._write_from_store(store, config, Path(tmp) / "chunk_table", mmap=False)
+        return cls._write_from_store(store, config, path, mmap=True)
+
+    @classmethod
+    def load(cls, path: Path, cache_blocks: int = 256, mmap: bool = True) -> ChunkTable:
+        """Open the table at *path*; without *mmap* its files are read into memory."""
+        meta = json.loads((path / "meta.json").read_text())
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk table version in {path}: {meta.get('version')}")
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in _ARRAYS}
+        strings = json.loads((path / "strings.json").read_text())
+        snippets = SnippetStore.load(path / "snippets", cache_blocks, mmap=mmap)
+        table = cls(arrays, strings, snippets)
+        log.info("chunk_table_loaded", path=str(path), n_chunks=len(table), mmap=mmap)
+        return table
+
+    @classmethod
+    def _write_from_store(
+        cls, store: MetadataStore, config: IndexConfig, path: Path, mmap: bool
+    ) -> ChunkTable:
+        writer = ChunkTableWriter(path, config)
+        writer.add(store.iter_rows())
+        writer.close(store.tombstoned_ids())
+        return cls.load(path, config.snippet_cache_blocks, mmap=mmap)
+
+    def positions(self, chunk_ids: list[int]) -> np.ndarray:
+        """Index positions of *chunk_ids*; -1 for ids not in the table."""
+        ids = np.asarray(chunk_ids, dtype=np.int64)
+        if not len(self.chunk_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.chunk_ids, ids), len(self.chunk_ids) - 1)
+        return np.where(self.chunk_ids[pos] == ids, pos, -1)
+
+    def text(self, pos: int) -> str:
+        return self.snippets.get(int(pos))
+
+    def texts(self, chunk_ids: list[int]) -> dict[int, str]:
+        """code_text by chunk_id for the ids present in the table."""
+        return {
+            cid: self.text(int(pos))
+            for cid, pos in zip(chunk_ids, self.positions(chunk_ids))
+            if pos >= 0
+        }
+
+    def get_chunks_by_ids(self, chunk_ids: list[int], with_text: bool = True) -> list[dict]:
+        """Rows like ``MetadataStore.get_chunks_by_ids``; ``code_text`` only with *with_text*."""
+        rows = []
+        for cid, pos in zip(chunk_ids, self.positions(chunk_ids)):
+            if pos < 0:
+                continue
+            rows.append(
+                {
+                    "chunk_id": cid,
+                    "file_path": self.paths[self.path_ids[pos]],
+                    "language": self.languages[self.language_ids[pos]],
+                    "start_line": int(self.start_lines[pos]),
+                    "end_line": int(self.end_lines[pos]),
+                    "code_text": self.text(pos) if with_text else None,
+                    "symbol_name": self.symbols[self.symbol_ids[pos]],
+                }
+            )
+        return rows
+
+
+class ChunkTableWriter:
+    """Writes a chunk table directory from rows fed in position order.
+
+    With *base* (the previous table, when rows were only appended) its rows are carried over.
+    """
+
+    def __init__(self, path: Path, config: IndexConfig, base: Path | None = None) -> None:
+        self.path = path
+        self.n_rows = 0
+        self._tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        self._tmp.mkdir(parents=True)
+        self._strings: dict[str, dict[str, int]] = {name: {} for name, _ in _STRING_COLUMNS}
+        self._columns = {
+            name: NpyWriter(self._tmp / f"{name}.npy", dtype) for name, dtype in _COLUMNS.items()
+        }
+        self._provisional = {
+            key: NpyWriter(self._tmp / f"{key}.provisional.npy", np.int32)
+            for _, key in _STRING_COLUMNS
+        }
+        self._snippets = SnippetStoreWriter(
+            self._tmp / "snippets",
+            level=config.snippet_zstd_level,
+            block_bytes=config.snippet_block_bytes,
+            dict_bytes=config.snippet_dict_bytes,
+            base=base / "snippets" if base is not None else None,
+        )
+        if base is not None:
+            try:
+                self._copy_base(base)
+            except BaseException:
+                self.discard()
+                raise
+
+    def add(self, rows: Iterable[tuple]) -> None:
+        """Append rows shaped like ``MetadataStore.iter_rows()``, in chunk_id order."""
+        it = iter(rows)
+        while batch := list(islice(it, _SLICE_ROWS)):
+            chunk_ids, paths, languages, starts, ends, texts, symbols = zip(*batch)
+            for name, values in (
+                ("chunk_ids", chunk_ids),
+                ("start_lines", starts),
+                ("end_lines", ends),
+            ):
+                self._columns[name].append(np.array(values, dtype=_COLUMNS[name]))
+            for (name, key), values in zip(_STRING_COLUMNS, (paths, languages, symbols)):
+                ids = self._strings[name]
+                self._provisional[key].append(
+                    np.array([ids.setdefault(v, len(ids)) for v in values], dtype=np.int32)
+                )
+            for text in texts:
+                self._snippets.add(text)
+            self.n_rows += len(batch)
+
+    def close(self, tombstoned: set[int]) -> None:
+        """Sort the strings, write the id and live columns, and swap the table in."""
+        try:
+            n_live = self._finish(tombstoned)
+        except BaseException:
+            self.discard()
+            raise
+        # Swap directories; memory maps of the old files stay valid until closed
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._tmp.rename(self.path)
+        log.info("chunk_table_saved", path=str(self.path), n_chunks=self.n_rows, n_live=n_live)
+
+    def discard(self) -> None:
+        """Drop the partly written table, leaving the previous one in place."""
+        self._snippets.discard()
+        for writer in (*self._columns.values(), *self._provisional.values()):
+            writer.discard()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def _copy_base(self, base: Path) -> None:
+        meta = json.loads((base / "meta.json").read_text())
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk table version in {base}: {meta.get('version')}")
+        strings = json.loads((base / "strings.json").read_text())
+        for name, _ in _STRING_COLUMNS:
+            # Sorted, so a base id is also a valid provisional id
+            self._strings[name] = {v: i for i, v in enumerate(strings[name])}
+        writers = {**self._columns, **self._provisional}
+        for name, writer in writers.items():
+            _copy_slices(np.load(base / f"{name}.npy", mmap_mode="r"), writer)
+        self.n_rows = meta["n_chunks"]
+
+    def _finish(self, tombstoned: set[int]) -> int:
+        self._snippets.close()
+        for writer in self._columns.values():
+            writer.close()
+        strings: dict[str, list[str]] = {}
+        for name, key in _STRING_COLUMNS:
+            ids = self._strings[name]
+            strings[name] = sorted(ids)
+            remap = np.empty(len(ids), dtype=np.int32)
+            for rank, value in enumerate(strings[name]):
+                remap[ids[value]] = rank
+            provisional = self._provisional[key]
+            provisional.close()
+            with NpyWriter(self._tmp / f"{key}.npy", np.int32) as writer:
+                _copy_slices(np.load(provisional.path, mmap_mode="r"), writer, remap)
+            provisional.path.unlink()
+
+        chunk_ids = np.load(self._tmp / "chunk_ids.npy", mmap_mode="r")
+        dead = np.array(sorted(tombstoned), dtype=np.int64)
+        n_live = 0
+        with NpyWriter(self._tmp / "live.npy", np.bool_) as writer:
+            for start in range(0, len(chunk_ids), _SLICE_ROWS):
+                live = ~np.isin(chunk_ids[start : start + _SLICE_ROWS], dead)
+                writer.append(live)
+                n_live += int(np.count_nonzero(live))
+        del chunk_ids
+
+        (self._tmp / "strings.json").write_text(json.dumps(strings))
+        (self._tmp / "meta.json").write_text(
+            json.dumps(
+                {
+                    "version": FORMAT_VERSION,
+                    "n_chunks": self.n_rows,
+                    "n_live": n_live,
+                }
+            )
+        )
+        return n_live
+
+
+def stored_row_count(path: Path) -> int:
+    """Rows in the chunk table at *path* (tombstoned included); -1 if none is readable."""
+    try:
+        meta = json.loads((path / "meta.json").read_text())
+    except (OSError, ValueError):
+        return -1
+    return meta["n_chunks"] if meta.get("version") == FORMAT_VERSION else -1
+
+
+def _copy_slices(values: np.ndarray, writer: NpyWriter, remap: np.ndarray | None = None) -> None:
+    for start in range(0, len(values), _SLICE_ROWS):
+        part = values[start : start + _SLICE_ROWS]
+        writer.append(remap[part] if remap is not None else part)
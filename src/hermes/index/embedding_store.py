@@ -0,0 +1,132 @@
+"""Append-only ``.npy`` writers for chunk embeddings and other per-position arrays.
+
+Search may memory-map these files, so rewrites go through ``os.replace`` and appends only grow them.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+import numpy.typing as npt
+
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+_MAGIC = b"\x93NUMPY\x01\x00"
+# Preamble (magic + version + uint16 length) plus header, padded to 64 bytes
+_HEADER_BYTES = 128
+
+
+class NpyWriter:
+    """Streams rows of a fixed dtype and row shape into an ``.npy`` file, creating or appending."""
+
+    def __init__(
+        self,
+        path: Path,
+        dtype: npt.DTypeLike,
+        row_shape: tuple[int, ...] = (),
+        append: bool = False,
+    ) -> None:
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.n_rows = 0
+        # Rows already in an appended-to file; discard() truncates back to them
+        self._base_rows = 0
+        # New files are written here and renamed over *path* on close
+        self._tmp: Path | None = None
+        self._row_bytes = self.dtype.itemsize * int(np.prod(self.row_shape))
+
+        if append and path.exists():
+            self._fh = open(path, "r+b")  # noqa: SIM115 - closed by close()
+            version = np.lib.format.read_magic(self._fh)
+            if version != (1, 0):
+                self._fh.close()
+                raise ValueError(f"{path} uses unsupported .npy version {version}")
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(self._fh)
+            if fortran or dtype != self.dtype or tuple(shape[1:]) != self.row_shape:
+                self._fh.close()
+                raise ValueError(f"{path} is not a {self.dtype} (N, *{self.row_shape}) array")
+            self._data_offset = self._fh.tell()
+            self.n_rows = self._base_rows = shape[0]
+            self._fh.seek(self._data_offset + self.n_rows * self._row_bytes)
+            self._fh.truncate()
+        else:
+            self._tmp = path.with_name(path.name + ".tmp")
+            self._fh = open(self._tmp, "wb")  # noqa: SIM115 - closed by close()
+            self._data_offset = _HEADER_BYTES
+            self._write_header()
+
+    def append(self, rows: np.ndarray) -> None:
+        rows = np.asarray(rows)
+        if rows.shape[1:] != self.row_shape:
+            raise ValueError(f"Expected rows of shape {self.row_shape}, got {rows.shape}")
+        self._fh.write(np.ascontiguousarray(rows, dtype=self.dtype).tobytes())
+        self.n_rows += rows.shape[0]
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        self._write_header()
+        self._fh.close()
+        if self._tmp is not None:
+            os.replace(self._tmp, self.path)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is not None:
+            # Leave the previous file in place rather than a partial one
+            self.discard()
+            return
+        self.close()
+
+    def discard(self) -> None:
+        """Close without changing *path*: a new file is deleted, appended rows are dropped."""
+        if self._fh.closed:
+            return
+        if self._tmp is None:
+            # The header still declares only the rows that were there before
+            self._fh.truncate(self._data_offset + self._base_rows * self._row_bytes)
+            self._fh.close()
+            self.n_rows = self._base_rows
+            return
+        self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def _write_header(self) -> None:
+        shape = (self.n_rows, *self.row_shape)
+        header = repr({"descr": self.dtype.str, "fortran_order": False, "shape": shape})
+        header_len = self._data_offset - len(_MAGIC) - 2
+        body = header.encode("latin1")
+        if len(body) + 1 > header_len:
+            raise ValueError(f"Header for shape {shape} does not fit")
+        body = body.ljust(header_len - 1) + b"\n"
+
+        pos = self._fh.tell()
+        self._fh.seek(0)
+        self._fh.write(_MAGIC + struct.pack("<H", header_len) + body)
+        self._fh.seek(max(pos, self._data_offset))
+
+
+class EmbeddingWriter(NpyWriter):
+    """Streams float32 rows into an ``.npy`` file, creating or appending."""
+
+    def __init__(self, path: Path, dim: int, append: bool = False) -> None:
+        self.dim = dim
+        super().__init__(path, np.float32, (dim,), append=append)
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        super().close()
+        log.info("embeddings_saved", path=str(self.path), n_rows=self.n_rows, dim=self.dim)
+
+    def __enter__(self) -> Self:
+        return self
@@ -2,6 +2,10 @@
 
 from __future__ import annotations
 
+import json
+import math
+import os
+import time
 from pathlib import Path
 
 import faiss
@@ -12,54 +16,423 @@ from hermes.logging import get_logger
 
 log = get_logger(__name__)
 
+# Index types that need a training sample before vectors can be added
+_TRAINED_TYPES = {"ivf_flat", "ivf_pq", "opq_ivf_pq"}
+# k-means wants ~40 points per centroid
+_TRAIN_POINTS_PER_CENTROID = 40
+# SQ8 learns per-dimension value ranges; this many vectors are plenty
+_SQ8_TRAIN_POINTS = 10_000
+# Index types that only visit part of the corpus per query
+_PARTIAL_TYPES = _TRAINED_TYPES | {"hnsw"}
+# Full-precision vectors written by the build, used to re-score binary candidates
+# and to answer selective filtered searches on partial indexes exactly
+_RESCORE_FILE = "embeddings.npy"
+# Upper bound on the widened HNSW efSearch of a filtered search
+_MAX_FILTER_EF = 4096
+# Maps flat/HNSW codes; missing from older faiss releases, which read those into memory
+_IO_FLAG_MMAP_IFC = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+
+
+class PositionMask:
+    """Boolean mask over index positions, with its FAISS bitmap packed once."""
+
+    __slots__ = ("_bitmap", "mask", "n_selected")
+
+    def __init__(self, mask: np.ndarray) -> None:
+        self.mask = mask
+        self.n_selected = int(np.count_nonzero(mask))
+        self._bitmap: np.ndarray | None = None
+
+    def bitmap(self, n: int) -> np.ndarray:
+        """Little-endian bit per position, at least ``ceil(n / 8)`` bytes long."""
+        bitmap = self._bitmap
+        if bitmap is None or len(bitmap) < (n + 7) // 8:
+            packed = np.packbits(self.mask[:n], bitorder="little")
+            # Sized to n so FAISS never reads past the bitmap
+            bitmap = np.zeros(max((n + 7) // 8, len(packed)), dtype=np.uint8)
+            bitmap[: len(packed)] = packed
+            self._bitmap = bitmap
+        return bitmap
+
+
 class FaissIndex:
-    """Build, save, load, and query a FAISS index."""
+    """Build, save, load, and query a FAISS index.
+
+    The index type and its parameters are saved next to it (``<name>_meta.json``).
+    """
 
-    def __init__(self, config: IndexConfig, dim: int) -> None:
+    def __init__(self, config: IndexConfig, dim: int, expected_n: int | None = None) -> None:
         self.config = config
         self.dim = dim
-        self._index: faiss.Index | None = None
+        # Corpus size estimate used by auto selection before all vectors are seen
+        self.expected_n = expected_n
+        self.index_type: str | None = None
+        self.params: dict = {}
+        self._index: faiss.Index | faiss.IndexBinary | None = None
+        self.mmapped = False
+        # Float vectors for re-scoring binary candidates and exact filtered search
+        self._rescore: np.ndarray | None = None
+        # Vectors held back until the index type is known or it can be trained
+        self._pending: list[np.ndarray] = []
+        self._n_pending = 0
 
     def build(self, embeddings: np.ndarray) -> None:
         """Build the index from an (N, dim) float32 matrix."""
-        n = embeddings.shape[0]
-        log.info("building_faiss_index", n_vectors=n, dim=self.dim,
-                use_ivf=self.config.faiss_use_ivf)
-
-        if self.config.faiss_use_ivf and n > self.config.faiss_ivf_nlist * 40:
-            quantizer = faiss.IndexFlatIP(self.dim)
-            self._index = faiss.IndexIVFFlat(
-                quantizer, self.dim, self.config.faiss_ivf_nlist, faiss.METRIC_INNER_PRODUCT
-            )
-            self._index.train(embeddings)
-            self._index.add(embeddings)
-            self._index.nprobe = self.config.faiss_nprobe
-        else:
-            # Flat index - exact search, fine for <100k vectors
-            self._index = faiss.IndexFlatIP(self.dim)
-            self._index.add(embeddings)
+        self.reset()
+        self.expected_n = embeddings.shape[0]
+        self.add(embeddings)
+        self.finalize()
+
+    def reset(self) -> None:
+        """Discard the current index so the next ``add`` starts a new one."""
+        self._index = None
+        self.mmapped = False
+        self._rescore = None
+        self.index_type = None
+        self.params = {}
+        self._pending = []
+        self._n_pending = 0
 
-        log.info("faiss_index_built", total=self._index.ntotal)
+    def add(self, embeddings: np.ndarray) -> None:
+        """Append vectors, creating the index on first use (trained types buffer a sample first)."""
+        if self._index is not None:
+            if self.mmapped:
+                raise RuntimeError("FAISS index is memory-mapped read-only; load with mmap=False")
+            self._index.add(self._encode(embeddings))
+            return
 
-    def search(self, query_vec: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
-        """Search the index. Returns (scores, ids) each of shape (1, top_k)."""
+        self._pending.append(embeddings)
+        self._n_pending += embeddings.shape[0]
+        if self.index_type is None:
+            auto = self._configured_type() == "auto"
+            if auto and self._n_pending <= self.config.faiss_auto_flat_max:
+                return
+            self._choose_type(max(self._n_pending, self.expected_n or 0))
+        if self._n_pending >= self._min_train():
+            self._create(np.concatenate(self._pending))
+
+    def finalize(self) -> None:
+        """Flush buffered vectors; call once after the last ``add``."""
+        if self._index is None:
+            if self.index_type is None:
+                self._choose_type(self._n_pending)
+            if self._n_pending >= self._min_train() or self.index_type not in _TRAINED_TYPES:
+                # SQ8 trains on whatever there is
+                self._create(np.concatenate(self._pending) if self._pending else None)
+            else:
+                log.info(
+                    "faiss_index_fallback_flat",
+                    index_type=self.index_type,
+                    n_vectors=self._n_pending,
+                    min_train=self._min_train(),
+                )
+                self.index_type, self.params = "flat", {}
+                self._create(np.concatenate(self._pending) if self._pending else None)
+        log.info("faiss_index_built", total=self._index.ntotal, index_type=self.index_type)
+
+    def search(
+        self,
+        query_vec: np.ndarray,
+        top_k: int,
+        mask: np.ndarray | PositionMask | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Search the index. Returns (scores, ids) each of shape (n_queries, top_k).
+
+        With a *mask*, only its positions are considered; unfilled slots have id -1.
+        """
         assert self._index is not None, "Index not built or loaded"
         top_k = min(top_k, self._index.ntotal)
-        scores, ids = self._index.search(query_vec, top_k)
+        if mask is None:
+            if self.index_type == "binary":
+                return self._search_binary(query_vec, top_k, None)
+            return self._index.search(query_vec, top_k)
+
+        if not isinstance(mask, PositionMask):
+            mask = PositionMask(mask)
+        n = self._index.ntotal
+        partial = self.index_type in _PARTIAL_TYPES
+        exact_max = self.config.faiss_filter_exact_max
+        if partial and self._rescore is not None and mask.n_selected <= exact_max:
+            return self._search_exact(query_vec, top_k, mask)
+        selector = faiss.IDSelectorBitmap(n, faiss.swig_ptr(mask.bitmap(n)))
+        params = self._search_params(selector, top_k, mask.n_selected / max(n, 1))
+        if self.index_type == "binary":
+            return self._search_binary(query_vec, top_k, params)
+        scores, ids = self._index.search(query_vec, top_k, params=params)
+        if partial and self._rescore is not None:
+            wanted = min(top_k, mask.n_selected)
+            if (np.count_nonzero(ids >= 0, axis=1) < wanted).any():
+                log.debug("faiss_filtered_search_short", n_selected=mask.n_selected, top_k=top_k)
+                return self._search_exact(query_vec, top_k, mask)
         return scores, ids
 
+    def set_rescore_vectors(self, vectors: np.ndarray | None) -> None:
+        """Use *vectors* (position order, float32) to re-score binary search candidates."""
+        self._rescore = vectors
+
     def save(self, path: Path) -> None:
+        """Write the index and its metadata, replacing any previous files atomically."""
         assert self._index is not None
-        faiss.write_index(self._index, str(path))
-        log.info("faiss_index_saved", path=str(path))
+        tmp = path.with_name(path.name + ".tmp")
+        if self.index_type == "binary":
+            faiss.write_index_binary(self._index, str(tmp))
+        else:
+            faiss.write_index(self._index, str(tmp))
+        os.replace(tmp, path)
+        meta_path = _meta_path(path)
+        meta_tmp = meta_path.with_name(meta_path.name + ".tmp")
+        meta_tmp.write_text(
+            json.dumps(
+                {
+                    "index_type": self.index_type,
+                    "params": self.params,
+                    "dim": self.dim,
+                    "ntotal": self._index.ntotal,
+                }
+            )
+        )
+        os.replace(meta_tmp, meta_path)
+        log.info("faiss_index_saved", path=str(path), index_type=self.index_type)
+
+    def load(self, path: Path, mmap: bool = False) -> None:
+        """Load an index; with *mmap* the file is mapped read-only instead of read."""
+        t0 = time.perf_counter()
+        meta_path = _meta_path(path)
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else None
 
-    def load(self, path: Path) -> None:
-        self._index = faiss.read_index(str(path))
+        flags = 0
+        if mmap:
+            # IVF lists are served as on-disk inverted lists; flat/HNSW map their codes
+            ivf = meta is not None and meta["index_type"] in _TRAINED_TYPES
+            if ivf:
+                flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            elif _IO_FLAG_MMAP_IFC is not None:
+                flags = _IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+            else:
+                log.warning(
+                    "faiss_mmap_unsupported",
+                    faiss_version=faiss.__version__,
+                    detail="IO_FLAG_MMAP_IFC missing; reading the index into memory",
+                )
+        if meta is not None and meta["index_type"] == "binary":
+            self._index = faiss.read_index_binary(str(path), flags)
+        else:
+            self._index = faiss.read_index(str(path), flags)
+        self._rescore = None
+        if meta is not None and meta["index_type"] in _PARTIAL_TYPES | {"binary"}:
+            rescore = path.with_name(_RESCORE_FILE)
+            if rescore.exists():
+                self._rescore = np.load(rescore, mmap_mode="r")
+        self.mmapped = mmap
         self.dim = self._index.d
-        if hasattr(self._index, "nprobe"):
-            self._index.nprobe = self.config.faiss_nprobe
-        log.info("faiss_index_loaded", path=str(path), total=self._index.ntotal)
+        if meta is not None:
+            self.index_type, self.params = meta["index_type"], meta["params"]
+        else:
+            # Written before index types were recorded: flat or IVF-Flat
+            ivf = faiss.try_extract_index_ivf(self._index)
+            self.index_type = "flat" if ivf is None else "ivf_flat"
+            self.params = {} if ivf is None else {"nlist": ivf.nlist}
+        self._apply_search_params()
+        log.info(
+            "faiss_index_loaded",
+            path=str(path),
+            total=self._index.ntotal,
+            index_type=self.index_type,
+            params=self.params,
+            mmap=mmap,
+            load_ms=round((time.perf_counter() - t0) * 1000, 1),
+        )
+
+    def _configured_type(self) -> str:
+        if self.config.faiss_index_type == "flat" and self.config.faiss_use_ivf:
+            return "ivf_flat"
+        return self.config.faiss_index_type
+
+    def _choose_type(self, n: int) -> None:
+        """Fix the index type and its build parameters for a corpus of about *n* vectors."""
+        cfg = self.config
+        index_type = self._configured_type()
+        if index_type == "auto":
+            budget = cfg.faiss_memory_budget_mb * 1024 * 1024
+            if n <= cfg.faiss_auto_flat_max:
+                index_type = "flat"
+            elif n * (self.dim * 4 + cfg.faiss_hnsw_m * 2 * 4) <= budget:
+                # HNSW graph: float vectors plus ~2*M int32 neighbour ids per vector
+                index_type = "hnsw"
+            elif n * self.dim * 4 <= budget:
+                index_type = "ivf_flat"
+            else:
+                index_type = "opq_ivf_pq"
+            log.info(
+                "faiss_index_type_selected",
+                index_type=index_type,
+                n_vectors=n,
+                memory_budget_mb=cfg.faiss_memory_budget_mb,
+            )
+
+        params: dict = {}
+        if index_type == "hnsw":
+            params = {"m": cfg.faiss_hnsw_m, "ef_construction": cfg.faiss_hnsw_ef_construction}
+        elif index_type in _TRAINED_TYPES:
+            params = {"nlist": cfg.faiss_ivf_nlist}
+            if index_type != "ivf_flat":
+                params["pq_m"] = cfg.faiss_pq_m or _default_pq_m(self.dim)
+                params["pq_nbits"] = cfg.faiss_pq_nbits
+                if self.dim % params["pq_m"]:
+                    raise ValueError(
+                        f"faiss_pq_m={params['pq_m']} must divide the embedding dim {self.dim}"
+                    )
+        elif index_type == "binary":
+            params = {"rescore_factor": cfg.faiss_binary_rescore_factor}
+            if self.dim % 8:
+                raise ValueError(f"binary index needs a dim divisible by 8, got {self.dim}")
+        self.index_type, self.params = index_type, params
+
+    def _min_train(self) -> int:
+        if self.index_type == "sq8":
+            return _SQ8_TRAIN_POINTS
+        if self.index_type not in _TRAINED_TYPES:
+            return 0
+        centroids = self.params["nlist"]
+        if "pq_nbits" in self.params:
+            centroids = max(centroids, 2 ** self.params["pq_nbits"])
+        return centroids * _TRAIN_POINTS_PER_CENTROID
+
+    def _factory_string(self) -> str:
+        p = self.params
+        pq = f"PQ{p.get('pq_m')}x{p.get('pq_nbits')}"
+        return {
+            "flat": "Flat",
+            "hnsw": f"HNSW{p.get('m')},Flat",
+            "ivf_flat": f"IVF{p.get('nlist')},Flat",
+            "ivf_pq": f"IVF{p.get('nlist')},{pq}",
+            "opq_ivf_pq": f"OPQ{p.get('pq_m')},IVF{p.get('nlist')},{pq}",
+            "sq8": "SQ8",
+            "fp16": "SQfp16",
+        }[self.index_type]
+
+    def _create(self, sample: np.ndarray | None) -> None:
+        """Instantiate the chosen index, train it on *sample* if needed and add *sample*."""
+        factory = "BFlat" if self.index_type == "binary" else self._factory_string()
+        n = 0 if sample is None else sample.shape[0]
+        log.info(
+            "building_faiss_index",
+            index_type=self.index_type,
+            factory=factory,
+            n_train=n,
+            dim=self.dim,
+        )
+        if self.index_type == "binary":
+            self._index = faiss.IndexBinaryFlat(self.dim)
+        else:
+            self._index = faiss.index_factory(self.dim, factory, faiss.METRIC_INNER_PRODUCT)
+        if self.index_type == "hnsw":
+            faiss.downcast_index(self._index).hnsw.efConstruction = self.params["ef_construction"]
+        if sample is not None:
+            if not self._index.is_trained:
+                self._index.train(sample)
+            self._index.add(self._encode(sample))
+        self._pending = []
+        self._n_pending = 0
+        self._apply_search_params()
+
+    def _encode(self, embeddings: np.ndarray) -> np.ndarray:
+        """Vectors as the index stores them: sign bits for ``binary``, unchanged otherwise."""
+        if self.index_type == "binary":
+            return np.packbits(embeddings > 0, axis=1)
+        return embeddings
+
+    def _search_binary(
+        self, query_vec: np.ndarray, top_k: int, params: faiss.SearchParameters | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Hamming search, then exact inner products over the candidates when possible."""
+        factor = self.params.get("rescore_factor", self.config.faiss_binary_rescore_factor)
+        n_cand = min(self._index.ntotal, top_k * factor)
+        codes = self._encode(query_vec)
+        if params is None:
+            dist, ids = self._index.search(codes, n_cand)
+        else:
+            dist, ids = self._index.search(codes, n_cand, params=params)
+        if self._rescore is None:
+            # Hamming distance h over d bits approximates cosine 1 - 2h/d
+            scores = (1.0 - 2.0 * dist[:, :top_k] / self.dim).astype(np.float32)
+            return scores, ids[:, :top_k]
+
+        out_scores = np.full((len(ids), top_k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(ids), top_k), -1, dtype=np.int64)
+        for row, (q, cand) in enumerate(zip(query_vec, ids)):
+            cand = cand[cand >= 0]
+            # Sorted gathers read the memory map sequentially
+            cand = np.sort(cand)
+            exact = np.asarray(self._rescore[cand], dtype=np.float32) @ q
+            best = np.argsort(-exact, kind="stable")[:top_k]
+            out_scores[row, : len(best)] = exact[best]
+            out_ids[row, : len(best)] = cand[best]
+        return out_scores, out_ids
+
+    def _search_exact(
+        self, query_vec: np.ndarray, top_k: int, mask: PositionMask
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Inner products against the float vectors of every selected position."""
+        positions = np.flatnonzero(mask.mask[: self._index.ntotal])
+        vectors = np.asarray(self._rescore[positions], dtype=np.float32)
+        out_scores = np.full((len(query_vec), top_k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(query_vec), top_k), -1, dtype=np.int64)
+        for row, q in enumerate(query_vec):
+            exact = vectors @ q
+            best = np.argsort(-exact, kind="stable")[:top_k]
+            out_scores[row, : len(best)] = exact[best]
+            out_ids[row, : len(best)] = positions[best]
+        return out_scores, out_ids
+
+    def _apply_search_params(self) -> None:
+        """Apply the query-time knobs from the config (nprobe / efSearch)."""
+        if self.index_type == "binary":
+            return
+        ivf = faiss.try_extract_index_ivf(self._index)
+        if ivf is not None:
+            ivf.nprobe = self.config.faiss_nprobe
+        if self.index_type == "hnsw":
+            faiss.downcast_index(self._index).hnsw.efSearch = self.config.faiss_hnsw_ef_search
+
+    def _search_params(
+        self, selector: faiss.IDSelector, top_k: int, selectivity: float
+    ) -> faiss.SearchParameters:
+        """Per-call parameters with *selector*; nprobe/efSearch widened by ``1 / selectivity``."""
+        if self.index_type == "binary":
+            return faiss.SearchParameters(sel=selector)
+        widen = 1.0 / max(selectivity, 1e-9)
+        ivf = faiss.try_extract_index_ivf(self._index)
+        if ivf is not None:
+            nprobe = min(ivf.nlist, math.ceil(self.config.faiss_nprobe * widen))
+            return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+        if self.index_type == "hnsw":
+            ef = max(self.config.faiss_hnsw_ef_search, top_k)
+            ef = min(math.ceil(ef * widen), max(ef, _MAX_FILTER_EF))
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=ef)
+        return faiss.SearchParameters(sel=selector)
+
+    @property
+    def nbytes(self) -> int:
+        """Serialized index size, i.e. its heap footprint when not memory-mapped."""
+        if self._index is None:
+            return 0
+        if self.index_type == "binary":
+            return len(faiss.serialize_index_binary(self._index))
+        return len(faiss.serialize_index(self._index))
 
     @property
     def ntotal(self) -> int:
         return self._index.ntotal if self._index else 0
+
+
+def _meta_path(index_path: Path) -> Path:
+    return index_path.with_name(f"{index_path.stem}_meta.json")
+
+
+def _default_pq_m(dim: int) -> int:
+    """Largest sub-quantizer count <= dim / 4 that divides dim (4 dims per byte code)."""
+    for m in range(max(dim // 4, 1), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
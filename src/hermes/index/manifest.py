@@ -0,0 +1,130 @@
+"""Per-file manifest used to detect changes between indexing runs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from hermes.config import HermesConfig
+from hermes.ingest.repo_scanner import ScannedFile
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class FileRecord:
+    """What we knew about a file the last time it was indexed."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    chunk_ids: list[int] = field(default_factory=list)
+
+
+@dataclass
+class ManifestDiff:
+    """Classification of scanned files against a previous manifest."""
+
+    # Files that are new or whose size/mtime changed; their content hash
+    # still has to be checked before they are treated as modified.
+    candidates: list[ScannedFile]
+    unchanged: list[ScannedFile]
+    deleted: list[str]
+
+
+@dataclass
+class Manifest:
+    """Snapshot of the indexed repository and the settings used to index it."""
+
+    repo_root: str
+    fingerprint: dict
+    files: dict[str, FileRecord] = field(default_factory=dict)
+    version: int = MANIFEST_VERSION
+
+    @staticmethod
+    def fingerprint_for(config: HermesConfig) -> dict:
+        """Settings that invalidate every stored chunk or vector when changed."""
+        return {
+            "biencoder_model": config.embed.biencoder_id,
+            "biencoder_max_length": config.embed.biencoder_max_length,
+            "chunking": config.chunking.model_dump(
+                include={"max_chars", "overlap_lines", "min_chars"}
+            ),
+        }
+
+    def is_compatible(self, repo_root: Path, config: HermesConfig) -> bool:
+        return (
+            self.version == MANIFEST_VERSION
+            and self.repo_root == str(repo_root.resolve())
+            and self.fingerprint == self.fingerprint_for(config)
+        )
+
+    def diff(self, files: list[ScannedFile]) -> ManifestDiff:
+        """Split *files* into unchanged files and change candidates, and list deletions."""
+        candidates: list[ScannedFile] = []
+        unchanged: list[ScannedFile] = []
+        seen: set[str] = set()
+        for sf in files:
+            seen.add(sf.relative_path)
+            rec = self.files.get(sf.relative_path)
+            if rec is not None and rec.size == sf.size_bytes and rec.mtime_ns == _mtime_ns(sf.path):
+                unchanged.append(sf)
+            else:
+                candidates.append(sf)
+        deleted = sorted(p for p in self.files if p not in seen)
+        return ManifestDiff(candidates=candidates, unchanged=unchanged, deleted=deleted)
+
+    def record(self, sf: ScannedFile, sha256: str, chunk_ids: list[int]) -> None:
+        self.files[sf.relative_path] = FileRecord(
+            path=sf.relative_path,
+            size=sf.size_bytes,
+            mtime_ns=_mtime_ns(sf.path),
+            sha256=sha256,
+            chunk_ids=chunk_ids,
+        )
+
+    def save(self, path: Path) -> None:
+        data = {
+            "version": self.version,
+            "repo_root": self.repo_root,
+            "fingerprint": self.fingerprint,
+            "files": [asdict(r) for r in self.files.values()],
+        }
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        tmp.replace(path)
+        log.info("manifest_saved", path=str(path), n_files=len(self.files))
+
+    @classmethod
+    def load(cls, path: Path) -> Manifest | None:
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text())
+            files = {d["path"]: FileRecord(**d) for d in data["files"]}
+            return cls(
+                repo_root=data["repo_root"],
+                fingerprint=data["fingerprint"],
+                files=files,
+                version=data.get("version", 0),
+            )
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            log.warning("manifest_unreadable", path=str(path), error=str(exc))
+            return None
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return -1
@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import sqlite3
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
 from hermes.chunking.base import Chunk
@@ -10,6 +12,9 @@ from hermes.logging import get_logger
 
 log = get_logger(__name__)
 
+# Stay under SQLite's default host-parameter limit in IN (...) lookups
+_MAX_PARAMS = 900
+
 _SCHEMA = """
 CREATE TABLE IF NOT EXISTS chunks (
     chunk_id   INTEGER PRIMARY KEY,
@@ -20,40 +25,124 @@ CREATE TABLE IF NOT EXISTS chunks (
     code_text  TEXT    NOT NULL,
     symbol_name TEXT   NOT NULL DEFAULT ''
 );
+CREATE TABLE IF NOT EXISTS tombstones (
+    chunk_id   INTEGER PRIMARY KEY
+);
+"""
+
+# Secondary indexes are kept separate so bulk loads can build them once at the end
+_INDEXES = """
 CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks(file_path);
 CREATE INDEX IF NOT EXISTS idx_chunks_lang ON chunks(language);
 """
 
+# Loading PRAGMAs: an interrupted bulk load may leave a corrupt database,
+# which is acceptable because the indexer rebuilds it from scratch.
+_BULK_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": "-262144",  # 256 MiB
+    "temp_store": "MEMORY",
+}
+# Rebuild the secondary indexes after a load that adds at least this
+# fraction of the existing rows; smaller loads update them in place
+_DEFER_INDEXES_RATIO = 0.25
+
+
 class MetadataStore:
     """Stores and retrieves chunk metadata in a local SQLite database."""
 
-    def __init__(self, db_path: Path) -> None:
+    def __init__(self, db_path: Path, read_only: bool = False) -> None:
         self.db_path = db_path
+        # Read-only stores (search processes) open the file with mode=ro and never touch the schema
+        self.read_only = read_only
         self._conn: sqlite3.Connection | None = None
+        # Next chunk_id to hand out while a bulk load is active, else None
+        self._bulk_next_id: int | None = None
 
     @property
     def conn(self) -> sqlite3.Connection:
         if self._conn is None:
-            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
-            self._conn.execute("PRAGMA journal_mode=WAL")
-            self._conn.executescript(_SCHEMA)
+            if self.read_only:
+                self._conn = sqlite3.connect(
+                    f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+                )
+            else:
+                self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(_SCHEMA + _INDEXES)
         return self._conn
 
-    def insert_chunks(self, chunks: list[Chunk]) -> list[int]:
-        """Insert chunks and return their auto-assigned chunk_ids (0-indexed)."""
-        cur = self.conn.cursor()
-        ids: list[int] = []
-        for chunk in chunks:
-            cur.execute(
-                "INSERT INTO chunks (file_path, language, start_line, end_line, code_text, symbol_name) "
-                "VALUES (?, ?, ?, ?, ?, ?)",
-                (chunk.file_path, chunk.language, chunk.start_line, chunk.end_line,
-                chunk.code_text, chunk.symbol_name),
+    @contextmanager
+    def bulk_load(self, expected_rows: int = 0, replace: bool = False) -> Iterator[MetadataStore]:
+        """Batch all writes inside the block into one fast transaction.
+
+        ``replace=True`` deletes the existing rows in that transaction, so a failed load keeps them.
+        """
+        conn = self.conn
+        previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in _BULK_PRAGMAS}
+        self._bulk_next_id = 1 if replace else self._next_chunk_id()
+        # Chunk ids are never reused or deleted, so this is the current row count
+        n_rows = self._bulk_next_id - 1
+        defer_indexes = n_rows == 0 or expected_rows >= n_rows * _DEFER_INDEXES_RATIO
+        if defer_indexes:
+            conn.executescript(
+                "DROP INDEX IF EXISTS idx_chunks_file; DROP INDEX IF EXISTS idx_chunks_lang;"
             )
-            ids.append(cur.lastrowid)
-        self.conn.commit()
+        for name, value in _BULK_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        try:
+            if replace:
+                conn.execute("DELETE FROM chunks")
+                conn.execute("DELETE FROM tombstones")
+            yield self
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._bulk_next_id = None
+            if defer_indexes:
+                conn.executescript(_INDEXES)
+            for name, value in previous.items():
+                conn.execute(f"PRAGMA {name}={value}")
+        log.info("metadata_bulk_load_complete", deferred_indexes=defer_indexes)
+
+    def insert_chunks(self, chunks: list[Chunk]) -> list[int]:
+        """Insert chunks and return their chunk_ids, assigned sequentially."""
+        if not chunks:
+            return []
+        first_id = self._bulk_next_id if self._bulk_next_id is not None else self._next_chunk_id()
+        ids = list(range(first_id, first_id + len(chunks)))
+        self.conn.executemany(
+            "INSERT INTO chunks "
+            "(chunk_id, file_path, language, start_line, end_line, code_text, symbol_name) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (cid, c.file_path, c.language, c.start_line, c.end_line, c.code_text, c.symbol_name)
+                for cid, c in zip(ids, chunks)
+            ],
+        )
+        if self._bulk_next_id is not None:
+            self._bulk_next_id = first_id + len(chunks)
+        else:
+            self.conn.commit()
         return ids
 
+    def tombstone(self, chunk_ids: list[int]) -> None:
+        """Mark chunks as deleted; rows stay so that index positions remain valid."""
+        if not chunk_ids:
+            return
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tombstones (chunk_id) VALUES (?)",
+            [(cid,) for cid in chunk_ids],
+        )
+        if self._bulk_next_id is None:
+            self.conn.commit()
+
+    def tombstoned_ids(self) -> set[int]:
+        cur = self.conn.execute("SELECT chunk_id FROM tombstones")
+        return {row[0] for row in cur.fetchall()}
+
     def get_chunk(self, chunk_id: int) -> dict | None:
         cur = self.conn.execute("SELECT * FROM chunks WHERE chunk_id = ?", (chunk_id,))
         row = cur.fetchone()
@@ -64,27 +153,56 @@ class MetadataStore:
     def get_chunks_by_ids(self, chunk_ids: list[int]) -> list[dict]:
         if not chunk_ids:
             return []
-        placeholders = ",".join("?" for _ in chunk_ids)
-        cur = self.conn.execute(
-            f"SELECT * FROM chunks WHERE chunk_id IN ({placeholders})", chunk_ids
-        )
-        rows = cur.fetchall()
-        by_id = {r[0]: self._row_to_dict(r) for r in rows}
+        by_id: dict[int, dict] = {}
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        for start in range(0, len(unique_ids), _MAX_PARAMS):
+            part = unique_ids[start : start + _MAX_PARAMS]
+            placeholders = ",".join("?" for _ in part)
+            cur = self.conn.execute(
+                f"SELECT * FROM chunks WHERE chunk_id IN ({placeholders})", part
+            )
+            for r in cur.fetchall():
+                by_id[r[0]] = self._row_to_dict(r)
         return [by_id[cid] for cid in chunk_ids if cid in by_id]
 
     def count(self) -> int:
+        """Number of live (non-tombstoned) chunks."""
+        cur = self.conn.execute(
+            "SELECT COUNT(*) FROM chunks WHERE chunk_id NOT IN (SELECT chunk_id FROM tombstones)"
+        )
+        return cur.fetchone()[0]
+
+    def row_count(self) -> int:
+        """Number of stored rows, including tombstoned ones."""
         cur = self.conn.execute("SELECT COUNT(*) FROM chunks")
         return cur.fetchone()[0]
 
     def all_chunk_ids(self) -> list[int]:
+        """All chunk ids in index-position order, including tombstoned ones."""
         cur = self.conn.execute("SELECT chunk_id FROM chunks ORDER BY chunk_id")
         return [row[0] for row in cur.fetchall()]
 
+    def live_chunk_ids(self) -> list[int]:
+        cur = self.conn.execute(
+            "SELECT chunk_id FROM chunks WHERE chunk_id NOT IN (SELECT chunk_id FROM tombstones) "
+            "ORDER BY chunk_id"
+        )
+        return [row[0] for row in cur.fetchall()]
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """Yield every row as a tuple in chunk_id order, columns as in the schema."""
+        yield from self.conn.execute("SELECT * FROM chunks ORDER BY chunk_id")
+
     def all_texts(self) -> list[str]:
         """Return code_text for all chunks ordered by chunk_id."""
         cur = self.conn.execute("SELECT code_text FROM chunks ORDER BY chunk_id")
         return [row[0] for row in cur.fetchall()]
 
+    def _next_chunk_id(self) -> int:
+        # Tombstoned rows are never deleted, so MAX(chunk_id) + 1 keeps ids
+        # (and therefore index positions) strictly increasing.
+        return self.conn.execute("SELECT COALESCE(MAX(chunk_id), 0) + 1 FROM chunks").fetchone()[0]
+
     def close(self) -> None:
         if self._conn:
             self._conn.close()
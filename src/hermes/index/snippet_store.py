@@ -0,0 +1,288 @@
+"""Block-compressed, memory-mapped store for chunk code text.
+
+Texts are cut into blocks of about ``block_bytes``, each one zstd frame with a trained dictionary.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import zstandard as zstd
+
+from hermes.index.embedding_store import NpyWriter
+from hermes.logging import get_logger
+
+log = get_logger(__name__)
+
+FORMAT_VERSION = 1
+
+_ARRAYS = ("block_offsets", "block_starts", "text_offsets")
+# Dictionary training sample: at most this many texts, spread over the sample
+_MAX_DICT_SAMPLES = 20_000
+# Texts are buffered until this many times dict_bytes is available to train on
+_DICT_SAMPLE_FACTOR = 100
+# Array values copied from a base store per slice
+_COPY_ROWS = 65_536
+
+
+class SnippetStore:
+    """Random access to chunk texts by index position."""
+
+    def __init__(
+        self,
+        arrays: dict[str, np.ndarray],
+        blocks: np.ndarray,
+        dictionary: bytes | None,
+        cache_blocks: int = 256,
+    ) -> None:
+        self._block_offsets = arrays["block_offsets"]
+        self._block_starts = arrays["block_starts"]
+        self._text_offsets = arrays["text_offsets"]
+        self._blocks = blocks
+        self._dict_data = zstd.ZstdCompressionDict(dictionary) if dictionary else None
+        self._local = threading.local()
+        self._cache: OrderedDict[int, bytes] = OrderedDict()
+        self._cache_blocks = cache_blocks
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._text_offsets) - 1
+
+    @classmethod
+    def load(cls, path: Path, cache_blocks: int = 256, mmap: bool = True) -> SnippetStore:
+        """Open the store at *path*; without *mmap* its files are read into memory."""
+        meta = json.loads((path / "meta.json").read_text())
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snippet store version in {path}: {meta.get('version')}")
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in _ARRAYS}
+        blocks_path = path / "blocks.bin"
+        if not mmap:
+            blocks = np.fromfile(blocks_path, dtype=np.uint8)
+        # np.memmap rejects empty files
+        elif blocks_path.stat().st_size:
+            blocks = np.memmap(blocks_path, dtype=np.uint8, mode="r")
+        else:
+            blocks = np.zeros(0, dtype=np.uint8)
+        dict_path = path / "dictionary.bin"
+        dictionary = dict_path.read_bytes() if dict_path.exists() else None
+        return cls(arrays, blocks, dictionary, cache_blocks)
+
+    def get(self, pos: int) -> str:
+        """Text at index position *pos*."""
+        block = int(np.searchsorted(self._block_starts, pos, side="right")) - 1
+        data = self._block(block)
+        base = self._text_offsets[self._block_starts[block]]
+        return data[self._text_offsets[pos] - base : self._text_offsets[pos + 1] - base].decode()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "n_blocks": len(self._block_starts),
+            "raw_bytes": int(self._text_offsets[-1]),
+            "compressed_bytes": int(self._block_offsets[-1]),
+            "cached_blocks": len(self._cache),
+            "block_cache_hit_rate": round(self.hit_rate, 4),
+        }
+
+    def _block(self, block: int) -> bytes:
+        with self._lock:
+            data = self._cache.get(block)
+            if data is not None:
+                self._cache.move_to_end(block)
+                self.hits += 1
+                return data
+            self.misses += 1
+        frame = self._blocks[self._block_offsets[block] : self._block_offsets[block + 1]]
+        data = self._decompressor().decompress(frame.tobytes())
+        if self._cache_blocks > 0:
+            with self._lock:
+                self._cache[block] = data
+                while len(self._cache) > self._cache_blocks:
+                    self._cache.popitem(last=False)
+        return data
+
+    def _decompressor(self) -> zstd.ZstdDecompressor:
+        # Decompression contexts must not be shared between threads
+        dctx = getattr(self._local, "dctx", None)
+        if dctx is None:
+            dctx = self._local.dctx = zstd.ZstdDecompressor(dict_data=self._dict_data)
+        return dctx
+
+
+class SnippetStoreWriter:
+    """Compresses texts into a snippet store directory as they are added.
+
+    With *base* (a prefix of this store) its dictionary and frames are reused.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        level: int = 9,
+        block_bytes: int = 16384,
+        dict_bytes: int = 112_640,
+        base: Path | None = None,
+    ) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.level = level
+        self.block_bytes = block_bytes
+        self.dict_bytes = dict_bytes
+        self.n_texts = 0
+        self.n_reused = 0
+        self._raw_bytes = 0
+        self._compressed_bytes = 0
+        self._n_blocks = 0
+        self._n_reused_blocks = 0
+        self._writers = {name: NpyWriter(path / f"{name}.npy", np.int64) for name in _ARRAYS}
+        self._dictionary: bytes | None = None
+        self._cctx: zstd.ZstdCompressor | None = None
+        # Texts waiting for the dictionary, then the block being filled
+        self._head: list[bytes] = []
+        self._head_bytes = 0
+        self._block: list[bytes] = []
+        self._block_bytes_used = 0
+        self._text_offsets: list[int] = []
+
+        if base is not None:
+            self._start_from(base)
+        else:
+            self._writers["text_offsets"].append(np.zeros(1, dtype=np.int64))
+            self._writers["block_offsets"].append(np.zeros(1, dtype=np.int64))
+            self._blocks = open(path / "blocks.bin", "wb")  # noqa: SIM115 - closed by close()
+
+    def add(self, text: str) -> None:
+        data = text.encode()
+        self._raw_bytes += len(data)
+        self._text_offsets.append(self._raw_bytes)
+        if self._cctx is None:
+            self._head.append(data)
+            self._head_bytes += len(data)
+            if self._head_bytes >= _DICT_SAMPLE_FACTOR * self.dict_bytes:
+                self._start_compressing()
+            return
+        self._add_to_block(data)
+
+    def close(self) -> None:
+        """Compress what is buffered and write the arrays, dictionary and ``meta.json``."""
+        if self._cctx is None:
+            self._start_compressing()
+        if self._block:
+            self._write_block()
+        self._flush_text_offsets()
+        self._blocks.close()
+        for writer in self._writers.values():
+            writer.close()
+        if self._dictionary:
+            (self.path / "dictionary.bin").write_bytes(self._dictionary)
+        (self.path / "meta.json").write_text(
+            json.dumps(
+                {
+                    "version": FORMAT_VERSION,
+                    "n_texts": self.n_texts,
+                    "n_blocks": self._n_blocks,
+                    "raw_bytes": self._raw_bytes,
+                    "compressed_bytes": self._compressed_bytes,
+                }
+            )
+        )
+        log.info(
+            "snippet_store_built",
+            n_texts=self.n_texts,
+            n_texts_reused=self.n_reused,
+            n_blocks=self._n_blocks,
+            n_blocks_reused=self._n_reused_blocks,
+            raw_bytes=self._raw_bytes,
+            compressed_bytes=self._compressed_bytes + len(self._dictionary or b""),
+        )
+
+    def discard(self) -> None:
+        """Close the files without writing the arrays or ``meta.json``."""
+        self._blocks.close()
+        for writer in self._writers.values():
+            writer.discard()
+
+    def _start_from(self, base: Path) -> None:
+        meta = json.loads((base / "meta.json").read_text())
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snippet store version in {base}: {meta.get('version')}")
+        for name, writer in self._writers.items():
+            values = np.load(base / f"{name}.npy", mmap_mode="r")
+            for start in range(0, len(values), _COPY_ROWS):
+                writer.append(values[start : start + _COPY_ROWS])
+        self.n_texts = self.n_reused = meta["n_texts"]
+        self._n_blocks = self._n_reused_blocks = meta["n_blocks"]
+        self._raw_bytes = meta["raw_bytes"]
+        self._compressed_bytes = meta["compressed_bytes"]
+
+        dict_path = base / "dictionary.bin"
+        self._dictionary = dict_path.read_bytes() if dict_path.exists() else None
+        dict_data = zstd.ZstdCompressionDict(self._dictionary) if self._dictionary else None
+        self._cctx = zstd.ZstdCompressor(level=self.level, dict_data=dict_data)
+
+        # Frames are only ever appended past the end readers of base know about,
+        # so the base file can be shared instead of copied.
+        blocks_path = self.path / "blocks.bin"
+        blocks_path.unlink(missing_ok=True)
+        try:
+            os.link(base / "blocks.bin", blocks_path)
+        except OSError:
+            shutil.copyfile(base / "blocks.bin", blocks_path)
+        self._blocks = open(blocks_path, "r+b")  # noqa: SIM115 - closed by close()
+        self._blocks.seek(self._compressed_bytes)
+
+    def _start_compressing(self) -> None:
+        self._dictionary = _train_dictionary(self._head, self.dict_bytes)
+        dict_data = zstd.ZstdCompressionDict(self._dictionary) if self._dictionary else None
+        self._cctx = zstd.ZstdCompressor(level=self.level, dict_data=dict_data)
+        head, self._head, self._head_bytes = self._head, [], 0
+        for data in head:
+            self._add_to_block(data)
+
+    def _add_to_block(self, data: bytes) -> None:
+        if self._block and self._block_bytes_used >= self.block_bytes:
+            self._write_block()
+        self._block.append(data)
+        self._block_bytes_used += len(data)
+
+    def _write_block(self) -> None:
+        frame = self._cctx.compress(b"".join(self._block))
+        self._blocks.write(frame)
+        self._compressed_bytes += len(frame)
+        self._writers["block_starts"].append(np.array([self.n_texts], dtype=np.int64))
+        self._writers["block_offsets"].append(np.array([self._compressed_bytes], dtype=np.int64))
+        self._n_blocks += 1
+        self.n_texts += len(self._block)
+        self._block, self._block_bytes_used = [], 0
+        if len(self._text_offsets) >= _COPY_ROWS:
+            self._flush_text_offsets()
+
+    def _flush_text_offsets(self) -> None:
+        self._writers["text_offsets"].append(np.array(self._text_offsets, dtype=np.int64))
+        self._text_offsets = []
+
+
+def _train_dictionary(texts: list[bytes], dict_bytes: int) -> bytes | None:
+    """Train a zstd dictionary on an evenly spaced sample of *texts*; None if not worthwhile."""
+    if dict_bytes <= 0 or sum(len(t) for t in texts) < 4 * dict_bytes:
+        return None
+    step = max(1, len(texts) // _MAX_DICT_SAMPLES)
+    samples = [t for t in texts[::step] if t]
+    try:
+        return zstd.train_dictionary(dict_bytes, samples).as_bytes()
+    except zstd.ZstdError as exc:
+        log.warning("snippet_dictionary_training_failed", n_samples=len(samples), error=str(exc))
+        return None
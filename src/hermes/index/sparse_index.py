@@ -1,18 +1,35 @@
-"""BM25 sparse index for hybrid retrieval."""
+"""BM25 sparse index for hybrid retrieval.
+
+A memory-mapped CSR inverted index searched with MaxScore; scores match ``rank_bm25.BM25Okapi``.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import json
 import re
+import shutil
+import threading
+from collections import Counter
 from pathlib import Path
 
 import numpy as np
-from rank_bm25 import BM25Okapi
 
 from hermes.logging import get_logger
 
 log = get_logger(__name__)
 
+FORMAT_VERSION = 2
+
+_K1 = 1.5
+_B = 0.75
+_EPSILON = 0.25
+
+_ARRAYS = ("term_hashes", "indptr", "doc_ids", "tfs", "weights", "max_weights", "doc_lens")
+# doc_lens value of a removed document
+_REMOVED_LEN = -1
+
+
 def _tokenize(text: str) -> list[str]:
     """Simple whitespace + camelCase/snake_case tokenizer for code."""
     # Split on non-alphanumeric, then split camelCase
@@ -24,34 +41,303 @@ def _tokenize(text: str) -> list[str]:
         expanded.extend(p.lower() for p in parts if len(p) > 1)
     return expanded
 
+
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little")
+
+
 class SparseIndex:
     """BM25-based sparse retrieval over code chunks."""
 
     def __init__(self) -> None:
-        self._bm25: BM25Okapi | None = None
-        self._corpus_tokens: list[list[str]] = []
+        self._lock = threading.Lock()
+        self._reset()
+
+    # Per-thread scratch space, allocated once per index and reused by every query
+    class _Scratch(threading.local):
+        scores: np.ndarray | None = None
+        seen: np.ndarray | None = None
+
+    def _reset(self) -> None:
+        # Finalized CSR arrays (possibly read-only memory maps)
+        self._term_hashes = np.zeros(0, dtype=np.uint64)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._max_weights = np.zeros(0, dtype=np.float32)
+        self._doc_lens = np.zeros(0, dtype=np.int32)
+        self._avgdl = 0.0
+        self._scratch = SparseIndex._Scratch()
+
+        # Changes not yet folded into the CSR arrays
+        self._pending_hashes: list[np.ndarray] = []
+        self._pending_docs: list[np.ndarray] = []
+        self._pending_tfs: list[np.ndarray] = []
+        self._pending_lens: list[np.ndarray] = []
+        self._removed: set[int] = set()
+        self._dirty = False
+        self._hash_cache: dict[str, int] = {}
 
     def build(self, texts: list[str]) -> None:
-        self._corpus_tokens = [_tokenize(t) for t in texts]
-        self._bm25 = BM25Okapi(self._corpus_tokens)
+        self._reset()
+        self.add(texts)
+        self._finalize()
         log.info("sparse_index_built", n_docs=len(texts))
 
-    def search(self, query: str, top_k: int) -> tuple[np.ndarray, np.ndarray]:
-        """Return (scores, ids) arrays of length top_k."""
-        assert self._bm25 is not None, "Sparse index not built"
-        tokens = _tokenize(query)
-        scores = self._bm25.get_scores(tokens)
-        top_indices = np.argsort(scores)[::-1][:top_k]
-        top_scores = scores[top_indices]
-        return top_scores.astype(np.float32), top_indices.astype(np.int64)
+    def add(self, texts: list[str]) -> None:
+        """Append documents; they take the next positions after existing ones."""
+        self._add_tokens([_tokenize(t) for t in texts])
+        log.info("sparse_docs_added", n_added=len(texts), n_docs=self.n_docs)
+
+    def _add_tokens(self, corpus_tokens: list[list[str]]) -> None:
+        first = self.n_docs
+        hashes: list[int] = []
+        docs: list[int] = []
+        tfs: list[int] = []
+        lens = np.empty(len(corpus_tokens), dtype=np.int32)
+        for i, tokens in enumerate(corpus_tokens):
+            lens[i] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                h = self._hash_cache.get(term)
+                if h is None:
+                    h = self._hash_cache[term] = _term_hash(term)
+                hashes.append(h)
+                docs.append(first + i)
+                tfs.append(tf)
+        self._pending_hashes.append(np.array(hashes, dtype=np.uint64))
+        self._pending_docs.append(np.array(docs, dtype=np.int32))
+        self._pending_tfs.append(np.array(tfs, dtype=np.int32))
+        self._pending_lens.append(lens)
+        self._dirty = True
+
+    def remove(self, positions: list[int]) -> None:
+        """Empty the documents at *positions*, keeping later positions stable."""
+        self._removed.update(positions)
+        self._dirty = True
+        log.info("sparse_docs_removed", n_removed=len(positions))
+
+    @property
+    def n_docs(self) -> int:
+        """Document positions, removed documents included."""
+        return len(self._doc_lens) + sum(len(a) for a in self._pending_lens)
+
+    @property
+    def n_live(self) -> int:
+        """Documents that have not been removed."""
+        self._ensure_finalized()
+        return int(np.count_nonzero(self._doc_lens != _REMOVED_LEN))
+
+    def search(
+        self, query: str, top_k: int, mask: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return (scores, ids) of the best-scoring documents, at most top_k.
+
+        With a boolean *mask*, documents where it is False are skipped.
+        """
+        self._ensure_finalized()
+        assert self.n_docs > 0, "Sparse index not built"
+
+        # (upper bound, start, end, query term frequency) per known query term
+        lists: list[tuple[float, int, int, int]] = []
+        for term, qtf in Counter(_tokenize(query)).items():
+            pos = self._term_pos(term)
+            if pos >= 0:
+                lists.append(
+                    (
+                        float(self._max_weights[pos]) * qtf,
+                        int(self._indptr[pos]),
+                        int(self._indptr[pos + 1]),
+                        qtf,
+                    )
+                )
+        if not lists or top_k <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        lists.sort(key=lambda x: x[0], reverse=True)
+        # Pruning relies on non-negative contributions; negative idfs (tiny
+        # corpora) fall back to exhaustive accumulation.
+        can_prune = lists[-1][0] >= 0
+
+        scores, seen = self._scratch_arrays()
+        touched_parts: list[np.ndarray] = []
+        n_touched = 0
+        candidates: np.ndarray | None = None
+        remaining_ub = sum(ub for ub, *_ in lists)
+
+        try:
+            for ub, start, end, qtf in lists:
+                remaining_ub -= ub
+                docs = self._doc_ids[start:end]
+                weights = self._weights[start:end]
+                if qtf != 1:
+                    weights = weights * qtf
+
+                if candidates is None:
+                    if mask is not None:
+                        keep = mask[docs]
+                        docs, weights = docs[keep], weights[keep]
+                    # Essential term: accumulate its whole posting list
+                    new_docs = docs[~seen[docs]]
+                    seen[new_docs] = True
+                    touched_parts.append(new_docs)
+                    n_touched += len(new_docs)
+                    # Doc ids are unique within a posting list, so fancy-index += is safe
+                    scores[docs] += weights
+                    if can_prune and n_touched > top_k:
+                        touched = np.concatenate(touched_parts)
+                        touched_parts = [touched]
+                        theta = _kth_largest(scores[touched], top_k)
+                        if remaining_ub < theta:
+                            # No unseen doc can reach the top-k any more
+                            candidates = np.sort(touched[scores[touched] + remaining_ub >= theta])
+                else:
+                    # Non-essential term: probe only docs still in contention
+                    idx = np.searchsorted(docs, candidates)
+                    idx = np.minimum(idx, len(docs) - 1)
+                    hit = docs[idx] == candidates
+                    scores[candidates[hit]] += weights[idx[hit]]
+                    if len(candidates) > top_k:
+                        theta = _kth_largest(scores[candidates], top_k)
+                        candidates = candidates[scores[candidates] + remaining_ub >= theta]
+
+            touched = np.concatenate(touched_parts)
+            pool = candidates if candidates is not None else touched
+            pool_scores = scores[pool]
+            if len(pool) > top_k:
+                best = np.argpartition(-pool_scores, top_k - 1)[:top_k]
+                pool, pool_scores = pool[best], pool_scores[best]
+            order = np.argsort(-pool_scores, kind="stable")
+            return pool_scores[order].astype(np.float32), pool[order].astype(np.int64)
+        finally:
+            # Reset only what this query touched
+            for part in touched_parts:
+                scores[part] = 0.0
+                seen[part] = False
 
     def save(self, path: Path) -> None:
-        data = {"corpus_tokens": self._corpus_tokens}
-        path.write_text(json.dumps(data))
-        log.info("sparse_index_saved", path=str(path))
+        """Write the index as a directory of ``.npy`` arrays plus ``meta.json``."""
+        self._ensure_finalized()
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", getattr(self, f"_{name}"))
+        (tmp / "meta.json").write_text(
+            json.dumps(
+                {
+                    "version": FORMAT_VERSION,
+                    "n_docs": len(self._doc_lens),
+                    "n_live": self.n_live,
+                    "n_terms": len(self._term_hashes),
+                    "avgdl": self._avgdl,
+                    "k1": _K1,
+                    "b": _B,
+                    "epsilon": _EPSILON,
+                }
+            )
+        )
+        # Swap directories; memory maps of the old files stay valid until closed
+        shutil.rmtree(path, ignore_errors=True)
+        tmp.rename(path)
+        log.info("sparse_index_saved", path=str(path), n_terms=len(self._term_hashes))
 
     def load(self, path: Path) -> None:
+        meta = json.loads((path / "meta.json").read_text())
+        version = meta.get("version")
+        if version not in (1, FORMAT_VERSION):
+            raise ValueError(f"Unsupported sparse index version in {path}: {version}")
+        self._reset()
+        for name in _ARRAYS:
+            if version == 1 and name == "max_weights":
+                continue
+            setattr(self, f"_{name}", np.load(path / f"{name}.npy", mmap_mode="r"))
+        if version == 1:
+            # v1 predates per-term score bounds; derive them once
+            self._max_weights = _max_per_term(self._weights, self._indptr)
+        self._avgdl = meta["avgdl"]
+        log.info("sparse_index_loaded", n_docs=len(self._doc_lens), n_terms=len(self._term_hashes))
+
+    def load_legacy_json(self, path: Path) -> None:
+        """Build the index from a pre-CSR ``sparse_index.json`` token dump."""
         data = json.loads(path.read_text())
-        self._corpus_tokens = data["corpus_tokens"]
-        self._bm25 = BM25Okapi(self._corpus_tokens)
-        log.info("sparse_index_loaded", n_docs=len(self._corpus_tokens))
+        self._reset()
+        self._add_tokens(data["corpus_tokens"])
+        self._finalize()
+        log.info("sparse_index_loaded_legacy", path=str(path), n_docs=len(self._doc_lens))
+
+    def _term_pos(self, term: str) -> int:
+        """Return the row of *term* in the CSR arrays, or -1 if unknown."""
+        h = np.uint64(_term_hash(term))
+        pos = int(np.searchsorted(self._term_hashes, h))
+        if pos >= len(self._term_hashes) or self._term_hashes[pos] != h:
+            return -1
+        return pos
+
+    def _scratch_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        scratch = self._scratch
+        n = len(self._doc_lens)
+        if scratch.scores is None or len(scratch.scores) != n:
+            scratch.scores = np.zeros(n, dtype=np.float32)
+            scratch.seen = np.zeros(n, dtype=bool)
+        return scratch.scores, scratch.seen
+
+    def _ensure_finalized(self) -> None:
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._finalize()
+
+    def _finalize(self) -> None:
+        """Fold pending additions/removals into the CSR arrays and recompute weights."""
+        df = np.diff(self._indptr)
+        hashes = np.concatenate([np.repeat(self._term_hashes, df), *self._pending_hashes])
+        docs = np.concatenate([self._doc_ids, *self._pending_docs])
+        tfs = np.concatenate([self._tfs, *self._pending_tfs])
+        doc_lens = np.concatenate([self._doc_lens, *self._pending_lens])
+
+        if self._removed:
+            removed = np.fromiter(self._removed, dtype=np.int64)
+            doc_lens[removed] = _REMOVED_LEN
+            keep = ~np.isin(docs, removed)
+            hashes, docs, tfs = hashes[keep], docs[keep], tfs[keep]
+
+        order = np.lexsort((docs, hashes))
+        hashes, docs, tfs = hashes[order], docs[order], tfs[order]
+        term_hashes, starts, counts = np.unique(hashes, return_index=True, return_counts=True)
+
+        # Corpus statistics over live documents only, as a fresh build would see them
+        live_lens = doc_lens[doc_lens != _REMOVED_LEN]
+        n_docs = len(live_lens)
+        avgdl = float(live_lens.sum()) / n_docs if n_docs else 0.0
+        idf = np.log(n_docs - counts + 0.5) - np.log(counts + 0.5)
+        if len(idf):
+            # Same floor as rank_bm25: negative idfs become epsilon * mean idf
+            idf[idf < 0] = _EPSILON * idf.mean()
+        term_idf = np.repeat(idf, counts)
+        norm = _K1 * (1 - _B + _B * doc_lens[docs] / avgdl) if avgdl else _K1
+        tf = tfs.astype(np.float64)
+        weights = term_idf * (tf * (_K1 + 1) / (tf + norm))
+
+        self._term_hashes = term_hashes
+        self._indptr = np.append(starts, len(docs)).astype(np.int64)
+        self._doc_ids = docs.astype(np.int32)
+        self._tfs = tfs.astype(np.int32)
+        self._weights = weights.astype(np.float32)
+        self._max_weights = _max_per_term(self._weights, self._indptr)
+        self._doc_lens = doc_lens.astype(np.int32)
+        self._avgdl = avgdl
+        self._pending_hashes, self._pending_docs = [], []
+        self._pending_tfs, self._pending_lens = [], []
+        self._removed = set()
+        self._dirty = False
+
+
+def _max_per_term(weights: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """Largest posting weight of every term (its score upper bound)."""
+    if len(indptr) < 2:
+        return np.zeros(0, dtype=np.float32)
+    return np.maximum.reduceat(weights, indptr[:-1]).astype(np.float32)
+
+
+def _kth_largest(values: np.ndarray, k: int) -> float:
+    return float(np.partition(values, len(values) - k)[len(values) - k])
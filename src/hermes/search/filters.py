@@ -0,0 +1,67 @@
+"""Position bitmaps for pushing search filters into retrieval."""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from hermes.index.chunk_table import ChunkTable
+from hermes.index.faiss_index import PositionMask
+
+# Filter masks (and their packed FAISS bitmaps) kept around for repeated filters
+_MASK_CACHE_SIZE = 32
+
+
+class FilterIndex:
+    """Boolean masks over index positions for ``filter_language`` / ``filter_path_prefix``.
+
+    Masks exclude tombstoned chunks and are cached as :class:`PositionMask` objects.
+    """
+
+    def __init__(self, table: ChunkTable) -> None:
+        self.live = np.asarray(table.live, dtype=bool)
+        # The table interns paths in sorted order, so path ids are path ranks
+        self._paths = table.paths
+        self._path_ranks = table.path_ids
+        self._language_masks = {
+            lang: (table.language_ids == i) & self.live for i, lang in enumerate(table.languages)
+        }
+        self._masks: OrderedDict[tuple[str, str], PositionMask] = OrderedDict()
+        self._lock = threading.Lock()
+        # Every live position; None when nothing is tombstoned
+        self.live_mask = None if self.live.all() else PositionMask(self.live)
+
+    def mask(self, language: str | None, path_prefix: str | None) -> PositionMask | None:
+        """Positions that pass both filters (:attr:`live_mask` when neither is set)."""
+        if not language and not path_prefix:
+            return self.live_mask
+        key = (language or "", path_prefix or "")
+        with self._lock:
+            cached = self._masks.get(key)
+            if cached is not None:
+                self._masks.move_to_end(key)
+                return cached
+        if language:
+            mask = self._language_masks.get(language)
+            if mask is None:
+                mask = np.zeros_like(self.live)
+        else:
+            mask = self.live
+        if path_prefix:
+            mask = mask & self._prefix_mask(path_prefix)
+        result = PositionMask(mask)
+        with self._lock:
+            self._masks[key] = result
+            while len(self._masks) > _MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return result
+
+    def _prefix_mask(self, prefix: str) -> np.ndarray:
+        lo = bisect.bisect_left(self._paths, prefix)
+        # Paths with the prefix are contiguous from lo in sorted order
+        # (bisect's key= needs Python 3.10; pyproject requires 3.11)
+        hi = bisect.bisect_left(self._paths, True, lo=lo, key=lambda p: not p.startswith(prefix))
+        return (self._path_ranks >= lo) & (self._path_ranks < hi) & self.live
@@ -2,52 +2,96 @@
 
 from __future__ import annotations
 
+import threading
 import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import dataclass
+from pathlib import Path
 
 import numpy as np
 
-from hermes.config import HermesConfig
+from hermes.config import HermesConfig, IndexConfig
+from hermes.embed.batcher import QueryBatcher
 from hermes.embed.biencoder import BiEncoder
-from hermes.embed.cache import EmbeddingCache
+from hermes.embed.cache import EmbeddingCache, RerankScoreCache
 from hermes.embed.crossencoder import CrossEncoder
-from hermes.index.faiss_index import FaissIndex
+from hermes.embed.rerank_scheduler import RerankScheduler
+from hermes.index.chunk_table import ChunkTable
+from hermes.index.faiss_index import FaissIndex, PositionMask
 from hermes.index.metadata_store import MetadataStore
 from hermes.index.sparse_index import SparseIndex
 from hermes.logging import get_logger
+from hermes.search.filters import FilterIndex
 from hermes.search.fusion import reciprocal_rank_fusion
+from hermes.search.result_cache import SearchResultCache
 from hermes.search.schemas import SearchRequest, SearchResponse, SearchResultItem
 
 log = get_logger(__name__)
 
+
 class SearchPipeline:
     """Loads artifacts and executes the multi-stage search pipeline."""
 
     def __init__(self, config: HermesConfig) -> None:
         self.config = config
-        artifacts = config.artifacts_dir
-
-        self.store = MetadataStore(artifacts / "metadata.db")
 
-        self.biencoder = BiEncoder(config.embed)
-        self.faiss_index = FaissIndex(config.index, dim=self.biencoder.dim)
-        self.faiss_index.load(artifacts / "faiss.index")
+        self.biencoder = BiEncoder(config.embed, config.model_cache_dir)
+        self._query_batcher: QueryBatcher | None = None
+        if config.embed.query_batch_enabled:
+            self._query_batcher = QueryBatcher(
+                self.biencoder.encode_queries,
+                window_ms=config.embed.query_batch_window_ms,
+                max_batch_size=config.embed.query_batch_max_size,
+            )
 
-        self.crossencoder = CrossEncoder(config.embed)
+        self.crossencoder = CrossEncoder(config.embed, config.model_cache_dir)
+        self._rerank_scheduler: RerankScheduler | None = None
+        if config.embed.rerank_batching_enabled:
+            self._rerank_scheduler = RerankScheduler(
+                self.crossencoder.score_pair_batch,
+                batch_size=config.embed.crossencoder_batch_size,
+                max_wait_ms=config.embed.rerank_batch_wait_ms,
+            )
 
-        # Load sparse index if needed
-        self._sparse: SparseIndex | None = None
-        sparse_path = artifacts / "sparse_index.json"
-        if sparse_path.exists():
-            self._sparse = SparseIndex()
-            self._sparse.load(sparse_path)
+        # Cascade reranking can order candidates with a cheap scorer first
+        self._intermediate: CrossEncoder | None = None
+        search = config.search
+        if search.rerank_mode == "cascade" and search.cascade_intermediate == "crossencoder":
+            self._intermediate = CrossEncoder(
+                config.embed.model_copy(
+                    update={"crossencoder_model": search.cascade_intermediate_model}
+                ),
+                config.model_cache_dir,
+            )
 
         self._cache = EmbeddingCache(max_size=config.embed.query_cache_size)
-        self._pool = ThreadPoolExecutor(max_workers=2)
-        self._chunk_ids = self.store.all_chunk_ids()
+        self._result_cache: SearchResultCache | None = None
+        if config.search.result_cache_size > 0:
+            self._result_cache = SearchResultCache(
+                max_size=config.search.result_cache_size,
+                ttl_seconds=config.search.result_cache_ttl_seconds,
+            )
+        self._rerank_cache: RerankScoreCache | None = None
+        if config.embed.rerank_cache_size > 0:
+            self._rerank_cache = RerankScoreCache(
+                config.embed.crossencoder_id, max_size=config.embed.rerank_cache_size
+            )
+        # One rerank slot per concurrent search, so the API executor isn't throttled here
+        self._pool = ThreadPoolExecutor(max_workers=max(2, config.search.executor_workers))
+        # Hybrid searches run dense and sparse retrieval side by side
+        self._retrieval_pool = ThreadPoolExecutor(
+            max_workers=2 * max(1, config.search.executor_workers),
+            thread_name_prefix="hermes-retrieve",
+        )
+        # Timed-out retrievals still holding a retrieval thread, by retriever name
+        self._stalled: dict[str, Future] = {}
+        # Searches read this once and use it throughout; reload() swaps in a new one
+        self._snapshot = _load_snapshot(config, self.biencoder.dim)
+        self._reload_lock = threading.Lock()
 
-        log.info("search_pipeline_ready", n_chunks=len(self._chunk_ids))
+        log.info("search_pipeline_ready", n_chunks=self._snapshot.table.n_live)
 
     # Public Functions
 
@@ -56,47 +100,70 @@ class SearchPipeline:
         timings: dict[str, float] = {}
         mode = request.retrieval_mode or self.config.search.retrieval_mode
 
-        # 1. Embed query
-        t0 = time.perf_counter()
-        query_vec = self._embed_query(request.query)
-        timings["embed_query_ms"] = _ms(t0)
+        # 0. Serve repeated requests from the result cache
+        cache_key = None
+        if self._result_cache is not None:
+            tc = time.perf_counter()
+            cache_key = self._result_cache.key(request, mode)
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                lookup_ms = round(_ms(tc), 2)
+                return cached.model_copy(
+                    update={
+                        "request_id": request_id,
+                        "timings_ms": {"result_cache_ms": lookup_ms, "total_ms": lookup_ms},
+                    }
+                )
 
-        # 2. Retrieval
-        t1 = time.perf_counter()
-        candidates = self._retrieve(request.query, query_vec, request.top_k_retrieve, mode)
-        timings["retrieval_ms"] = _ms(t1)
+        # 1. Resolve filters (and tombstones) to a position mask that retrieval honours directly
+        snap = self._snapshot
+        t0 = time.perf_counter()
+        mask = snap.filters.mask(request.filter_language, request.filter_path_prefix)
+        if mask is not None and mask is not snap.filters.live_mask:
+            timings["filter_ms"] = _ms(t0)
 
-        # 3. Apply filters
-        if request.filter_language or request.filter_path_prefix:
-            candidates = self._apply_filters(
-                candidates, request.filter_language, request.filter_path_prefix
-            )
+        # 2. Embed query and retrieve (hybrid: dense and sparse concurrently)
+        candidates, timed_out = self._retrieve(
+            snap, request.query, request.top_k_retrieve, mode, timings, mask
+        )
 
         total_candidates = len(candidates)
 
-        # 4. Rerank
+        # 3. Rerank (cascade: in early-exit rounds)
         rerank_skipped = False
+        pairs_scored = 0
         t2 = time.perf_counter()
         max_rerank = self.config.search.max_rerank_candidates
         rerank_candidates = candidates[:max_rerank]
 
         if rerank_candidates:
             try:
-                reranked = self._rerank_with_timeout(request.query, rerank_candidates)
+                if self.config.search.rerank_mode == "cascade":
+                    reranked = self._cascade_rerank(
+                        snap, request.query, rerank_candidates, request.top_k_rerank, timings
+                    )
+                else:
+                    reranked = self._rerank_with_timeout(
+                        snap,
+                        [request.query],
+                        [rerank_candidates],
+                        self.config.search.rerank_timeout_seconds,
+                    )[0]
                 candidates = reranked + candidates[max_rerank:]
+                pairs_scored = _pairs_scored(reranked)
             except FuturesTimeout:
                 log.warning("rerank_timeout", request_id=request_id)
                 rerank_skipped = True
 
         timings["rerank_ms"] = _ms(t2)
 
-        # 5. Build results
+        # 4. Build results
         final = candidates[: request.top_k_rerank]
-        results = self._build_results(final, request.return_snippets)
+        results = self._build_results(snap, final, request.return_snippets)
 
         timings["total_ms"] = _ms(t0)
 
-        return SearchResponse(
+        response = SearchResponse(
             request_id=request_id,
             query=request.query,
             retrieval_mode=mode,
@@ -104,121 +171,551 @@ class SearchPipeline:
             timings_ms={k: round(v, 2) for k, v in timings.items()},
             rerank_skipped=rerank_skipped,
             total_candidates=total_candidates,
+            rerank_pairs_scored=pairs_scored,
+            retrievers_timed_out=timed_out,
         )
+        # Degraded (timed out) responses are not worth repeating
+        if cache_key is not None and not rerank_skipped and not timed_out:
+            self._result_cache.put(cache_key, response)
+        return response
+
+    def search_batch(self, requests: list[SearchRequest]) -> list[SearchResponse]:
+        """Run many searches with shared model and index calls, in request order."""
+        modes = [r.retrieval_mode or self.config.search.retrieval_mode for r in requests]
+        responses: list[SearchResponse | None] = [None] * len(requests)
+        cache_keys: list[str | None] = [None] * len(requests)
+        if self._result_cache is not None:
+            for i, (req, mode) in enumerate(zip(requests, modes)):
+                tc = time.perf_counter()
+                cache_keys[i] = self._result_cache.key(req, mode)
+                cached = self._result_cache.get(cache_keys[i])
+                if cached is not None:
+                    lookup_ms = round(_ms(tc), 2)
+                    responses[i] = cached.model_copy(
+                        update={
+                            "request_id": uuid.uuid4().hex[:12],
+                            "timings_ms": {"result_cache_ms": lookup_ms, "total_ms": lookup_ms},
+                        }
+                    )
+
+        pending = [i for i, r in enumerate(responses) if r is None]
+        if pending:
+            fresh = self._search_batch_uncached(
+                [requests[i] for i in pending], [modes[i] for i in pending]
+            )
+            for i, response in zip(pending, fresh):
+                responses[i] = response
+                # Degraded (timed out) responses are not worth repeating
+                if cache_keys[i] is not None and not response.rerank_skipped:
+                    self._result_cache.put(cache_keys[i], response)
+        return responses
+
+    @property
+    def store(self) -> MetadataStore:
+        return self._snapshot.store
+
+    @property
+    def faiss_index(self) -> FaissIndex:
+        return self._snapshot.faiss_index
+
+    @property
+    def table(self) -> ChunkTable:
+        return self._snapshot.table
 
     @property
     def embedding_cache(self) -> EmbeddingCache:
         return self._cache
 
+    @property
+    def result_cache(self) -> SearchResultCache | None:
+        return self._result_cache
+
+    @property
+    def rerank_cache(self) -> RerankScoreCache | None:
+        return self._rerank_cache
+
+    @property
+    def query_batcher(self) -> QueryBatcher | None:
+        return self._query_batcher
+
+    @property
+    def rerank_scheduler(self) -> RerankScheduler | None:
+        return self._rerank_scheduler
+
     def reload(self, config: HermesConfig | None = None) -> None:
-        """Reload artifacts from disk."""
-        if config:
-            self.config = config
-        artifacts = self.config.artifacts_dir
-        self.store.close()
-        self.store = MetadataStore(artifacts / "metadata.db")
-        self.faiss_index.load(artifacts / "faiss.index")
-        self._chunk_ids = self.store.all_chunk_ids()
-        if self._sparse and (artifacts / "sparse_index.json").exists():
-            self._sparse.load(artifacts / "sparse_index.json")
-        self._cache.clear()
-        log.info("pipeline_reloaded")
+        """Reload artifacts from disk into a new snapshot, swapped in with one assignment."""
+        with self._reload_lock:
+            if config:
+                self.config = config
+            old, self._snapshot = self._snapshot, _load_snapshot(self.config, self.biencoder.dim)
+            # Searches never use the store; its connection is only read while loading
+            old.store.close()
+            self._cache.clear()
+            if self._result_cache is not None:
+                self._result_cache.bump_generation()
+        log.info("pipeline_reloaded", n_chunks=self._snapshot.table.n_live)
+
+    def close(self) -> None:
+        """Stop the batching threads and worker pools and close the metadata store."""
+        if self._query_batcher is not None:
+            self._query_batcher.close()
+        if self._rerank_scheduler is not None:
+            self._rerank_scheduler.close()
+        # Timed-out reranks and retrievers may still be running; don't wait for them
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._retrieval_pool.shutdown(wait=False, cancel_futures=True)
+        self._snapshot.store.close()
 
     # Private Functions
 
+    def _search_batch_uncached(
+        self, requests: list[SearchRequest], modes: list[str]
+    ) -> list[SearchResponse]:
+        snap = self._snapshot
+        timings: dict[str, float] = {}
+
+        # 1. Embed all queries at once
+        t0 = time.perf_counter()
+        query_vecs = self._embed_queries([r.query for r in requests])
+        timings["embed_query_ms"] = _ms(t0)
+
+        # 2. Retrieval: one FAISS call for every unfiltered query that needs dense
+        # results; filtered queries search with their own position mask
+        t1 = time.perf_counter()
+        masks = [snap.filters.mask(r.filter_language, r.filter_path_prefix) for r in requests]
+        unfiltered = snap.filters.live_mask
+        dense_rows = [i for i, mode in enumerate(modes) if mode != "sparse"]
+        shared_rows = [i for i in dense_rows if masks[i] is unfiltered]
+        dense: dict[int, list[_Candidate]] = {}
+        if shared_rows:
+            k = max(requests[i].top_k_retrieve for i in shared_rows)
+            scores, ids = snap.faiss_index.search(query_vecs[shared_rows], k, unfiltered)
+            for row, i in enumerate(shared_rows):
+                dense[i] = self._dense_candidates(
+                    snap, scores[row], ids[row], requests[i].top_k_retrieve
+                )
+        for i in dense_rows:
+            if masks[i] is not unfiltered:
+                dense[i] = self._dense_retrieve(
+                    snap, query_vecs[i : i + 1], requests[i].top_k_retrieve, masks[i]
+                )
+
+        candidate_lists: list[list[_Candidate]] = []
+        for i, (req, mode) in enumerate(zip(requests, modes)):
+            if mode == "dense":
+                candidates = dense[i]
+            elif mode == "sparse":
+                candidates = self._sparse_retrieve(snap, req.query, req.top_k_retrieve, masks[i])
+            else:
+                sparse = self._sparse_retrieve(snap, req.query, req.top_k_retrieve, masks[i])
+                candidates = self._fuse(dense[i], sparse, req.top_k_retrieve)
+            candidate_lists.append(candidates)
+        timings["retrieval_ms"] = _ms(t1)
+        total_candidates = [len(c) for c in candidate_lists]
+
+        # 3. Rerank each query's head: cascades per query, or shared cross-encoder batches
+        t2 = time.perf_counter()
+        max_rerank = self.config.search.max_rerank_candidates
+        heads = [c[:max_rerank] for c in candidate_lists]
+        skipped = [False] * len(requests)
+        if self.config.search.rerank_mode == "cascade":
+            for i, (req, head) in enumerate(zip(requests, heads)):
+                if not head:
+                    continue
+                try:
+                    heads[i] = self._cascade_rerank(
+                        snap, req.query, head, req.top_k_rerank, timings
+                    )
+                except FuturesTimeout:
+                    log.warning("rerank_timeout", query_index=i)
+                    skipped[i] = True
+        elif any(heads):
+            # Same per-query budget as single searches
+            timeout = self.config.search.rerank_timeout_seconds * len(requests)
+            try:
+                heads = self._rerank_with_timeout(snap, [r.query for r in requests], heads, timeout)
+            except FuturesTimeout:
+                log.warning("rerank_timeout", n_queries=len(requests))
+                skipped = [bool(head) for head in heads]
+        candidate_lists = [
+            (c if skip else head + c[max_rerank:])
+            for head, c, skip in zip(heads, candidate_lists, skipped)
+        ]
+        timings["rerank_ms"] = _ms(t2)
+
+        # 4. Build results with a single metadata lookup
+        finals = [c[: r.top_k_rerank] for c, r in zip(candidate_lists, requests)]
+        metas = snap.table.get_chunks_by_ids(
+            [c.chunk_id for f in finals for c in f],
+            with_text=any(r.return_snippets for r in requests),
+        )
+        meta_map = {m["chunk_id"]: m for m in metas}
+        timings["total_ms"] = _ms(t0)
+        timings = {k: round(v, 2) for k, v in timings.items()}
+
+        return [
+            SearchResponse(
+                request_id=uuid.uuid4().hex[:12],
+                query=req.query,
+                retrieval_mode=mode,
+                results=self._build_results(snap, final, req.return_snippets, meta_map),
+                timings_ms=timings,
+                rerank_skipped=skip,
+                total_candidates=n,
+                rerank_pairs_scored=0 if skip else _pairs_scored(head),
+            )
+            for req, mode, final, n, head, skip in zip(
+                requests, modes, finals, total_candidates, heads, skipped
+            )
+        ]
+
     def _embed_query(self, query: str) -> np.ndarray:
         cached = self._cache.get(query)
         if cached is not None:
             return cached
-        vec = self.biencoder.encode_query(query)
+        if self._query_batcher is not None:
+            vec = self._query_batcher.encode(query)
+        else:
+            vec = self.biencoder.encode_query(query)
         self._cache.put(query, vec)
         return vec
 
+    def _embed_queries(self, queries: list[str]) -> np.ndarray:
+        """Embed *queries* as an (N, dim) matrix, encoding cache misses in one batch."""
+        vecs = [self._cache.get(q) for q in queries]
+        missing = list(dict.fromkeys(q for q, v in zip(queries, vecs) if v is None))
+        if missing:
+            encoded = self.biencoder.encode_queries(missing)
+            fresh = {q: encoded[i : i + 1] for i, q in enumerate(missing)}
+            for q, vec in fresh.items():
+                self._cache.put(q, vec)
+            vecs = [v if v is not None else fresh[q] for q, v in zip(queries, vecs)]
+        return np.vstack(vecs)
+
     def _retrieve(
-        self, query: str, query_vec: np.ndarray, top_k: int, mode: str
-    ) -> list[_Candidate]:
+        self,
+        snap: _Snapshot,
+        query: str,
+        top_k: int,
+        mode: str,
+        timings: dict[str, float],
+        mask: PositionMask | None = None,
+    ) -> tuple[list[_Candidate], list[str]]:
+        """Return candidates for *mode* and the names of retrievers that timed out."""
+        if mask is not None and not mask.n_selected:
+            return [], []
+        if mode == "hybrid":
+            return self._hybrid_retrieve(snap, query, top_k, timings, mask)
+        t0 = time.perf_counter()
         if mode == "dense":
-            return self._dense_retrieve(query_vec, top_k)
-        elif mode == "sparse":
-            return self._sparse_retrieve(query, top_k)
-        else:  # hybrid
-            dense = self._dense_retrieve(query_vec, top_k)
-            sparse = self._sparse_retrieve(query, top_k)
-            return self._fuse(dense, sparse, top_k)
-
-    def _dense_retrieve(self, query_vec: np.ndarray, top_k: int) -> list[_Candidate]:
-        scores, ids = self.faiss_index.search(query_vec, top_k)
+            query_vec = self._embed_query(query)
+            timings["embed_query_ms"] = _ms(t0)
+            t1 = time.perf_counter()
+            candidates = self._dense_retrieve(snap, query_vec, top_k, mask)
+        else:  # sparse needs no query embedding
+            t1 = t0
+            candidates = self._sparse_retrieve(snap, query, top_k, mask)
+        timings["retrieval_ms"] = _ms(t1)
+        return candidates, []
+
+    def _hybrid_retrieve(
+        self,
+        snap: _Snapshot,
+        query: str,
+        top_k: int,
+        timings: dict[str, float],
+        mask: PositionMask | None,
+    ) -> tuple[list[_Candidate], list[str]]:
+        """Run embed + FAISS and BM25 on two threads, then fuse.
+
+        A retriever that misses its timeout is skipped until its abandoned call finishes.
+        """
+        cfg = self.config.search
+        start = time.perf_counter()
+        retrievers = {
+            "dense": (self._timed_dense, cfg.dense_timeout_seconds),
+            "sparse": (self._timed_sparse, cfg.sparse_timeout_seconds),
+        }
+        # Only the dense side (model inference, FAISS) releases the GIL while BM25 runs
+        futures: dict[str, tuple[Future, float]] = {}
+        timed_out: list[str] = []
+        for name, (fn, timeout) in retrievers.items():
+            stalled = self._stalled.get(name)
+            if stalled is not None and not stalled.done():
+                timed_out.append(name)
+                log.warning("retriever_skipped", retriever=name, reason="previous_call_running")
+                continue
+            futures[name] = (self._retrieval_pool.submit(fn, snap, query, top_k, mask), timeout)
+        results: dict[str, list[_Candidate]] = {}
+        for name, (future, timeout) in futures.items():
+            remaining = max(0.0, start + timeout - time.perf_counter())
+            try:
+                results[name], stage_timings = future.result(timeout=remaining)
+                timings.update(stage_timings)
+            except FuturesTimeout:
+                # Already running, so it cannot be cancelled
+                self._stalled[name] = future
+                timed_out.append(name)
+                timings[f"{name}_ms"] = _ms(start)
+                log.warning("retriever_timeout", retriever=name, timeout_s=timeout)
+        timings["retrieval_ms"] = _ms(start)
+
+        if timed_out:
+            return results.get("dense") or results.get("sparse") or [], timed_out
+        return self._fuse(results["dense"], results["sparse"], top_k), []
+
+    def _timed_dense(
+        self, snap: _Snapshot, query: str, top_k: int, mask: PositionMask | None
+    ) -> tuple[list[_Candidate], dict[str, float]]:
+        t0 = time.perf_counter()
+        query_vec = self._embed_query(query)
+        embed_ms = _ms(t0)
+        t1 = time.perf_counter()
+        candidates = self._dense_retrieve(snap, query_vec, top_k, mask)
+        return candidates, {"embed_query_ms": embed_ms, "dense_ms": _ms(t1)}
+
+    def _timed_sparse(
+        self, snap: _Snapshot, query: str, top_k: int, mask: PositionMask | None
+    ) -> tuple[list[_Candidate], dict[str, float]]:
+        t0 = time.perf_counter()
+        candidates = self._sparse_retrieve(snap, query, top_k, mask)
+        return candidates, {"sparse_ms": _ms(t0)}
+
+    def _dense_retrieve(
+        self, snap: _Snapshot, query_vec: np.ndarray, top_k: int, mask: PositionMask | None = None
+    ) -> list[_Candidate]:
+        # Masks from FilterIndex exclude tombstones, so FAISS fills the top-k with live chunks
+        scores, ids = snap.faiss_index.search(query_vec, top_k, mask)
+        return self._dense_candidates(snap, scores[0], ids[0], top_k)
+
+    def _dense_candidates(
+        self, snap: _Snapshot, scores: np.ndarray, ids: np.ndarray, top_k: int
+    ) -> list[_Candidate]:
+        """Map one row of FAISS results to live candidates."""
         candidates = []
-        for rank, (score, idx) in enumerate(zip(scores[0], ids[0])):
-            if idx < 0 or idx >= len(self._chunk_ids):
+        for score, idx in zip(scores, ids):
+            if idx < 0 or idx >= len(snap.chunk_ids):
                 continue
-            db_id = self._chunk_ids[idx]
-            candidates.append(_Candidate(chunk_id=db_id, retrieval_score=float(score), retrieval_rank=rank + 1))
+            db_id = snap.chunk_ids[idx]
+            if db_id in snap.tombstones:
+                continue
+            if len(candidates) >= top_k:
+                break
+            rank = len(candidates)
+            candidates.append(
+                _Candidate(chunk_id=db_id, retrieval_score=float(score), retrieval_rank=rank + 1)
+            )
         return candidates
 
-    def _sparse_retrieve(self, query: str, top_k: int) -> list[_Candidate]:
-        if self._sparse is None:
+    def _sparse_retrieve(
+        self, snap: _Snapshot, query: str, top_k: int, mask: PositionMask | None = None
+    ) -> list[_Candidate]:
+        if snap.sparse is None:
             return []
-        scores, ids = self._sparse.search(query, top_k)
+        # Tombstoned chunks have no BM25 postings, so only real filters need the mask
+        if mask is None or mask is snap.filters.live_mask:
+            scores, ids = snap.sparse.search(query, top_k)
+        else:
+            scores, ids = snap.sparse.search(query, top_k, mask.mask)
         candidates = []
-        for rank, (score, idx) in enumerate(zip(scores, ids)):
+        for score, idx in zip(scores, ids):
             idx_int = int(idx)
-            if idx_int < 0 or idx_int >= len(self._chunk_ids):
+            if idx_int < 0 or idx_int >= len(snap.chunk_ids):
                 continue
-            db_id = self._chunk_ids[idx_int]
-            candidates.append(_Candidate(chunk_id=db_id, retrieval_score=float(score), retrieval_rank=rank + 1))
+            db_id = snap.chunk_ids[idx_int]
+            if db_id in snap.tombstones:
+                continue
+            if len(candidates) >= top_k:
+                break
+            rank = len(candidates)
+            candidates.append(
+                _Candidate(chunk_id=db_id, retrieval_score=float(score), retrieval_rank=rank + 1)
+            )
         return candidates
 
-    def _fuse(self, dense: list[_Candidate], sparse: list[_Candidate], top_k: int) -> list[_Candidate]:
+    def _fuse(
+        self, dense: list[_Candidate], sparse: list[_Candidate], top_k: int
+    ) -> list[_Candidate]:
         dense_pairs = [(c.chunk_id, c.retrieval_score) for c in dense]
         sparse_pairs = [(c.chunk_id, c.retrieval_score) for c in sparse]
-        fused = reciprocal_rank_fusion([dense_pairs, sparse_pairs], k=self.config.search.rrf_k, top_n=top_k)
+        fused = reciprocal_rank_fusion(
+            [dense_pairs, sparse_pairs], k=self.config.search.rrf_k, top_n=top_k
+        )
         return [
             _Candidate(chunk_id=cid, retrieval_score=score, retrieval_rank=rank + 1)
             for rank, (cid, score) in enumerate(fused)
         ]
 
-    def _rerank_with_timeout(self, query: str, candidates: list[_Candidate]) -> list[_Candidate]:
-        future = self._pool.submit(self._rerank, query, candidates)
-        timeout = self.config.search.rerank_timeout_seconds
-        return future.result(timeout=timeout)
-
-    def _rerank(self, query: str, candidates: list[_Candidate]) -> list[_Candidate]:
-        chunk_ids = [c.chunk_id for c in candidates]
-        metas = self.store.get_chunks_by_ids(chunk_ids)
-        texts = [m["code_text"] for m in metas]
-
-        scores = self.crossencoder.score_pairs(query, texts)
-
-        for cand, score in zip(candidates, scores):
-            cand.rerank_score = float(score)
-
-        candidates.sort(key=lambda c: c.rerank_score or 0.0, reverse=True)
-        return candidates
+    def _rerank_with_timeout(
+        self,
+        snap: _Snapshot,
+        queries: list[str],
+        candidate_lists: list[list[_Candidate]],
+        timeout: float,
+    ) -> list[list[_Candidate]]:
+        """Rerank each query's candidates; raises ``FuturesTimeout`` after *timeout* seconds.
+
+        Use the returned lists: the candidates in *candidate_lists* may not be the ones scored.
+        """
+        if self._rerank_scheduler is None:
+            # A timed-out worker keeps running: let it score copies, not the caller's candidates
+            copies = [[c.copy() for c in cands] for cands in candidate_lists]
+            future = self._pool.submit(self._rerank_batch, snap, queries, copies)
+            return future.result(timeout=timeout)
+        return self._rerank_batch(
+            snap, queries, candidate_lists, deadline=time.monotonic() + timeout
+        )
 
-    def _apply_filters(
-        self, candidates: list[_Candidate], language: str | None, path_prefix: str | None
+    def _cascade_rerank(
+        self,
+        snap: _Snapshot,
+        query: str,
+        candidates: list[_Candidate],
+        top_k: int,
+        timings: dict[str, float],
     ) -> list[_Candidate]:
-        chunk_ids = [c.chunk_id for c in candidates]
-        metas = self.store.get_chunks_by_ids(chunk_ids)
-        meta_map = {m["chunk_id"]: m for m in metas}
-
-        filtered = []
-        for c in candidates:
-            m = meta_map.get(c.chunk_id)
-            if m is None:
-                continue
-            if language and m["language"] != language:
-                continue
-            if path_prefix and not m["file_path"].startswith(path_prefix):
-                continue
-            filtered.append(c)
-        return filtered
+        """Cross-encode *candidates* in rounds until the top-*top_k* is stable.
 
-    def _build_results(self, candidates: list[_Candidate], return_snippets: bool) -> list[SearchResultItem]:
-        chunk_ids = [c.chunk_id for c in candidates]
-        metas = self.store.get_chunks_by_ids(chunk_ids)
-        meta_map = {m["chunk_id"]: m for m in metas}
+        Scored candidates come first, by score; only a first-round timeout raises.
+        """
+        search = self.config.search
+        t0 = time.perf_counter()
+        deadline = t0 + search.rerank_timeout_seconds
+        budget_end = t0 + search.cascade_time_budget_ms / 1000
+        if search.cascade_intermediate != "none":
+            candidates = self._intermediate_order(snap, query, candidates)
+            # Summed over the queries of a batch
+            timings["intermediate_ms"] = timings.get("intermediate_ms", 0.0) + _ms(t0)
+
+        scored: list[_Candidate] = []
+        start, n_rounds, reason = 0, 0, "exhausted"
+        while start < len(candidates):
+            size = search.cascade_round_size if scored else max(search.cascade_round_size, top_k)
+            batch = candidates[start : start + size]
+            start += len(batch)
+            try:
+                batch = self._rerank_with_timeout(
+                    snap, [query], [batch], max(0.0, deadline - time.perf_counter())
+                )[0]
+            except FuturesTimeout:
+                if not scored:
+                    raise
+                reason = "timeout"
+                break
+            n_rounds += 1
+            previous_top = [c.chunk_id for c in scored[:top_k]]
+            fresh = [c for c in batch if c.rerank_score is not None]
+            scored = sorted(scored + fresh, key=lambda c: c.rerank_score, reverse=True)
+            if start >= len(candidates):
+                break
+            if (
+                n_rounds > 1
+                and len(scored) >= top_k
+                and [c.chunk_id for c in scored[:top_k]] == previous_top
+                and max((c.rerank_score for c in fresh), default=float("-inf"))
+                <= scored[top_k - 1].rerank_score - search.cascade_margin
+            ):
+                reason = "stable"
+                break
+            if time.perf_counter() >= budget_end:
+                reason = "budget"
+                break
+
+        log.debug("cascade_rerank", rounds=n_rounds, pairs=len(scored), stop=reason)
+        scored_ids = {c.chunk_id for c in scored}
+        unscored = [c for c in candidates if c.chunk_id not in scored_ids]
+        return scored + unscored
+
+    def _intermediate_order(
+        self, snap: _Snapshot, query: str, candidates: list[_Candidate]
+    ) -> list[_Candidate]:
+        """Order *candidates* by the cascade's cheap scorer (best first)."""
+        if snap.vectors is not None:
+            positions = snap.table.positions([c.chunk_id for c in candidates])
+            valid = positions >= 0
+            scores = np.full(len(candidates), -np.inf, dtype=np.float32)
+            q = self._embed_query(query)[0]
+            scores[valid] = np.asarray(snap.vectors[positions[valid]], dtype=np.float32) @ q
+        else:
+            text_by_id = snap.table.texts([c.chunk_id for c in candidates])
+            scores = np.full(len(candidates), -np.inf, dtype=np.float32)
+            live = [i for i, c in enumerate(candidates) if c.chunk_id in text_by_id]
+            if live:
+                scores[live] = self._intermediate.score_pairs(
+                    query, [text_by_id[candidates[i].chunk_id] for i in live]
+                )
+        order = np.argsort(-scores, kind="stable")
+        return [candidates[i] for i in order]
+
+    def _rerank_batch(
+        self,
+        snap: _Snapshot,
+        queries: list[str],
+        candidate_lists: list[list[_Candidate]],
+        deadline: float | None = None,
+    ) -> list[list[_Candidate]]:
+        """Rerank several queries' candidates with packed cross-encoder calls."""
+        text_by_id = snap.table.texts([c.chunk_id for cands in candidate_lists for c in cands])
+
+        pairs: list[tuple[str, str]] = []
+        scored: list[_Candidate] = []
+        cached: list[tuple[_Candidate, float]] = []
+        for query, cands in zip(queries, candidate_lists):
+            live = [c for c in cands if c.chunk_id in text_by_id]
+            items = [(c.chunk_id, text_by_id[c.chunk_id]) for c in live]
+            hits = (
+                self._rerank_cache.get_many(query, items)
+                if self._rerank_cache is not None
+                else [None] * len(items)
+            )
+            for cand, (_, text), hit in zip(live, items, hits):
+                if hit is not None:
+                    cached.append((cand, hit))
+                else:
+                    pairs.append((query, text))
+                    scored.append(cand)
+
+        if not pairs:
+            scores = np.array([], dtype=np.float32)
+        elif deadline is None:
+            scores = self.crossencoder.score_pair_batch(pairs)
+        else:
+            future = self._rerank_scheduler.submit(pairs, deadline)
+            try:
+                scores = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeout:
+                future.cancel()
+                raise
+        for cand, score in zip(scored, scores):
+            cand.rerank_score = float(score)
+        for cand, score in cached:
+            cand.rerank_score = score
+            cand.rerank_cached = True
+        if self._rerank_cache is not None and scored:
+            fresh: dict[str, tuple[list[tuple[int, str]], list[float]]] = {}
+            for (query, text), cand in zip(pairs, scored):
+                items, values = fresh.setdefault(query, ([], []))
+                items.append((cand.chunk_id, text))
+                values.append(cand.rerank_score)
+            for query, (items, values) in fresh.items():
+                self._rerank_cache.put_many(query, items, values)
+
+        for cands in candidate_lists:
+            cands.sort(key=lambda c: c.rerank_score or 0.0, reverse=True)
+        return candidate_lists
+
+    def _build_results(
+        self,
+        snap: _Snapshot,
+        candidates: list[_Candidate],
+        return_snippets: bool,
+        meta_map: dict[int, dict] | None = None,
+    ) -> list[SearchResultItem]:
+        if meta_map is None:
+            metas = snap.table.get_chunks_by_ids(
+                [c.chunk_id for c in candidates], with_text=return_snippets
+            )
+            meta_map = {m["chunk_id"]: m for m in metas}
 
         results = []
         for final_rank, c in enumerate(candidates, 1):
@@ -243,16 +740,100 @@ class SearchPipeline:
         return results
 
 
+@dataclass(frozen=True)
+class _Snapshot:
+    """Everything loaded from one build's artifacts, replaced as a whole on reload."""
+
+    store: MetadataStore
+    faiss_index: FaissIndex
+    table: ChunkTable
+    # Position -> chunk_id, and the tombstoned chunk_ids
+    chunk_ids: list[int]
+    tombstones: set[int]
+    filters: FilterIndex
+    sparse: SparseIndex | None
+    # Chunk embeddings for the cascade's dense intermediate scorer
+    vectors: np.ndarray | None
+
+
 class _Candidate:
     """Internal mutable candidate during pipeline execution."""
 
-    __slots__ = ("chunk_id", "retrieval_score", "retrieval_rank", "rerank_score")
+    __slots__ = ("chunk_id", "rerank_cached", "rerank_score", "retrieval_rank", "retrieval_score")
 
     def __init__(self, chunk_id: int, retrieval_score: float, retrieval_rank: int) -> None:
         self.chunk_id = chunk_id
         self.retrieval_score = retrieval_score
         self.retrieval_rank = retrieval_rank
         self.rerank_score: float | None = None
+        # True when rerank_score came from the rerank cache, not the model
+        self.rerank_cached = False
+
+    def copy(self) -> _Candidate:
+        clone = _Candidate(self.chunk_id, self.retrieval_score, self.retrieval_rank)
+        clone.rerank_score = self.rerank_score
+        clone.rerank_cached = self.rerank_cached
+        return clone
+
+
+def _pairs_scored(candidates: list[_Candidate]) -> int:
+    """Candidates whose rerank score came from the cross-encoder (cache hits excluded)."""
+    return sum(c.rerank_score is not None and not c.rerank_cached for c in candidates)
+
+
+def _load_snapshot(config: HermesConfig, dim: int) -> _Snapshot:
+    """Load every search artifact under ``config.artifacts_dir``."""
+    artifacts = config.artifacts_dir
+    read_only = config.index.serve_read_only
+    store = MetadataStore(artifacts / "metadata.db", read_only=read_only)
+    faiss_index = FaissIndex(config.index, dim=dim)
+    faiss_index.load(artifacts / "faiss.index", mmap=read_only)
+    table = _load_chunk_table(artifacts, store, config.index)
+    vectors = None
+    search = config.search
+    if search.rerank_mode == "cascade" and search.cascade_intermediate == "dense":
+        vectors = np.load(artifacts / "embeddings.npy", mmap_mode="r")
+    return _Snapshot(
+        store=store,
+        faiss_index=faiss_index,
+        table=table,
+        chunk_ids=table.chunk_ids.tolist(),
+        tombstones=set(table.chunk_ids[~table.live].tolist()),
+        filters=FilterIndex(table),
+        sparse=_load_sparse(artifacts),
+        vectors=vectors,
+    )
+
+
+def _load_sparse(artifacts: Path) -> SparseIndex | None:
+    """Load the CSR sparse index, or convert a legacy JSON one, if present."""
+    sparse = SparseIndex()
+    if (artifacts / "sparse_index").is_dir():
+        sparse.load(artifacts / "sparse_index")
+    elif (artifacts / "sparse_index.json").exists():
+        sparse.load_legacy_json(artifacts / "sparse_index.json")
+    else:
+        return None
+    return sparse
+
+
+def _load_chunk_table(artifacts: Path, store: MetadataStore, config: IndexConfig) -> ChunkTable:
+    """Load the persisted chunk table, or build one in memory from SQLite if missing or stale."""
+    path = artifacts / "chunk_table"
+    if path.is_dir():
+        try:
+            table = ChunkTable.load(path, config.snippet_cache_blocks)
+        except (ValueError, FileNotFoundError) as exc:
+            log.warning("chunk_table_unreadable", path=str(path), error=str(exc))
+        else:
+            if len(table) == store.row_count() and table.n_live == store.count():
+                return table
+            log.warning("chunk_table_stale", n_table=len(table), n_store=store.row_count())
+    else:
+        log.warning("chunk_table_missing", path=str(path))
+    log.warning("chunk_table_built_in_memory", hint="re-run `hermes index` to persist it")
+    return ChunkTable.from_store(store, config)
+
 
 def _ms(start: float) -> float:
     return (time.perf_counter() - start) * 1000
@@ -0,0 +1,84 @@
+"""Response-level cache for repeated searches."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from hermes.search.schemas import SearchRequest, SearchResponse
+
+
+class SearchResultCache:
+    """Thread-safe LRU + TTL cache of whole search responses.
+
+    ``bump_generation()`` (called on reload) makes every earlier entry unreachable.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300.0) -> None:
+        self._cache: OrderedDict[tuple, tuple[float, SearchResponse]] = OrderedDict()
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._lock = Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, request: SearchRequest, mode: str) -> tuple:
+        """Cache key for *request* resolved to retrieval *mode*, at the current generation."""
+        return (
+            self.generation,
+            " ".join(request.query.split()),
+            mode,
+            request.top_k_retrieve,
+            request.top_k_rerank,
+            request.filter_language,
+            request.filter_path_prefix,
+            request.return_snippets,
+        )
+
+    def get(self, key: tuple) -> SearchResponse | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now and key[0] == self.generation:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._cache[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, response: SearchResponse) -> None:
+        with self._lock:
+            if key[0] != self.generation:
+                return
+            self._cache[key] = (time.monotonic() + self._ttl, response)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def bump_generation(self) -> None:
+        """Invalidate every cached response (the index changed)."""
+        with self._lock:
+            self.generation += 1
+            self._cache.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "evictions": self.evictions,
+        }
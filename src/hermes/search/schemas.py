@@ -15,6 +15,10 @@ class SearchRequest(BaseModel):
     return_snippets: bool = True
 
 
+class BatchSearchRequest(BaseModel):
+    requests: list[SearchRequest] = Field(..., min_length=1, max_length=1000)
+
+
 class SearchResultItem(BaseModel):
     chunk_id: int
     file_path: str
@@ -37,6 +41,14 @@ class SearchResponse(BaseModel):
     timings_ms: dict[str, float]
     rerank_skipped: bool = False
     total_candidates: int = 0
+    # (query, passage) pairs sent to the cross-encoder (rerank cache hits excluded)
+    rerank_pairs_scored: int = 0
+    # Hybrid retrievers that missed their timeout; results come from the others
+    retrievers_timed_out: list[str] = Field(default_factory=list)
+
+
+class BatchSearchResponse(BaseModel):
+    results: list[SearchResponse]
 
 
 class StatsResponse(BaseModel):
@@ -48,3 +60,10 @@ class StatsResponse(BaseModel):
     cache_hit_rate: float
     cache_hits: int
     cache_misses: int
+    search_executor: dict[str, int] | None = None
+    query_batching: dict | None = None
+    rerank_batching: dict | None = None
+    rerank_cache_hit_rate: float | None = None
+    rerank_cache_hits: int | None = None
+    rerank_cache_misses: int | None = None
+    result_cache: dict | None = None
@@ -0,0 +1,187 @@
+"""Shared fixtures: a small generated repository and deterministic stand-in models.
+
+The stand-ins keep the tests offline and fast. ``FakeBiEncoder`` hashes
+word tokens into a fixed number of buckets (so texts sharing words are
+close in cosine), and ``FakeCrossEncoder`` scores a pair by word overlap
+and counts every pair it is asked to score.
+"""
+
+from __future__ import annotations
+
+import re
+import zlib
+from collections.abc import Callable
+from pathlib import Path
+from typing import ClassVar
+
+import numpy as np
+import pytest
+
+from hermes.config import ChunkingConfig, EmbedConfig, HermesConfig, IndexConfig, SearchConfig
+
+DIM = 64
+
+_WORDS = (
+    "parse",
+    "token",
+    "stream",
+    "buffer",
+    "socket",
+    "cache",
+    "render",
+    "widget",
+    "matrix",
+    "vector",
+    "graph",
+    "queue",
+    "index",
+    "search",
+    "merge",
+    "split",
+    "encode",
+    "decode",
+    "compress",
+    "schedule",
+    "retry",
+    "timeout",
+    "config",
+    "logger",
+    "session",
+    "user",
+)
+
+
+def _tokens(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class FakeBiEncoder:
+    """Bag-of-hashed-words embedder with the :class:`BiEncoder` interface."""
+
+    def __init__(self, config: EmbedConfig, model_cache_dir: Path | None = None) -> None:
+        from hermes.embed.biencoder import EncodeStats
+
+        self.config = config
+        self.dim = DIM
+        self.stats = EncodeStats()
+
+    def encode_texts(self, texts: list[str], show_progress: bool = False) -> np.ndarray:
+        out = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _tokens(text):
+                out[row, zlib.crc32(token.encode()) % DIM] += 1.0
+            out[row, 0] += 1e-3
+        if texts:
+            self.stats.record_batch(np.array([len(t) for t in texts]))
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        return self.encode_texts([query])
+
+    def encode_queries(self, queries: list[str]) -> np.ndarray:
+        return self.encode_texts(queries)
+
+
+class FakeCrossEncoder:
+    """Scores (query, passage) pairs by shared words; counts the pairs it scores."""
+
+    instances: ClassVar[list[FakeCrossEncoder]] = []
+
+    def __init__(self, config: EmbedConfig, model_cache_dir: Path | None = None) -> None:
+        self.config = config
+        self.n_pairs = 0
+        # Called before each batch is scored (tests use it to act mid-search)
+        self.before_score: Callable[[], None] | None = None
+        FakeCrossEncoder.instances.append(self)
+
+    def score_pairs(self, query: str, passages: list[str]) -> np.ndarray:
+        return self.score_pair_batch([(query, p) for p in passages])
+
+    def score_pair_batch(self, pairs: list[tuple[str, str]]) -> np.ndarray:
+        if self.before_score is not None:
+            self.before_score()
+        self.n_pairs += len(pairs)
+        scores = []
+        for query, passage in pairs:
+            words = set(_tokens(passage))
+            overlap = sum(t in words for t in _tokens(query))
+            # Small deterministic tie-breaker so rankings are total
+            scores.append(overlap + (zlib.crc32(passage.encode()) % 1000) / 1e4)
+        return np.asarray(scores, dtype=np.float32)
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Replace the sentence-transformers models with the stand-ins above."""
+    import hermes.embed.biencoder
+    import hermes.search.pipeline
+
+    FakeCrossEncoder.instances = []
+    monkeypatch.setattr(hermes.embed.biencoder, "BiEncoder", FakeBiEncoder)
+    monkeypatch.setattr(hermes.search.pipeline, "BiEncoder", FakeBiEncoder)
+    monkeypatch.setattr(hermes.search.pipeline, "CrossEncoder", FakeCrossEncoder)
+    return FakeCrossEncoder
+
+
+def _write_module(repo: Path, rel: str, seed: int, n_funcs: int = 3) -> None:
+    """Write a Python (or, for ``.js`` paths, JavaScript) file of small functions."""
+    rng = np.random.default_rng(seed)
+    path = repo / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    parts = []
+    for i in range(n_funcs):
+        words = [str(w) for w in rng.choice(_WORDS, size=6, replace=False)]
+        name = f"{words[0]}_{words[1]}_{seed}_{i}"
+        body = " ".join(words)
+        if rel.endswith(".js"):
+            parts.append(
+                f"function {name}(input) {{\n"
+                f"  // {body}\n"
+                f"  return input.map((x) => x + '{words[2]} {words[3]}');\n"
+                f"}}\n"
+            )
+        else:
+            parts.append(
+                f"def {name}(value):\n"
+                f'    """{body}."""\n'
+                f"    result = [item for item in value if item != '{words[2]}']\n"
+                f"    return '{words[3]} {words[4]}', result\n"
+            )
+    path.write_text("\n\n".join(parts))
+
+
+@pytest.fixture
+def write_module():
+    return _write_module
+
+
+@pytest.fixture
+def repo(tmp_path) -> Path:
+    """A repository of 24 Python files and 6 JavaScript files."""
+    root = tmp_path / "repo"
+    for i in range(24):
+        _write_module(root, f"pkg/mod{i}.py", seed=i)
+    for i in range(6):
+        _write_module(root, f"web/app{i}.js", seed=100 + i)
+    return root
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Build a config for *tmp_path*: single process, small batches, no result cache.
+
+    Keyword arguments replace whole config groups (``index=IndexConfig(...)``).
+    """
+
+    def _make(**sections) -> HermesConfig:
+        return HermesConfig(
+            artifacts_dir=tmp_path / "artifacts",
+            chunking=sections.get("chunking", ChunkingConfig(workers=1)),
+            embed=sections.get(
+                "embed", EmbedConfig(workers=1, chunk_cache_dir=tmp_path / "embedding_cache")
+            ),
+            index=sections.get("index", IndexConfig(faiss_index_type="flat", build_batch_size=16)),
+            search=sections.get("search", SearchConfig(result_cache_size=0)),
+        )
+
+    return _make
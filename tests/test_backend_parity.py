@@ -0,0 +1,72 @@
+"""Parity of the ONNX Runtime backend with torch on the default models.
+
+Runs only where torch, onnxruntime and sentence-transformers are installed
+and the models can be loaded (from the local Hugging Face cache or the hub).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from hermes.config import EmbedConfig
+from hermes.embed.biencoder import BiEncoder
+from hermes.embed.crossencoder import CrossEncoder
+from hermes.eval.backend_bench import MAX_SCORE_ABS_DIFF, MIN_EMBEDDING_COSINE
+
+QUERIES = ["parse a config file", "retry a socket connection with a timeout"]
+PASSAGES = [
+    "def load_config(path):\n    with open(path) as fh:\n        return yaml.safe_load(fh)",
+    (
+        "async def connect(host, port, retries=3):\n"
+        "    for attempt in range(retries):\n"
+        "        try:\n"
+        "            return await asyncio.wait_for(open_connection(host, port), timeout=5)\n"
+        "        except TimeoutError:\n"
+        "            await asyncio.sleep(2 ** attempt)"
+    ),
+    "function render(widget) {\n  return `<div>${widget.title}</div>`;\n}",
+    "SELECT user_id, COUNT(*) FROM sessions GROUP BY user_id",
+]
+
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp("models")
+    loaded = {}
+    for backend in ("torch", "onnx"):
+        config = EmbedConfig(backend=backend, workers=1)
+        try:
+            loaded[backend] = (BiEncoder(config, cache_dir), CrossEncoder(config, cache_dir))
+        except OSError as exc:  # offline without the models cached
+            pytest.skip(f"cannot load the {backend} models: {exc}")
+    return loaded
+
+
+def test_embeddings_match(models):
+    outputs = {}
+    for backend, (biencoder, _) in models.items():
+        outputs[backend] = np.vstack(
+            [
+                biencoder.encode_queries(QUERIES),
+                biencoder.encode_texts(PASSAGES, show_progress=False),
+            ]
+        )
+    cosines = np.sum(outputs["torch"] * outputs["onnx"], axis=1)
+    assert cosines.min() >= MIN_EMBEDDING_COSINE
+
+
+def test_rerank_scores_and_order_match(models):
+    pairs = [(q, p) for q in QUERIES for p in PASSAGES]
+    scores = {
+        backend: crossencoder.score_pair_batch(pairs).reshape(len(QUERIES), len(PASSAGES))
+        for backend, (_, crossencoder) in models.items()
+    }
+    np.testing.assert_allclose(scores["onnx"], scores["torch"], atol=MAX_SCORE_ABS_DIFF)
+    np.testing.assert_array_equal(
+        np.argsort(-scores["onnx"], axis=1), np.argsort(-scores["torch"], axis=1)
+    )
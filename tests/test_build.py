@@ -0,0 +1,137 @@
+"""Tests of the streaming index build over a small generated repository."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from hermes.config import ChunkingConfig, EmbedConfig, IndexConfig, SearchConfig
+from hermes.index.build import build_index
+from hermes.index.metadata_store import MetadataStore
+from hermes.search.pipeline import SearchPipeline
+from hermes.search.schemas import SearchRequest
+
+
+@pytest.fixture
+def fail_on_second_batch(monkeypatch):
+    """Make the stand-in bi-encoder (see ``fake_models``) raise on its second call once armed."""
+    import hermes.embed.biencoder
+
+    calls = []
+
+    def arm():
+        fake = hermes.embed.biencoder.BiEncoder
+        encode = fake.encode_texts
+
+        def flaky(self, texts, show_progress=False):
+            calls.append(len(texts))
+            if len(calls) == 2:
+                raise RuntimeError("embedding failed")
+            return encode(self, texts, show_progress)
+
+        monkeypatch.setattr(fake, "encode_texts", flaky)
+
+    return arm
+
+
+def _snapshot(artifacts) -> dict:
+    store = MetadataStore(artifacts / "metadata.db")
+    rows = store.row_count()
+    store.close()
+    return {
+        "rows": rows,
+        "embeddings": np.load(artifacts / "embeddings.npy"),
+        "table": (artifacts / "chunk_table" / "meta.json").read_text(),
+    }
+
+
+def _leftovers(artifacts) -> list[str]:
+    return sorted(p.name for p in artifacts.rglob("*.tmp"))
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_failed_build_leaves_the_previous_artifacts(
+    fake_models, repo, make_config, write_module, fail_on_second_batch, incremental
+):
+    config = make_config(search=SearchConfig(result_cache_size=0))
+    build_index(repo, config)
+    artifacts = config.artifacts_dir
+    before = _snapshot(artifacts)
+    request = SearchRequest(query="parse token stream", top_k_retrieve=20, top_k_rerank=5)
+    results = SearchPipeline(config).search(request).results
+    assert results
+
+    for i in range(8):
+        write_module(repo, f"pkg/new{i}.py", seed=200 + i)
+    fail_on_second_batch()
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        build_index(repo, config, incremental=incremental)
+
+    assert _leftovers(artifacts) == []
+    after = _snapshot(artifacts)
+    np.testing.assert_array_equal(after["embeddings"], before["embeddings"])
+    assert after["table"] == before["table"]
+    assert after["rows"] == before["rows"]
+    assert SearchPipeline(config).search(request).results == results
+
+
+def test_incremental_build_scores_like_a_full_build(
+    fake_models, repo, make_config, write_module, tmp_path
+):
+    config = make_config(search=SearchConfig(result_cache_size=0, retrieval_mode="sparse"))
+    build_index(repo, config)
+    for i in range(0, 12, 3):
+        (repo / f"pkg/mod{i}.py").unlink()
+    write_module(repo, "pkg/mod1.py", seed=500)
+    write_module(repo, "pkg/added.py", seed=501)
+    build_index(repo, config, incremental=True)
+
+    full = config.model_copy(update={"artifacts_dir": tmp_path / "full"})
+    assert build_index(repo, full)["faiss_index_type"] == "flat"
+
+    query = "parse token stream cache"
+    responses = [
+        SearchPipeline(c).search(SearchRequest(query=query, top_k_retrieve=20, top_k_rerank=20))
+        for c in (config, full)
+    ]
+    incremental, rebuilt = (
+        {(r.file_path, r.start_line): r.retrieval_score for r in resp.results} for resp in responses
+    )
+    assert incremental == rebuilt
+
+
+def test_incremental_builds_compact_once_too_much_is_tombstoned(
+    fake_models, repo, make_config, write_module
+):
+    config = make_config(index=IndexConfig(faiss_index_type="flat", max_tombstone_ratio=0.2))
+    build_index(repo, config)
+
+    def tombstone_ratio() -> float:
+        store = MetadataStore(config.artifacts_dir / "metadata.db")
+        ratio = len(store.tombstoned_ids()) / store.row_count()
+        store.close()
+        return ratio
+
+    # Rewrite three files per run: each incremental run tombstones their old chunks
+    compacted = False
+    for run in range(8):
+        before = tombstone_ratio()
+        for i in range(run * 3, run * 3 + 3):
+            write_module(repo, f"pkg/mod{i}.py", seed=300 + i)
+        summary = build_index(repo, config, incremental=True)
+        if before > 0.2:
+            # A full rebuild: every position is live again
+            assert "mode" not in summary
+            assert tombstone_ratio() == 0
+            compacted = True
+            break
+        assert summary["mode"] == "incremental" and summary["n_chunks_tombstoned"] > 0
+    assert compacted
+
+
+@pytest.mark.parametrize("group", [ChunkingConfig, EmbedConfig])
+def test_worker_counts_must_be_explicit(group):
+    # 0 used to mean one process per CPU, each embedding worker with its own model copy
+    with pytest.raises(ValidationError):
+        group(workers=0)
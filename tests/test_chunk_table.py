@@ -0,0 +1,99 @@
+"""Tests for the columnar chunk table and its streaming writer."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from hermes.chunking.base import Chunk
+from hermes.config import IndexConfig
+from hermes.index.chunk_table import ChunkTable, ChunkTableWriter, stored_row_count
+from hermes.index.metadata_store import MetadataStore
+
+CONFIG = IndexConfig(snippet_block_bytes=1024)
+
+
+def _chunks(files: list[str], per_file: int = 4) -> list[Chunk]:
+    return [
+        Chunk(
+            file_path=path,
+            language="python" if path.endswith(".py") else "javascript",
+            start_line=10 * i + 1,
+            end_line=10 * i + 9,
+            code_text=f"def f{i}():\n    return {path!r}  # {'x' * i}",
+            symbol_name=f"f{i}" if i % 2 else "",
+        )
+        for path in files
+        for i in range(per_file)
+    ]
+
+
+def _assert_same(a: ChunkTable, b: ChunkTable) -> None:
+    assert len(a) == len(b) and a.n_live == b.n_live
+    assert (a.paths, a.languages, a.symbols) == (b.paths, b.languages, b.symbols)
+    for name in ("chunk_ids", "start_lines", "end_lines", "path_ids", "language_ids", "live"):
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
+    assert [a.text(i) for i in range(len(a))] == [b.text(i) for i in range(len(b))]
+
+
+def test_from_store_matches_the_store(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.db")
+    ids = store.insert_chunks(_chunks(["b.py", "a.js", "c.py"]))
+    store.tombstone(ids[:4])
+    table = ChunkTable.from_store(store, CONFIG, tmp_path / "chunk_table")
+
+    assert table.paths == ["a.js", "b.py", "c.py"]
+    assert len(table) == 12 and table.n_live == 8
+    assert stored_row_count(tmp_path / "chunk_table") == 12
+    assert table.get_chunks_by_ids(ids) == store.get_chunks_by_ids(ids)
+
+
+def test_from_store_without_a_path_builds_in_memory(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.db")
+    ids = store.insert_chunks(_chunks(["b.py", "a.js"]))
+    store.tombstone(ids[:2])
+    before = sorted(p.name for p in tmp_path.iterdir())
+    table = ChunkTable.from_store(store, CONFIG)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == before
+    assert not isinstance(table.chunk_ids, np.memmap)
+    _assert_same(table, ChunkTable.from_store(store, CONFIG, tmp_path / "chunk_table"))
+    assert table.get_chunks_by_ids(ids) == store.get_chunks_by_ids(ids)
+
+
+def test_appending_to_a_base_table_matches_a_full_rewrite(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.db")
+    store.insert_chunks(_chunks(["b.py", "c.py"]))
+    path = tmp_path / "chunk_table"
+    ChunkTable.from_store(store, CONFIG, path)
+    serving = ChunkTable.load(path)
+
+    # An incremental build: new paths sort before and between the old ones
+    old = store.get_chunks_by_ids([1, 2, 3, 4])
+    new = _chunks(["a.py", "bb.js", "b.py"])
+    new_ids = store.insert_chunks(new)
+    store.tombstone([1, 2, 3, 4])
+    writer = ChunkTableWriter(path, CONFIG, base=path)
+    writer.add(
+        (cid, c.file_path, c.language, c.start_line, c.end_line, c.code_text, c.symbol_name)
+        for cid, c in zip(new_ids, new)
+    )
+    writer.close(store.tombstoned_ids())
+
+    appended = ChunkTable.load(path)
+    _assert_same(appended, ChunkTable.from_store(store, CONFIG, tmp_path / "rewritten"))
+    # The previous table is still readable by a process that has it mapped
+    assert serving.get_chunks_by_ids([1, 2, 3, 4]) == old
+    assert serving.n_live == 8
+
+
+def test_discarded_writer_leaves_the_previous_table(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.db")
+    store.insert_chunks(_chunks(["a.py"]))
+    path = tmp_path / "chunk_table"
+    ChunkTable.from_store(store, CONFIG, path)
+
+    writer = ChunkTableWriter(path, CONFIG, base=path)
+    writer.add(store.iter_rows())
+    writer.discard()
+    assert not path.with_name("chunk_table.tmp").exists()
+    assert len(ChunkTable.load(path)) == 4
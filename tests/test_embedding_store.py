@@ -0,0 +1,74 @@
+"""Tests for the streaming ``embeddings.npy`` writer."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from hermes.index.embedding_store import EmbeddingWriter
+
+
+def _rows(n: int, dim: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_write_and_append(tmp_path):
+    path = tmp_path / "embeddings.npy"
+    first, second = _rows(5), _rows(3, seed=1)
+    with EmbeddingWriter(path, 8) as writer:
+        writer.append(first[:2])
+        writer.append(first[2:])
+    np.testing.assert_array_equal(np.load(path), first)
+
+    with EmbeddingWriter(path, 8, append=True) as writer:
+        assert writer.n_rows == 5
+        writer.append(second)
+    np.testing.assert_array_equal(np.load(path), np.vstack([first, second]))
+
+
+def test_rewrite_keeps_existing_memory_maps_valid(tmp_path):
+    path = tmp_path / "embeddings.npy"
+    old = _rows(1000)
+    with EmbeddingWriter(path, 8) as writer:
+        writer.append(old)
+    mapped = np.load(path, mmap_mode="r")
+
+    # A full rebuild while a search process still maps the old file
+    writer = EmbeddingWriter(path, 8)
+    writer.append(_rows(10, seed=1))
+    np.testing.assert_array_equal(mapped, old)
+    writer.close()
+    np.testing.assert_array_equal(mapped, old)
+    assert np.load(path).shape == (10, 8)
+
+
+def test_failed_rewrite_leaves_previous_file(tmp_path):
+    path = tmp_path / "embeddings.npy"
+    old = _rows(4)
+    with EmbeddingWriter(path, 8) as writer:
+        writer.append(old)
+    with pytest.raises(RuntimeError), EmbeddingWriter(path, 8) as writer:
+        writer.append(_rows(2, seed=1))
+        raise RuntimeError("build failed")
+    np.testing.assert_array_equal(np.load(path), old)
+    assert not path.with_name(path.name + ".tmp").exists()
+
+
+def test_failed_append_drops_the_new_rows(tmp_path):
+    path = tmp_path / "embeddings.npy"
+    old = _rows(4)
+    with EmbeddingWriter(path, 8) as writer:
+        writer.append(old)
+    with pytest.raises(RuntimeError), EmbeddingWriter(path, 8, append=True) as writer:
+        writer.append(_rows(3, seed=1))
+        raise RuntimeError("build failed")
+    np.testing.assert_array_equal(np.load(path), old)
+    assert path.stat().st_size == np.lib.format.open_memmap(path, mode="r").offset + old.nbytes
+
+
+def test_append_rejects_wrong_dim(tmp_path):
+    path = tmp_path / "embeddings.npy"
+    with EmbeddingWriter(path, 8) as writer:
+        writer.append(_rows(2))
+    with pytest.raises(ValueError):
+        EmbeddingWriter(path, 16, append=True)
@@ -0,0 +1,40 @@
+"""Tests of the bounded search executor used by the API."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from hermes.api.executor import ExecutorSaturated, SearchExecutor
+
+
+async def test_cancelled_callers_hold_their_slot_until_the_thread_finishes():
+    executor = SearchExecutor(workers=1, max_queue=0)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_search():
+        started.set()
+        release.wait(5)
+
+    task = asyncio.create_task(executor.run(slow_search))
+    await asyncio.to_thread(started.wait, 5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The worker thread is still busy, so the next search is rejected
+    assert executor.in_flight == 1
+    with pytest.raises(ExecutorSaturated):
+        await executor.run(lambda: None)
+
+    release.set()
+    for _ in range(100):
+        if executor.in_flight == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert executor.in_flight == 0
+    assert await executor.run(lambda: 42) == 42
+    executor.shutdown()
@@ -0,0 +1,164 @@
+"""Tests for the FAISS index wrapper."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from hermes.config import IndexConfig
+from hermes.index.embedding_store import EmbeddingWriter
+from hermes.index.faiss_index import FaissIndex, PositionMask
+
+
+def _unit_rows(n: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    x = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _save(tmp_path, vectors: np.ndarray, index_type: str) -> FaissIndex:
+    index = FaissIndex(IndexConfig(faiss_index_type=index_type), dim=vectors.shape[1])
+    index.build(vectors)
+    index.save(tmp_path / "faiss.index")
+    with EmbeddingWriter(tmp_path / "embeddings.npy", vectors.shape[1]) as writer:
+        writer.append(vectors)
+    return index
+
+
+def test_binary_rescoring_survives_a_rebuild(tmp_path):
+    vectors = _unit_rows(500)
+    _save(tmp_path, vectors, "binary")
+    served = FaissIndex(IndexConfig(), dim=32)
+    served.load(tmp_path / "faiss.index", mmap=True)
+    _, before = served.search(vectors[:5], 10)
+
+    # Full rebuild of the artifacts under the loaded index
+    _save(tmp_path, _unit_rows(50, seed=1), "binary")
+    scores, after = served.search(vectors[:5], 10)
+    np.testing.assert_array_equal(before, after)
+    assert (after[:, 0] == np.arange(5)).all()
+    np.testing.assert_allclose(scores[:, 0], 1.0, rtol=1e-5)
+
+
+def _exact_top(vectors: np.ndarray, queries: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    positions = np.flatnonzero(mask)
+    scores = queries @ vectors[positions].T
+    return positions[np.argsort(-scores, axis=1, kind="stable")[:, :k]]
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "hnsw"])
+@pytest.mark.parametrize("with_vectors", [False, True])
+def test_selective_filter_fills_the_top_k_on_partial_indexes(tmp_path, index_type, with_vectors):
+    vectors, queries = _unit_rows(3000), _unit_rows(5, seed=1)
+    config = IndexConfig(
+        faiss_index_type=index_type,
+        faiss_ivf_nlist=30,
+        faiss_nprobe=1,
+        faiss_hnsw_m=8,
+        faiss_hnsw_ef_search=16,
+    )
+    index = FaissIndex(config, dim=32)
+    index.build(vectors)
+    index.save(tmp_path / "faiss.index")
+    if with_vectors:
+        with EmbeddingWriter(tmp_path / "embeddings.npy", 32) as writer:
+            writer.append(vectors)
+    served = FaissIndex(config, dim=32)
+    served.load(tmp_path / "faiss.index")
+
+    mask = PositionMask(np.random.default_rng(2).random(3000) < 0.01)
+    _, ids = served.search(queries, 10, mask)
+    assert (ids >= 0).all()
+    assert mask.mask[ids].all()
+    expected = _exact_top(vectors, queries, mask.mask, 10)
+    np.testing.assert_array_equal(np.sort(ids), np.sort(expected))
+
+
+def test_position_mask_packs_its_bitmap_once(tmp_path):
+    vectors = _unit_rows(200)
+    index = FaissIndex(IndexConfig(faiss_index_type="flat"), dim=32)
+    index.build(vectors)
+    mask = PositionMask(np.arange(200) % 3 == 0)
+
+    _, first = index.search(vectors[:3], 5, mask)
+    bitmap = mask.bitmap(200)
+    _, second = index.search(vectors[:3], 5, mask)
+    assert mask.bitmap(200) is bitmap
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_array_equal(first, _exact_top(vectors, vectors[:3], mask.mask, 5))
+
+
+@pytest.mark.parametrize(
+    ("n", "expected"),
+    [(50, "flat"), (500, "hnsw"), (600, "ivf_flat"), (1000, "opq_ivf_pq")],
+)
+def test_auto_picks_the_type_that_fits_the_memory_budget(n, expected):
+    # dim 384, M=32: flat vectors take 1536 B each, an HNSW node 1792 B; budget 1 MiB
+    config = IndexConfig(
+        faiss_index_type="auto", faiss_auto_flat_max=100, faiss_memory_budget_mb=1, faiss_hnsw_m=32
+    )
+    index = FaissIndex(config, dim=384)
+    index._choose_type(n)
+    assert index.index_type == expected
+    if expected == "opq_ivf_pq":
+        assert index.params["pq_m"] == 96
+
+
+def test_default_index_is_exact_and_ignores_the_auto_thresholds():
+    config = IndexConfig(faiss_auto_flat_max=100)
+    assert config.faiss_index_type == "flat"
+    index = FaissIndex(config, dim=32)
+    index._choose_type(10_000)
+    assert index.index_type == "flat"
+    legacy = FaissIndex(IndexConfig(faiss_use_ivf=True), dim=32)
+    legacy._choose_type(10_000)
+    assert legacy.index_type == "ivf_flat"
+
+
+def test_auto_stream_below_the_flat_limit_and_short_training_fall_back_to_flat():
+    vectors = _unit_rows(300)
+    auto = FaissIndex(IndexConfig(faiss_index_type="auto", faiss_auto_flat_max=1000), dim=32)
+    auto.build(vectors)
+    assert auto.index_type == "flat"
+
+    # IVF with 100 lists wants 4000 training points
+    ivf = FaissIndex(IndexConfig(faiss_index_type="ivf_flat"), dim=32)
+    ivf.build(vectors)
+    assert ivf.index_type == "flat"
+    _, ids = ivf.search(vectors[:3], 1)
+    np.testing.assert_array_equal(ids[:, 0], np.arange(3))
+
+
+# PQ codes on isotropic random vectors lose most of the top-10 ordering; the true match stays first
+@pytest.mark.parametrize(
+    ("index_type", "min_recall"), [("hnsw", 0.9), ("ivf_pq", 0.35), ("opq_ivf_pq", 0.35)]
+)
+def test_approximate_types_round_trip_and_keep_recall(tmp_path, index_type, min_recall):
+    vectors = _unit_rows(4000)
+    rng = np.random.default_rng(3)
+    queries = vectors[:50] + 0.05 * rng.standard_normal((50, 32)).astype(np.float32)
+    config = IndexConfig(
+        faiss_index_type=index_type,
+        faiss_ivf_nlist=16,
+        faiss_nprobe=16,
+        faiss_pq_nbits=6,
+        faiss_hnsw_m=16,
+    )
+    index = FaissIndex(config, dim=32)
+    # Streamed in batches smaller than the training sample
+    for start in range(0, len(vectors), 500):
+        index.add(vectors[start : start + 500])
+    index.finalize()
+    assert index.index_type == index_type
+    index.save(tmp_path / "faiss.index")
+
+    # nprobe / efSearch are query-time knobs taken from the serving config
+    served = FaissIndex(config, dim=32)
+    served.load(tmp_path / "faiss.index", mmap=True)
+    assert (served.index_type, served.params) == (index.index_type, index.params)
+    _, ids = served.search(queries, 10)
+    np.testing.assert_array_equal(ids, index.search(queries, 10)[1])
+
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :10]
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(ids, exact)])
+    assert recall >= min_recall
+    assert (ids[:, 0] == np.arange(50)).mean() >= 0.9
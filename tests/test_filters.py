@@ -0,0 +1,86 @@
+"""Tests for filtered search: position masks pushed into FAISS and BM25."""
+
+from __future__ import annotations
+
+import pytest
+
+from hermes.config import SearchConfig
+from hermes.index.build import build_index
+from hermes.search.pipeline import SearchPipeline
+from hermes.search.schemas import SearchRequest
+
+
+@pytest.fixture
+def pipeline(fake_models, repo, make_config, write_module):
+    config = make_config(search=SearchConfig(result_cache_size=0, retrieval_mode="hybrid"))
+    build_index(repo, config)
+    # Tombstone the chunks of one JavaScript file
+    write_module(repo, "web/app0.js", seed=900)
+    build_index(repo, config, incremental=True)
+    return SearchPipeline(config)
+
+
+@pytest.mark.parametrize("mode", ["dense", "sparse", "hybrid"])
+def test_language_filter_returns_a_full_top_k_of_live_matches(pipeline, mode):
+    request = SearchRequest(
+        query="render widget queue",
+        retrieval_mode=mode,
+        top_k_retrieve=12,
+        top_k_rerank=12,
+        filter_language="javascript",
+    )
+    response = pipeline.search(request)
+    table = pipeline.table
+    js = table.languages.index("javascript")
+    live_js = set(table.chunk_ids[(table.language_ids == js) & table.live].tolist())
+
+    assert response.results
+    assert {r.chunk_id for r in response.results} <= live_js
+    if mode != "sparse":  # BM25 only returns chunks sharing a query term
+        assert len(response.results) == min(12, len(live_js))
+
+
+def test_path_prefix_filter_and_unknown_language(pipeline):
+    response = pipeline.search(
+        SearchRequest(query="parse token", top_k_rerank=20, filter_path_prefix="pkg/mod1")
+    )
+    assert response.results
+    assert all(r.file_path.startswith("pkg/mod1") for r in response.results)
+
+    none = pipeline.search(SearchRequest(query="parse token", filter_language="cobol"))
+    assert none.results == [] and none.total_candidates == 0
+
+
+def test_repeated_filters_reuse_the_cached_mask(pipeline):
+    filters = pipeline._snapshot.filters
+    first = filters.mask("python", "pkg/")
+    assert filters.mask("python", "pkg/") is first
+    assert filters.mask("python", None) is not first
+    # Unfiltered searches still skip the tombstoned chunks
+    assert filters.mask(None, None) is filters.live_mask
+    assert filters.live_mask.n_selected == pipeline.table.n_live < len(pipeline.table)
+
+
+@pytest.mark.parametrize("mode", ["dense", "hybrid"])
+def test_unfiltered_search_skips_tombstones_without_over_fetching(pipeline, mode, monkeypatch):
+    index = pipeline.faiss_index
+    search = index.search
+    calls = []
+
+    def spy(query_vec, top_k, mask=None):
+        calls.append((top_k, mask))
+        return search(query_vec, top_k, mask)
+
+    monkeypatch.setattr(index, "search", spy)
+    request = SearchRequest(
+        query="render widget queue", retrieval_mode=mode, top_k_retrieve=30, top_k_rerank=30
+    )
+    for response in (pipeline.search(request), *pipeline.search_batch([request, request])):
+        table = pipeline.table
+        live = set(table.chunk_ids[table.live].tolist())
+        assert {r.chunk_id for r in response.results} <= live
+        if mode == "dense":
+            assert len(response.results) == 30
+    assert calls and all(
+        top_k == 30 and mask is pipeline._snapshot.filters.live_mask for top_k, mask in calls
+    )
@@ -0,0 +1,56 @@
+"""Tests for the SQLite chunk metadata store."""
+
+from __future__ import annotations
+
+from hermes.chunking.base import Chunk
+from hermes.index.metadata_store import MetadataStore
+
+
+def _chunks(n: int, path: str = "a.py") -> list[Chunk]:
+    return [Chunk(path, "python", i, i + 1, f"def f{i}(): pass") for i in range(n)]
+
+
+def _index_names(store: MetadataStore) -> set[str]:
+    rows = store.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    return {name for (name,) in rows if name.startswith("idx_")}
+
+
+def test_ids_are_sequential_across_loads(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.db")
+    with store.bulk_load(expected_rows=3):
+        assert store.insert_chunks(_chunks(3)) == [1, 2, 3]
+    assert store.insert_chunks(_chunks(2)) == [4, 5]
+    store.tombstone([2, 4])
+    assert store.row_count() == 5
+    assert store.count() == 3
+    assert store.all_chunk_ids() == [1, 2, 3, 4, 5]
+    assert store.live_chunk_ids() == [1, 3, 5]
+
+
+def test_bulk_load_rollback_discards_rows(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.db")
+    try:
+        with store.bulk_load():
+            store.insert_chunks(_chunks(3))
+            raise RuntimeError("interrupted")
+    except RuntimeError:
+        pass
+    assert store.row_count() == 0
+    assert _index_names(store) == {"idx_chunks_file", "idx_chunks_lang"}
+
+
+def test_small_bulk_load_keeps_secondary_indexes(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.db")
+    store.insert_chunks(_chunks(100))
+    statements: list[str] = []
+    store.conn.set_trace_callback(statements.append)
+
+    with store.bulk_load(expected_rows=5):
+        store.insert_chunks(_chunks(5))
+    assert not [s for s in statements if "DROP INDEX" in s]
+
+    with store.bulk_load(expected_rows=50):
+        store.insert_chunks(_chunks(50))
+    assert [s for s in statements if "DROP INDEX" in s]
+    assert _index_names(store) == {"idx_chunks_file", "idx_chunks_lang"}
+    assert store.row_count() == 155
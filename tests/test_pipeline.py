@@ -0,0 +1,219 @@
+"""End-to-end tests of the search pipeline over a small generated repository."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from hermes.config import EmbedConfig, SearchConfig
+from hermes.index.build import build_index
+from hermes.search.pipeline import SearchPipeline
+from hermes.search.schemas import SearchRequest
+
+
+def _request(query: str, **kwargs) -> SearchRequest:
+    return SearchRequest(query=query, top_k_retrieve=40, top_k_rerank=5, **kwargs)
+
+
+@pytest.fixture
+def cascade_config(make_config):
+    return make_config(
+        search=SearchConfig(
+            result_cache_size=0,
+            rerank_mode="cascade",
+            cascade_intermediate="dense",
+            cascade_round_size=5,
+            cascade_margin=0.5,
+        ),
+    )
+
+
+def test_cascade_with_dense_intermediate_survives_a_full_rebuild(
+    fake_models, repo, cascade_config, write_module
+):
+    build_index(repo, cascade_config)
+    pipeline = SearchPipeline(cascade_config)
+    before = pipeline.search(_request("parse token stream"))
+    assert before.results
+
+    # Rebuild from a smaller repository while the pipeline still maps embeddings.npy
+    for path in list((repo / "pkg").glob("mod1*.py")):
+        path.unlink()
+    write_module(repo, "pkg/extra.py", seed=999)
+    build_index(repo, cascade_config)
+
+    again = pipeline.search(_request("parse token stream"))
+    assert [r.chunk_id for r in again.results] == [r.chunk_id for r in before.results]
+
+    pipeline.reload()
+    after = pipeline.search(_request("parse token stream"))
+    assert after.results
+    assert all(not r.file_path.startswith("pkg/mod1") for r in after.results)
+
+
+def test_cascade_scores_fewer_pairs_than_full_rerank(fake_models, repo, make_config):
+    full = make_config(search=SearchConfig(result_cache_size=0, rerank_cache_size=0))
+    build_index(repo, full)
+    reference = SearchPipeline(full).search(_request("cache socket buffer"))
+
+    cascade = make_config(
+        search=SearchConfig(
+            result_cache_size=0, rerank_mode="cascade", cascade_round_size=5, cascade_margin=0.5
+        ),
+        embed=EmbedConfig(workers=1, rerank_cache_size=0),
+    )
+    response = SearchPipeline(cascade).search(_request("cache socket buffer"))
+    assert response.rerank_pairs_scored < reference.rerank_pairs_scored
+    assert response.results[0].chunk_id == reference.results[0].chunk_id
+
+
+def test_rerank_pairs_scored_excludes_rerank_cache_hits(fake_models, repo, make_config):
+    config = make_config()
+    build_index(repo, config)
+    pipeline = SearchPipeline(config)
+    model = fake_models.instances[0]
+
+    first = pipeline.search(_request("render widget matrix"))
+    assert first.rerank_pairs_scored == model.n_pairs > 0
+
+    second = pipeline.search(_request("render widget matrix"))
+    assert second.rerank_pairs_scored == 0
+    assert model.n_pairs == first.rerank_pairs_scored
+    assert [r.chunk_id for r in second.results] == [r.chunk_id for r in first.results]
+
+    [batched] = pipeline.search_batch([_request("render widget matrix")])
+    assert batched.rerank_pairs_scored == 0
+
+
+def test_reload_during_a_search_does_not_mix_builds(fake_models, repo, make_config, write_module):
+    config = make_config(embed=EmbedConfig(workers=1, rerank_cache_size=0))
+    build_index(repo, config)
+    pipeline = SearchPipeline(config)
+    reference = pipeline.search(_request("merge split queue", return_snippets=True))
+
+    # A full rebuild renumbers every chunk
+    for i in range(0, 24, 2):
+        (repo / f"pkg/mod{i}.py").unlink()
+    write_module(repo, "pkg/aaa.py", seed=777, n_funcs=8)
+    build_index(repo, config)
+
+    # Reload while the search is between retrieval and building its results
+    reloaded = []
+
+    def reload_once():
+        if not reloaded:
+            reloaded.append(True)
+            pipeline.reload()
+
+    fake_models.instances[0].before_score = reload_once
+    response = pipeline.search(_request("merge split queue", return_snippets=True))
+    assert reloaded
+    assert response.model_dump(include={"results"}) == reference.model_dump(include={"results"})
+
+    after = pipeline.search(_request("merge split queue", return_snippets=True))
+    assert after.results
+    assert all(r.code_snippet in (repo / r.file_path).read_text() for r in after.results)
+
+
+def test_timed_out_rerank_leaves_the_response_in_retrieval_order(
+    fake_models, repo, make_config, monkeypatch
+):
+    config = make_config(
+        embed=EmbedConfig(workers=1, rerank_batching_enabled=False, rerank_cache_size=0),
+        search=SearchConfig(result_cache_size=0, rerank_timeout_seconds=0.05),
+    )
+    build_index(repo, config)
+    pipeline = SearchPipeline(config)
+    released = threading.Event()
+    fake_models.instances[0].before_score = lambda: released.wait(5)
+
+    # The abandoned rerank finishes after the timeout but before results are built
+    build_results = pipeline._build_results
+
+    def finish_rerank_first(*args, **kwargs):
+        released.set()
+        pipeline._pool.shutdown(wait=True)
+        return build_results(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline, "_build_results", finish_rerank_first)
+    response = pipeline.search(_request("encode decode compress"))
+    assert fake_models.instances[0].n_pairs > 0
+    assert response.rerank_skipped and response.rerank_pairs_scored == 0
+    assert all(r.rerank_score is None for r in response.results)
+    assert [r.retrieval_rank for r in response.results] == list(range(1, 6))
+
+
+def test_search_batch_runs_the_cascade_and_uses_the_result_cache(fake_models, repo, cascade_config):
+    config = cascade_config.model_copy(
+        update={"search": cascade_config.search.model_copy(update={"result_cache_size": 100})}
+    )
+    build_index(repo, config)
+    pipeline = SearchPipeline(config)
+    queries = ["parse token stream", "cache socket buffer", "render widget matrix"]
+
+    single = [pipeline.search(_request(q)) for q in queries]
+    model = fake_models.instances[0]
+    n_pairs = model.n_pairs
+    cached = pipeline.search_batch([_request(q) for q in queries])
+    assert model.n_pairs == n_pairs
+    assert all("result_cache_ms" in r.timings_ms for r in cached)
+    assert [r.results for r in cached] == [r.results for r in single]
+
+    pipeline.result_cache.bump_generation()
+    batched = pipeline.search_batch([_request(q) for q in queries])
+    assert [r.results for r in batched] == [r.results for r in single]
+    assert [r.rerank_pairs_scored for r in batched] == [0, 0, 0]  # rerank cache hits
+    pipeline.rerank_cache.clear()
+    pipeline.result_cache.bump_generation()
+    fresh = pipeline.search_batch([_request(q) for q in queries])
+    assert [r.rerank_pairs_scored for r in fresh] == [r.rerank_pairs_scored for r in single]
+    assert all(r.rerank_pairs_scored < 40 for r in fresh)
+
+
+def test_close_stops_the_pipeline_threads(fake_models, repo, make_config):
+    config = make_config(search=SearchConfig(result_cache_size=0, retrieval_mode="hybrid"))
+    build_index(repo, config)
+    before = set(threading.enumerate())
+    pipeline = SearchPipeline(config)
+    assert pipeline.search(_request("parse token stream")).results
+
+    pipeline.close()
+    for thread in set(threading.enumerate()) - before:
+        thread.join(timeout=5)
+        assert not thread.is_alive(), thread.name
+
+
+def test_a_stalled_retriever_is_skipped_until_it_finishes(
+    fake_models, repo, make_config, monkeypatch
+):
+    config = make_config(
+        search=SearchConfig(
+            result_cache_size=0, retrieval_mode="hybrid", sparse_timeout_seconds=0.05
+        ),
+    )
+    build_index(repo, config)
+    pipeline = SearchPipeline(config)
+    sparse = pipeline._snapshot.sparse
+    search = sparse.search
+    released = threading.Event()
+    calls = []
+
+    def slow_search(*args, **kwargs):
+        calls.append(args)
+        released.wait(5)
+        return search(*args, **kwargs)
+
+    monkeypatch.setattr(sparse, "search", slow_search)
+    first = pipeline.search(_request("parse token stream"))
+    second = pipeline.search(_request("cache socket buffer"))
+    assert first.retrievers_timed_out == second.retrievers_timed_out == ["sparse"]
+    assert first.results and second.results
+    assert len(calls) == 1
+
+    released.set()
+    pipeline._stalled["sparse"].result(timeout=5)
+    third = pipeline.search(_request("render widget matrix"))
+    assert third.retrievers_timed_out == []
+    assert len(calls) == 2
+    pipeline.close()
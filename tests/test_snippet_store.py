@@ -0,0 +1,71 @@
+"""Tests for the block-compressed snippet store and its streaming writer."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from hermes.index.snippet_store import SnippetStore, SnippetStoreWriter
+
+
+def _texts(n: int, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed)
+    words = ["def", "return", "self", "value", "config", "parse", "token", "buffer", "ünïcode"]
+    return [
+        " ".join(str(w) for w in rng.choice(words, size=int(rng.integers(0, 40)))) for _ in range(n)
+    ]
+
+
+def _write(path, texts, base=None, **kwargs) -> SnippetStoreWriter:
+    kwargs = {"block_bytes": 512, "dict_bytes": 1024, **kwargs}
+    writer = SnippetStoreWriter(path, base=base, **kwargs)
+    for text in texts:
+        writer.add(text)
+    writer.close()
+    return writer
+
+
+def test_round_trip_streams_blocks_after_training_on_the_head(tmp_path):
+    # The head sample (100 x dict_bytes) is reached long before the last text
+    texts = _texts(3000)
+    _write(tmp_path / "s", texts)
+    store = SnippetStore.load(tmp_path / "s")
+
+    assert len(store) == len(texts)
+    assert (tmp_path / "s" / "dictionary.bin").exists()
+    assert store.stats()["n_blocks"] > 10
+    assert [store.get(i) for i in range(len(texts))] == texts
+
+
+def test_empty_store(tmp_path):
+    _write(tmp_path / "s", [])
+    store = SnippetStore.load(tmp_path / "s")
+    assert len(store) == 0
+    assert store.stats()["n_blocks"] == 0
+
+
+def test_base_frames_and_dictionary_are_reused(tmp_path):
+    old, new = _texts(800), _texts(300, seed=1)
+    _write(tmp_path / "a", old)
+    serving = SnippetStore.load(tmp_path / "a")
+    old_blocks = (tmp_path / "a" / "blocks.bin").read_bytes()
+
+    writer = _write(tmp_path / "b", new, base=tmp_path / "a")
+    assert writer.n_reused == len(old)
+    assert (tmp_path / "b" / "dictionary.bin").read_bytes() == (
+        tmp_path / "a" / "dictionary.bin"
+    ).read_bytes()
+    assert (tmp_path / "b" / "blocks.bin").read_bytes()[: len(old_blocks)] == old_blocks
+
+    store = SnippetStore.load(tmp_path / "b")
+    assert [store.get(i) for i in range(len(store))] == old + new
+    # A search process still serving the base store is unaffected
+    assert [serving.get(i) for i in range(len(serving))] == old
+
+
+def test_base_without_dictionary_stays_without_one(tmp_path):
+    _write(tmp_path / "a", _texts(5))
+    assert not (tmp_path / "a" / "dictionary.bin").exists()
+    _write(tmp_path / "b", _texts(800, seed=1), base=tmp_path / "a")
+    assert not (tmp_path / "b" / "dictionary.bin").exists()
+    store = SnippetStore.load(tmp_path / "b")
+    assert [store.get(i) for i in range(len(store))] == _texts(5) + _texts(800, seed=1)
@@ -0,0 +1,150 @@
+"""Tests for the BM25 index: MaxScore-pruned top-k against exhaustive scoring."""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from hermes.index.sparse_index import SparseIndex, _tokenize
+
+VOCAB = [f"term{chr(97 + i // 26)}{chr(97 + i % 26)}" for i in range(300)]
+
+
+def _corpus(n: int, seed: int = 0) -> list[str]:
+    """Documents with Zipf-distributed words, so a few terms have long posting lists."""
+    rng = np.random.default_rng(seed)
+    p = 1.0 / np.arange(1, len(VOCAB) + 1)
+    p /= p.sum()
+    return [" ".join(rng.choice(VOCAB, size=int(rng.integers(3, 60)), p=p)) for _ in range(n)]
+
+
+def _queries(n: int, seed: int = 1) -> list[str]:
+    rng = np.random.default_rng(seed)
+    queries = [" ".join(rng.choice(VOCAB, size=int(rng.integers(1, 7)))) for _ in range(n)]
+    # Common terms, a repeated term and an unknown term
+    return queries + ["termaa termab termac", "termaa termaa termbz", "termaa nosuchterm"]
+
+
+class _Exhaustive:
+    """BM25Okapi scores of every document, computed term by term from raw counts."""
+
+    def __init__(self, docs: list[str], k1: float = 1.5, b: float = 0.75, eps: float = 0.25):
+        tokenized = [_tokenize(d) for d in docs]
+        self.tfs = [Counter(t) for t in tokenized]
+        avgdl = sum(len(t) for t in tokenized) / len(docs)
+        self.norms = [k1 * (1 - b + b * len(t) / avgdl) for t in tokenized]
+        self.k1 = k1
+        df = Counter(term for tf in self.tfs for term in tf)
+        idf = {t: math.log(len(docs) - c + 0.5) - math.log(c + 0.5) for t, c in df.items()}
+        floor = eps * sum(idf.values()) / len(idf)
+        self.idf = {t: v if v >= 0 else floor for t, v in idf.items()}
+
+    def scores(self, query: str) -> dict[int, float]:
+        """Scores of the documents sharing at least one term with *query*."""
+        terms = _tokenize(query)
+        out = {}
+        for i, (tf, norm) in enumerate(zip(self.tfs, self.norms)):
+            shared = [t for t in terms if t in tf]
+            if shared:
+                out[i] = sum(self.idf[t] * tf[t] * (self.k1 + 1) / (tf[t] + norm) for t in shared)
+        return out
+
+
+def _assert_top_k(
+    index: SparseIndex,
+    reference: dict[int, float],
+    query: str,
+    top_k: int,
+    mask: np.ndarray | None = None,
+) -> None:
+    scores, ids = index.search(query, top_k, mask)
+    if mask is not None:
+        reference = {i: s for i, s in reference.items() if mask[i]}
+    expected = sorted(reference.values(), reverse=True)[:top_k]
+    np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-5)
+    # Ties may resolve either way, but every id must carry its own score
+    np.testing.assert_allclose(scores, [reference[i] for i in ids], rtol=1e-5, atol=1e-5)
+    assert len(set(ids.tolist())) == len(ids)
+
+
+@pytest.fixture(scope="module")
+def corpus() -> list[str]:
+    return _corpus(1500)
+
+
+@pytest.fixture(scope="module")
+def exhaustive(corpus) -> _Exhaustive:
+    return _Exhaustive(corpus)
+
+
+@pytest.fixture(scope="module")
+def index(corpus) -> SparseIndex:
+    index = SparseIndex()
+    index.build(corpus)
+    return index
+
+
+@pytest.mark.parametrize("top_k", [1, 10, 100, 5000])
+def test_pruned_top_k_matches_exhaustive_scoring(exhaustive, index, top_k):
+    for query in _queries(40):
+        _assert_top_k(index, exhaustive.scores(query), query, top_k)
+
+
+def test_mask_restricts_results_without_changing_scores(corpus, exhaustive, index):
+    mask = np.random.default_rng(2).random(len(corpus)) < 0.2
+    for query in _queries(20):
+        _assert_top_k(index, exhaustive.scores(query), query, 10, mask)
+
+
+def test_unknown_terms_and_empty_queries_return_nothing(index):
+    for query in ("nosuchterm", "", "a b c"):
+        scores, ids = index.search(query, 10)
+        assert len(scores) == len(ids) == 0
+
+
+def test_incremental_add_and_remove_match_a_rebuild(corpus, tmp_path):
+    index = SparseIndex()
+    index.build(corpus[:1000])
+    index.add(corpus[1000:])
+    removed = list(range(0, 1500, 7))
+    index.remove(removed)
+    index.save(tmp_path / "sparse")
+
+    # Removed positions keep their slot but are left out of N and avgdl
+    live = [i for i in range(len(corpus)) if i % 7]
+    exhaustive = _Exhaustive([corpus[i] for i in live])
+    fresh = SparseIndex()
+    fresh.build([corpus[i] for i in live])
+    loaded = SparseIndex()
+    loaded.load(tmp_path / "sparse")
+    assert index.n_live == loaded.n_live == len(live)
+    for query in _queries(20):
+        reference = {live[j]: score for j, score in exhaustive.scores(query).items()}
+        _assert_top_k(index, reference, query, 10)
+        _assert_top_k(loaded, reference, query, 10)
+        np.testing.assert_allclose(
+            loaded.search(query, 10)[0], fresh.search(query, 10)[0], rtol=1e-5
+        )
+
+
+def test_removed_documents_stay_out_of_the_statistics_after_a_reload(corpus, tmp_path):
+    index = SparseIndex()
+    index.build(corpus[:600])
+    index.remove(list(range(0, 600, 3)))
+    index.save(tmp_path / "sparse")
+
+    # A second incremental run on the reloaded index: more removals and additions
+    index = SparseIndex()
+    index.load(tmp_path / "sparse")
+    index.remove(list(range(1, 600, 5)))
+    index.add(corpus[600:800])
+
+    live = [i for i in range(800) if i >= 600 or (i % 3 and i % 5 != 1)]
+    exhaustive = _Exhaustive([corpus[i] for i in live])
+    assert index.n_live == len(live)
+    for query in _queries(20):
+        reference = {live[j]: score for j, score in exhaustive.scores(query).items()}
+        _assert_top_k(index, reference, query, 10)
@@ -0,0 +1,105 @@
+"""Tests for the persistent chunk embedding cache."""
+
+from __future__ import annotations
+
+import zlib
+
+import numpy as np
+
+from hermes.embed.vector_cache import ChunkEmbeddingCache
+
+DIM = 8
+
+
+def _encode(texts: list[str]) -> np.ndarray:
+    """Deterministic per-text vectors, so a wrong row is always detectable."""
+    out = np.empty((len(texts), DIM), dtype=np.float32)
+    for i, text in enumerate(texts):
+        out[i] = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(DIM)
+    return out
+
+
+class _Counting:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.calls.append(list(texts))
+        return _encode(texts)
+
+
+def test_hits_skip_the_encoder_and_duplicates_encode_once(tmp_path):
+    cache = ChunkEmbeddingCache(tmp_path, "model", 256)
+    encode = _Counting()
+
+    first = cache.encode(["a", "b", "a"], encode)
+    assert encode.calls == [["a", "b"]]
+    np.testing.assert_array_equal(first, _encode(["a", "b", "a"]))
+
+    second = cache.encode(["b", "c"], encode)
+    assert encode.calls[-1] == ["c"]
+    np.testing.assert_array_equal(second, _encode(["b", "c"]))
+    assert (cache.hits, cache.misses) == (1, 4)
+    cache.close()
+
+
+def test_two_writers_on_one_directory_do_not_overwrite_each_other(tmp_path):
+    a = ChunkEmbeddingCache(tmp_path, "model", 256)
+    b = ChunkEmbeddingCache(tmp_path, "model", 256)
+    # Interleave the writers: each must append after the other's rows
+    a.encode(["alpha", "shared"], _encode)
+    b.encode(["beta", "gamma"], _encode)
+    a.encode(["delta"], _encode)
+    b.encode(["shared", "epsilon"], _encode)
+    a.close()
+    b.close()
+
+    reader = ChunkEmbeddingCache(tmp_path, "model", 256)
+    texts = ["alpha", "beta", "gamma", "delta", "shared", "epsilon"]
+    fail = _Counting()
+    np.testing.assert_array_equal(reader.encode(texts, fail), _encode(texts))
+    assert fail.calls == []
+    assert len(reader) == 6
+    reader.close()
+
+
+def test_interrupted_write_is_truncated_on_open(tmp_path):
+    cache = ChunkEmbeddingCache(tmp_path, "model", 256)
+    cache.encode(["a", "b"], _encode)
+    cache.close()
+    with open(cache.dir / "vectors.f32", "ab") as fh:
+        fh.write(b"\0" * 5)
+
+    reopened = ChunkEmbeddingCache(tmp_path, "model", 256)
+    assert (reopened.dir / "vectors.f32").stat().st_size == 2 * DIM * 4
+    reopened.encode(["c"], _encode)
+    texts = ["a", "b", "c"]
+    np.testing.assert_array_equal(reopened.encode(texts, _encode), _encode(texts))
+    reopened.close()
+
+
+def test_compaction_keeps_recently_used_vectors_under_the_cap(tmp_path):
+    row_bytes = DIM * 4
+    cache = ChunkEmbeddingCache(tmp_path, "model", 256, max_bytes=20 * row_bytes)
+    old = [f"old{i}" for i in range(12)]
+    cache.encode(old, _encode)
+    cache.close()
+
+    # A later build touches a few old texts and adds new ones past the cap
+    cache = ChunkEmbeddingCache(tmp_path, "model", 256, max_bytes=20 * row_bytes)
+    cache._stamp += 1
+    kept = old[:3]
+    cache.encode(kept, _encode)
+    new = [f"new{i}" for i in range(10)]
+    cache.encode(new, _encode)
+
+    assert cache.evicted > 0
+    assert len(cache) * row_bytes <= 20 * row_bytes
+    assert not (cache.dir / "vectors.f32").exists()
+    cache.close()
+
+    reader = ChunkEmbeddingCache(tmp_path, "model", 256, max_bytes=20 * row_bytes)
+    encode = _Counting()
+    np.testing.assert_array_equal(reader.encode(kept + new, encode), _encode(kept + new))
+    assert encode.calls == []
+    reader.close()